@@ -0,0 +1,68 @@
+"""
+Throughput and tail latency of upload-path predictions with and without micro-batching.
+
+Runs closed-loop clients against services.batcher.PredictionBatcher for each
+(window, concurrency) pair. Every client awaits one explained prediction at a time
+on a distinct feature vector, so the SHAP cache never hits. Reports requests per
+second, p50 and p99 latency, and the mean batch size. Window 0 is the unbatched
+baseline: every request is its own executor job, as in the upload handler without
+batching.
+
+Run from the backend directory:
+    python -m benchmarks.batching
+    python -m benchmarks.batching --windows 0 1 2 5 --concurrency 1 16 64 --workers 4
+"""
+import argparse
+import asyncio
+import time
+import numpy as np
+
+from services.batcher import PredictionBatcher
+from services.executor import CpuExecutor
+from services.warmup import warm_worker
+
+# A stable applicant; clients jitter it so every request is a new explanation
+BASE_FEATURES = np.array([0.9, 70000, 0.05, 45000, 0.3, 0.3, 0.2, 0.1, 0.97, 0, 0.1, 1.6, 1, 1, 3, 0.1, 0.5, 3])
+
+async def run_load(batcher, concurrency: int, duration: float, seed: int):
+    rng = np.random.default_rng(seed)
+    latencies = []
+    deadline = time.perf_counter() + duration
+
+    async def client():
+        while time.perf_counter() < deadline:
+            features = list(BASE_FEATURES * rng.uniform(0.8, 1.2, len(BASE_FEATURES)))
+            started = time.perf_counter()
+            await batcher.predict(features)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return len(latencies) / (time.perf_counter() - started), np.array(latencies) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--windows", nargs="+", type=float, default=[0, 1, 2, 5, 10], help="batch windows in ms (0 = no batching)")
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 8, 32, 64])
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=1, help="CPU worker processes (0 = threads)")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds of load per configuration")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    executor = CpuExecutor(max_workers=args.workers, max_queue=100000, initializer=warm_worker)
+    executor.warm()
+    try:
+        print(f"{'window ms':>9} {'clients':>8} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'batch':>6}")
+        for concurrency in args.concurrency:
+            for window in args.windows:
+                batcher = PredictionBatcher(executor, max_batch=args.max_batch, max_wait_ms=window)
+                throughput, latencies = asyncio.run(run_load(batcher, concurrency, args.duration, args.seed))
+                stats = batcher.stats()
+                print(f"{window:>9g} {concurrency:>8} {throughput:>9.1f} {np.percentile(latencies, 50):>8.1f} "
+                      f"{np.percentile(latencies, 99):>8.1f} {stats['mean_batch_size'] or 1:>6.1f}")
+    finally:
+        executor.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark for PDF statement ingestion on large synthetic statements.
+
+"serial" parses the whole PDF in one process; "parallel" fans its page ranges out
+as jobs on a CpuExecutor with --workers processes, the way the upload handler does
+with PDF_WORKERS > 1 (worker start-up is excluded, as the API's pool is warm).
+
+Run from the backend directory:
+    python -m benchmarks.pdf_ingest --pages 100 300 --workers 4
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from services.executor import CpuExecutor
+from services.pdf_ingest import parse_pdf, parse_pdf_parallel
+from benchmarks.statements import generate_statement, write_pdf
+
+def write_statement(path: str, pages: int, lines_per_page: int = 45, seed: int = 42):
+    """Writes a text-based PDF statement with one transaction per line and one month per page."""
+    write_pdf(generate_statement(pages, lines_per_page, seed=seed), path, lines_per_page=lines_per_page)
+
+def legacy_parse(path: str):
+    """The original serial extraction loop from upload_transactions, for comparison."""
+    from pypdf import PdfReader
+    pdf = PdfReader(path)
+    text = ""
+    for page in pdf.pages:
+        text += page.extract_text() + "\n"
+    data = []
+    for line in text.split('\n'):
+        parts = line.split()
+        if len(parts) >= 4:
+            try:
+                data.append((parts[0], " ".join(parts[1:-3]), float(parts[-3].replace(',', '')), parts[-2], parts[-1]))
+            except ValueError:
+                pass
+    return data
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[100, 300])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    executor = CpuExecutor(max_workers=args.workers, max_queue=1000)
+    executor.warm()
+    print(f"{'pages':>6} {'rows':>7} {'legacy s':>9} {'serial s':>9} {'parallel s':>11} {'errors':>7}")
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for pages in args.pages:
+                path = os.path.join(tmp, f"statement_{pages}.pdf")
+                write_statement(path, pages)
+                legacy_time, _ = timed(legacy_parse, path)
+                serial_time, parsed = timed(parse_pdf, path)
+                parallel_time, _ = timed(asyncio.run, parse_pdf_parallel(path, executor.run, args.workers))
+                print(f"{pages:>6} {len(parsed.records):>7} {legacy_time:>9.2f} {serial_time:>9.2f} {parallel_time:>11.2f} {len(parsed.errors):>7}")
+    finally:
+        executor.shutdown()
+
+if __name__ == "__main__":
+    main()
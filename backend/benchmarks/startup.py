@@ -0,0 +1,76 @@
+"""
+Cold-start benchmark for the API process.
+
+Each run starts a fresh interpreter that imports `main`, starts the app (which kicks
+off the background warmup) and reports:
+  import_seconds     time to import main
+  ready_seconds      time from app start until /api/ready returns 200
+  first_request_ms   latency of the first /api/score/batch call
+The first request is sent either immediately after start-up (`cold`, what a client
+hitting a fresh instance sees) or once /api/ready reports ready (`ready`, what a
+client behind a readiness-gated load balancer sees).
+
+Requires FIREBASE_CREDENTIALS_JSON, as the API itself does; no Firebase calls are
+made. Run from the backend directory:
+    python -m benchmarks.startup --runs 3
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+def child(mode: str):
+    started = time.perf_counter()
+    import main
+    import_seconds = time.perf_counter() - started
+
+    from fastapi.testclient import TestClient
+    from services.inference import ALL_SIGNAL_NAMES
+    main.app.dependency_overrides[main.verify_token] = lambda: {"uid": "benchmark", "name": "Benchmark"}
+    body = {"features": [[0.5] * len(ALL_SIGNAL_NAMES)]}
+
+    with TestClient(main.app) as client:
+        app_started = time.perf_counter()
+        if mode == "ready":
+            while client.get("/api/ready").status_code != 200:
+                time.sleep(0.01)
+        request_started = time.perf_counter()
+        response = client.post("/api/score/batch", json=body)
+        first_request = time.perf_counter() - request_started
+        response.raise_for_status()
+        main.warmup.wait()
+        ready = main.warmup.status()["warmup_seconds"]
+        if mode == "ready":
+            ready = request_started - app_started
+
+    print(json.dumps({"import_seconds": import_seconds, "ready_seconds": ready, "first_request_ms": first_request * 1000}))
+
+def run(mode: str):
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.startup", "--child", mode],
+        capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--modes", nargs="+", default=["cold", "ready"], choices=["cold", "ready"])
+    parser.add_argument("--child", choices=["cold", "ready"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child)
+        return
+
+    print(f"{'mode':<6} {'import s':>9} {'ready s':>8} {'first request ms':>17}")
+    for mode in args.modes:
+        runs = [run(mode) for _ in range(args.runs)]
+        medians = {key: statistics.median(r[key] for r in runs) for key in runs[0]}
+        print(f"{mode:<6} {medians['import_seconds']:>9.2f} {medians['ready_seconds']:>8.2f} {medians['first_request_ms']:>17.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Seeded raw bank statements for benchmarks.
+
+Statements come from ml_pipeline/generate_synthetic_data.py's `generate_transactions`,
+the generator behind its raw ledgers, so both share one set of merchant and recurring
+lines. Each statement is one Stable applicant's: salary, rent, EMI and SIP lines plus
+discretionary spend drawn from a weighted merchant mix. The same seed always produces
+the same statement.
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# ml_pipeline is a directory of scripts rather than a package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "ml_pipeline"))
+from generate_synthetic_data import MERCHANTS, generate_transactions
+
+STABLE = 2
+
+DEFAULT_MIX = {"food": 4, "groceries": 2, "utilities": 1, "shopping": 2, "travel": 2, "subscriptions": 1}
+
+def parse_mix(text: str):
+    """Parses 'food=4,shopping=1' into a merchant mix dict."""
+    mix = {}
+    for part in filter(None, text.split(",")):
+        key, _, weight = part.partition("=")
+        if key not in MERCHANTS:
+            raise ValueError(f"Unknown merchant group {key!r}; expected one of {sorted(MERCHANTS)}")
+        mix[key] = float(weight or 1)
+    return mix
+
+def generate_statement(months: int, txns_per_month: int, mix: dict = None, seed: int = 42,
+                       start: str = "2022-01-01"):
+    """
+    Returns a raw statement DataFrame (date, description, amount, type, category) with
+    `txns_per_month` discretionary lines a month on top of the recurring ones. Debits
+    carry negative amounts, as in sample_transactions.csv.
+    """
+    ledger, _ = generate_transactions(1, months, txns_per_month, np.random.default_rng(seed),
+                                      start=start[:7], mix=mix or DEFAULT_MIX, label=STABLE)
+    return ledger.drop(columns=["account_id"])
+
+def write_csv(df: pd.DataFrame, path: str):
+    df.to_csv(path, index=False)
+
+def write_pdf(df: pd.DataFrame, path: str, lines_per_page: int = 45):
+    """Writes a text-based PDF statement with one transaction per line, in pdf_ingest's line grammar."""
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+
+    pdf = canvas.Canvas(path, pagesize=letter)
+    rows = df.itertuples(index=False)
+    page = 0
+    for start in range(0, len(df), lines_per_page):
+        page += 1
+        y = 750
+        pdf.drawString(40, y, f"Statement page {page}")
+        for _ in range(min(lines_per_page, len(df) - start)):
+            row = next(rows)
+            y -= 15
+            pdf.drawString(40, y, f"{row.date} {row.description} {abs(row.amount):,.2f} {row.type} {row.category}")
+        pdf.showPage()
+    pdf.save()
@@ -0,0 +1,241 @@
+"""
+Benchmark suite for the scoring hot paths on seeded synthetic statements.
+
+Times each stage (CSV ingestion, PDF parsing, feature extraction, inference,
+certificate rendering) at several statement sizes, records peak traced memory,
+and compares the results against the committed baseline. Any stage slower or
+hungrier than the baseline by more than the tolerance is reported and the run
+exits with status 1; so does a run with no baseline, unless --no-baseline is given.
+
+Timings are compared as multiples of a fixed pandas/numpy reference job run
+alternately with every stage, so the baseline carries over between machines and a busy
+machine slows the reference along with the stage. Peak memory is compared as is.
+
+Run from the backend directory:
+    python -m benchmarks.suite                      # compare against benchmarks/baseline.json
+    python -m benchmarks.suite --sizes small medium --stages extract_features predict
+    python -m benchmarks.suite --save-baseline      # re-record after an intended change, and commit it
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.statements import generate_statement, write_csv, write_pdf, parse_mix
+
+# Statement sizes as (months, transactions per month)
+SIZES = {
+    "small": (6, 30),
+    "medium": (24, 120),
+    "large": (60, 400),
+}
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+class Workload:
+    """Statement of one size materialized as a DataFrame, a CSV and a text PDF."""
+    def __init__(self, name: str, months: int, txns_per_month: int, mix: dict, seed: int, tmp_dir: str):
+        self.name = name
+        self.df = generate_statement(months, txns_per_month, mix=mix, seed=seed)
+        self.csv_path = os.path.join(tmp_dir, f"{name}.csv")
+        self.pdf_path = os.path.join(tmp_dir, f"{name}.pdf")
+        write_csv(self.df, self.csv_path)
+        write_pdf(self.df, self.pdf_path)
+
+def stage_csv_upload(workload):
+    """CSV upload path as the API worker runs it: chunked read, aggregation, features."""
+    from services.pipeline import load_statement
+    from services.feature_engine import features_from_aggregates
+    return lambda: features_from_aggregates(*load_statement(workload.csv_path, "statement.csv", 50000)[1:3])
+
+def stage_pdf_parse(workload):
+    from services.pdf_ingest import parse_pdf
+    return lambda: parse_pdf(workload.pdf_path)
+
+def stage_extract_features(workload):
+    from services.feature_engine import extract_features
+    return lambda: extract_features(workload.df.copy())
+
+def stage_predict(workload):
+    """Single-applicant scoring with SHAP insights; the explanation cache is cleared so every call explains."""
+    from services.feature_engine import extract_features
+    from services.inference import get_inference_service
+    features, _ = extract_features(workload.df.copy())
+    service = get_inference_service()
+
+    def run():
+        service.clear_explanation_cache()
+        return service.predict(features)
+    return run
+
+def stage_predict_batch(workload):
+    """One vectorized call scoring as many applicants as the statement has lines (no insights)."""
+    from services.feature_engine import extract_features
+    from services.inference import get_inference_service
+    features, _ = extract_features(workload.df.copy())
+    rows = [features] * len(workload.df)
+    return lambda: get_inference_service().predict_batch(rows)
+
+def stage_certificate(workload):
+    from services.certificate import generate_certificate_pdf
+    insights = [{"feature": f"Feature {i}", "impact": 0.1 * (i - 2)} for i in range(5)]
+    return lambda: generate_certificate_pdf("Benchmark User", 78.5, "STABLE", insights)
+
+STAGES = {
+    "csv_upload": stage_csv_upload,
+    "pdf_parse": stage_pdf_parse,
+    "extract_features": stage_extract_features,
+    "predict": stage_predict,
+    "predict_batch": stage_predict_batch,
+    "certificate": stage_certificate,
+}
+
+# Stages whose cost does not depend on statement size; measured once, with the first size
+SIZE_INDEPENDENT = {"predict", "certificate"}
+
+def reference_job(seed: int = 0):
+    """
+    Fixed mix of the work the stages do (a pandas groupby, a numpy sort and
+    interpreter-bound string handling), the unit stage timings are expressed in.
+    """
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({"key": rng.integers(0, 500, 200_000), "value": rng.random(200_000)})
+    labels = [f"merchant {i % 997}" for i in range(50_000)]
+
+    def run():
+        frame.groupby("key")["value"].agg(["sum", "mean", "count"])
+        np.sort(frame["value"].to_numpy())
+        return sum(len(label.upper().split()) for label in labels)
+    return run
+
+def measure(fn, repeats: int, reference=None, min_time: float = 0.5, max_repeats: int = 200):
+    """
+    Returns (best seconds, median seconds, best seconds relative to `reference`, peak
+    traced MiB). Fast stages are repeated until `min_time` has been spent; the best
+    time is what regressions are judged on, since it is the least affected by other
+    load on the machine. The reference job runs alternately with the stage, so both
+    best times are taken over the same stretch of machine load. Peak memory is taken
+    from a separate traced run.
+    """
+    fn()  # warm caches and lazy imports
+    times, reference_times = [], []
+    while len(times) < repeats or (sum(times) < min_time and len(times) < max_repeats):
+        if reference is not None:
+            gc.collect()
+            start = time.perf_counter()
+            reference()
+            reference_times.append(time.perf_counter() - start)
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    relative = min(times) / min(reference_times) if reference_times else None
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return min(times), statistics.median(times), relative, peak / (1024 * 1024)
+
+def machine():
+    """Where a baseline was recorded; kept for reference, comparisons do not depend on it."""
+    return {"python": platform.python_version(), "platform": platform.platform(), "cpu_count": os.cpu_count()}
+
+def compare(results: dict, baseline: dict, tolerance: float, memory_tolerance: float):
+    """Returns a list of regression messages for entries present in both runs."""
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        if result["relative"] > base["relative"] * (1 + tolerance):
+            regressions.append(f"{key}: {result['relative']:.2f}x reference vs baseline {base['relative']:.2f}x "
+                               f"({result['seconds'] * 1000:.1f} ms here)")
+        if result["peak_mib"] > base["peak_mib"] * (1 + memory_tolerance) + 1:
+            regressions.append(f"{key}: peak {result['peak_mib']:.1f} MiB vs baseline {base['peak_mib']:.1f} MiB")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", default=list(SIZES), choices=list(SIZES))
+    parser.add_argument("--stages", nargs="+", default=list(STAGES), choices=list(STAGES))
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--mix", type=parse_mix, default=None, help="merchant mix, e.g. food=4,shopping=2,travel=1")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="write this run's results as the new baseline")
+    parser.add_argument("--no-baseline", action="store_true", help="print timings without comparing against a baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown before failing")
+    parser.add_argument("--memory-tolerance", type=float, default=0.20, help="allowed relative peak-memory growth")
+    parser.add_argument("--output", help="also write this run's results to a JSON file")
+    args = parser.parse_args()
+
+    baseline = {}
+    if not args.save_baseline and not args.no_baseline:
+        if not os.path.exists(args.baseline):
+            print(f"No baseline at {args.baseline}. Record one with --save-baseline, "
+                  f"or pass --no-baseline to only print timings.")
+            sys.exit(1)
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+
+    reference = reference_job(args.seed)
+    results = {}
+    print(f"{'stage':<18} {'size':<7} {'rows':>7} {'best ms':>9} {'median ms':>10} {'x ref':>7} {'peak MiB':>9} {'vs base':>8}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in args.sizes:
+            workload = Workload(size, *SIZES[size], mix=args.mix, seed=args.seed, tmp_dir=tmp_dir)
+            for name in args.stages:
+                if name in SIZE_INDEPENDENT and size != args.sizes[0]:
+                    continue
+                seconds, median, relative, peak = measure(STAGES[name](workload), args.repeats, reference)
+                key = name if name in SIZE_INDEPENDENT else f"{name}@{size}"
+                results[key] = {"seconds": round(seconds, 6), "median_seconds": round(median, 6),
+                                "relative": round(relative, 4), "peak_mib": round(peak, 2), "rows": len(workload.df)}
+                base = baseline.get(key)
+                delta = f"{(relative / base['relative'] - 1) * 100:+.0f}%" if base else "-"
+                label = "-" if name in SIZE_INDEPENDENT else size
+                print(f"{name:<18} {label:<7} {len(workload.df):>7} {seconds * 1000:>9.1f} {median * 1000:>10.1f} "
+                      f"{relative:>7.2f} {peak:>9.1f} {delta:>8}")
+
+    report = {
+        "meta": {
+            **machine(),
+            "seed": args.seed,
+            "repeats": args.repeats,
+            "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S")
+        },
+        "results": results
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    regressions = compare(results, baseline, args.tolerance, args.memory_tolerance)
+    if regressions:
+        print("\nREGRESSIONS (tolerance {:.0%} time, {:.0%} memory):".format(args.tolerance, args.memory_tolerance))
+        for message in regressions:
+            print(f"  {message}")
+        sys.exit(1)
+    if baseline:
+        print("\nNo regressions against baseline.")
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,30 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException, Depends, Header
+from fastapi import FastAPI, File, UploadFile, HTTPException, Depends, Header, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-import pandas as pd
-import io
+import asyncio
 import os
+import hashlib
+import tempfile
+import time
 from datetime import datetime
 import firebase_admin
 from firebase_admin import credentials, auth, firestore
 import json
-from services.feature_engine import extract_features
-from services.inference import inference_service
-from services.certificate import generate_certificate_pdf
-from fastapi.responses import Response
+from services.records import ScoreRecord, Prediction, FeatureVector, CategoryShare
+from services.feature_store import MonthlyFeatureStore
+from services.score_repository import FirestoreScoreRepository, InvalidCursor
+from services.score_writer import WriteBehindRepository
+from services.token_cache import TokenCache
+from services.result_cache import ResultCache
+from services.model_registry import model_registry
+from services.certificate_cache import CertificateCache, iter_chunks
+from services.certificate_export import stream_certificate_zip
+from services.executor import cpu_executor, ExecutorSaturated
+from services.batcher import PredictionBatcher
+from services.warmup import Warmup
+from services.metrics import MetricsRegistry, SamplingProfiler, stage, begin_request, server_timing_header
+from fastapi.responses import Response, StreamingResponse, PlainTextResponse, JSONResponse
+from pydantic import BaseModel
+from typing import List, Optional
 
 app = FastAPI(title="Crediscout API")
 
@@ -33,30 +47,139 @@ if not firebase_admin._apps:
     firebase_admin.initialize_app(cred)
 
 db = firestore.client()
+feature_store = MonthlyFeatureStore(db)
+score_repository = FirestoreScoreRepository(db)
+# Write-behind persistence: uploads return once the score is journaled to this local file
+if os.environ.get("SCORE_QUEUE_PATH"):
+    score_repository = WriteBehindRepository(
+        score_repository,
+        os.environ["SCORE_QUEUE_PATH"],
+        batch_size=int(os.environ.get("SCORE_WRITE_BATCH", 100))
+    )
 
-def to_native(obj):
-    """Recursively convert NumPy/Pandas types to native Python types."""
-    if isinstance(obj, dict):
-        return {k: to_native(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [to_native(i) for i in obj]
-    elif hasattr(obj, "item"): # Caught for NumPy scalars like np.float32/64
-        return obj.item()
-    elif isinstance(obj, (datetime, str, int, float, bool)) or obj is None:
-        return obj
-    else:
-        # Fallback for anything else that might have a __dict__ or just return as is
-        try:
-            return float(obj) if "float" in str(type(obj)) else int(obj) if "int" in str(type(obj)) else obj
-        except:
-            return obj
+# Verified ID tokens are reused until they expire (or for TOKEN_REVOCATION_TTL seconds in revocation-check mode)
+token_cache = TokenCache(
+    auth.verify_id_token,
+    max_entries=int(os.environ.get("TOKEN_CACHE_SIZE", 10000)),
+    check_revoked=os.environ.get("TOKEN_CHECK_REVOKED", "false").lower() == "true",
+    revocation_ttl=float(os.environ.get("TOKEN_REVOCATION_TTL", 60))
+)
+
+# Rows parsed per chunk when streaming CSV uploads
+CSV_CHUNK_ROWS = int(os.environ.get("CSV_CHUNK_ROWS", 50000))
+
+# Upload result cache, keyed by uploaded bytes + active model version (see services.model_registry)
+result_cache = ResultCache(
+    max_entries=int(os.environ.get("RESULT_CACHE_SIZE", 256)),
+    disk_dir=os.environ.get("RESULT_CACHE_DIR") or None
+)
+# Rendered certificate PDFs, keyed by score id, owner and template version
+certificate_cache = CertificateCache(
+    max_entries=int(os.environ.get("CERTIFICATE_CACHE_SIZE", 128)),
+    disk_dir=os.environ.get("CERTIFICATE_CACHE_DIR") or None
+)
+# Upper bound on certificates in one bulk export, and certificates rendered per worker call
+CERTIFICATE_EXPORT_MAX = int(os.environ.get("CERTIFICATE_EXPORT_MAX", 5000))
+CERTIFICATE_EXPORT_BATCH = int(os.environ.get("CERTIFICATE_EXPORT_BATCH", 8))
+# Score documents fetched per Firestore read while walking an export
+CERTIFICATE_EXPORT_READ_BATCH = 200
+# Return the user's existing score document for a repeat upload instead of writing a new one
+SKIP_DUPLICATE_WRITES = os.environ.get("SKIP_DUPLICATE_WRITES", "false").lower() == "true"
+
+# Concurrent upload predictions are coalesced into one batched model + SHAP call per window
+predict_batcher = PredictionBatcher(
+    cpu_executor,
+    max_batch=int(os.environ.get("PREDICT_BATCH_MAX", 32)),
+    max_wait_ms=float(os.environ.get("PREDICT_BATCH_WAIT_MS", 1))
+)
+
+# Model load, explainer and worker start-up run in the background after boot; /api/ready reports completion
+warmup = Warmup(cpu_executor)
+
+# Request and per-stage latency metrics, served in Prometheus format at /api/metrics
+metrics = MetricsRegistry()
+
+def csv_layout_stats():
+    """
+    CSV layout-cache outcomes across all workers. Each worker keeps its own cache
+    (see services.csv_ingest), so hits are counted from the stages the workers report:
+    a cached layout that failed to read is evicted and the file is learned again.
+    """
+    counts = metrics.stage_counts()
+    evicted = counts.get("csv_layout_evict", 0)
+    hits = counts.get("csv_layout_read", 0) - evicted
+    misses = counts.get("csv_layout_learn", 0)
+    return {
+        "hits": hits,
+        "misses": misses,
+        "evicted": evicted,
+        "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0
+    }
+
+metrics.gauges.append(lambda: {
+    f"crediscout_{prefix}_{key}": value
+    for prefix, stats in (
+        ("executor", cpu_executor.stats()),
+        ("predict_batcher", predict_batcher.stats()),
+        ("result_cache", result_cache.stats()),
+        ("token_cache", token_cache.stats()),
+        ("certificate_cache", certificate_cache.stats()),
+        ("csv_layout_cache", csv_layout_stats())
+    )
+    for key, value in stats.items()
+    if isinstance(value, (int, float)) and not isinstance(value, bool)
+})
+# Opt-in: dump a stack-sampled profile of every request slower than this many milliseconds
+profiler = None
+if os.environ.get("PROFILE_SLOW_REQUESTS_MS"):
+    profiler = SamplingProfiler(
+        threshold_ms=float(os.environ["PROFILE_SLOW_REQUESTS_MS"]),
+        out_dir=os.environ.get("PROFILE_DIR", "profiles")
+    )
+
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    """Times every request, feeds /api/metrics and reports the stage breakdown in a Server-Timing header."""
+    timings = begin_request()
+    started = time.perf_counter()
+    profile_token = profiler.begin() if profiler else None
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        elapsed = time.perf_counter() - started
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        metrics.observe_request(request.method, route, status, elapsed, timings)
+        if profile_token:
+            profiler.end(profile_token, f"{request.method} {route}")
+    response.headers["Server-Timing"] = server_timing_header(timings + [("total", elapsed)])
+    return response
+
+async def save_upload(file: UploadFile, chunk_size: int = 1024 * 1024):
+    """
+    Copies the upload to a temporary file in fixed-size chunks so worker processes can
+    read it, hashing the bytes on the way. Returns (path, sha256 hex digest).
+    """
+    suffix = os.path.splitext(file.filename)[1]
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    digest = hashlib.sha256()
+    with os.fdopen(fd, "wb") as out:
+        while True:
+            chunk = await file.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+            out.write(chunk)
+    return path, digest.hexdigest()
 
 async def verify_token(authorization: str = Header(...)):
     if not authorization.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Invalid authorization header")
     token = authorization.split(" ")[1]
     try:
-        decoded_token = auth.verify_id_token(token)
+        with stage("verify_token"):
+            decoded_token = token_cache.verify(token)
         return decoded_token
     except Exception as e:
         raise HTTPException(status_code=401, detail=f"Token verification failed: {str(e)}")
@@ -64,111 +187,147 @@ async def verify_token(authorization: str = Header(...)):
 @app.post("/api/upload")
 async def upload_transactions(
     file: UploadFile = File(...), 
+    incremental: bool = False,
     user: dict = Depends(verify_token)
 ):
+    # Heavy pipeline modules are imported off the startup path (see services.warmup)
+    from services.pipeline import load_statement, StatementFormatError
+    from services.feature_engine import features_from_aggregates
+    from services.pdf_ingest import parse_pdf_parallel, PDF_WORKERS
+
     if not file.filename.endswith(('.csv', '.pdf')):
         raise HTTPException(status_code=400, detail="Only CSV or PDF files are supported")
     
+    with stage("save_upload"):
+        upload_path, content_digest = await save_upload(file)
     try:
-        content = await file.read()
-        
-        if file.filename.endswith('.csv'):
-            df = pd.read_csv(io.StringIO(content.decode('utf-8')))
+        # Identical bytes scored by the same model always give the same result.
+        # Incremental uploads depend on the stored history, so they are never cached.
+        kind = os.path.splitext(file.filename)[1].lower()
+        cache_key = ResultCache.make_key(content_digest, model_registry.current_version(), kind)
+        # The disk tier does file I/O; keep it off the event loop
+        cached = None if incremental else await asyncio.to_thread(result_cache.get, cache_key)
+
+        if cached is not None:
+            warnings = cached.get("warnings", [])
+            if SKIP_DUPLICATE_WRITES:
+                previous = await asyncio.to_thread(result_cache.get, ResultCache.owner_key(cache_key, user["uid"]))
+                if previous is not None:
+                    return {"id": previous["score_id"], "cached": True, "warnings": warnings, **cached["result"]}
+            prediction = Prediction.from_dict(cached["result"])
+            features = FeatureVector(cached["features"])
+            analytics = [CategoryShare.from_dict(a) for a in cached["analytics"]]
         else:
-            # Basic PDF Extraction
-            from pypdf import PdfReader
-            pdf = PdfReader(io.BytesIO(content))
-            text = ""
-            for page in pdf.pages:
-                text += page.extract_text() + "\n"
-            
-            # Simple heuristic for transactions: Look for lines with dates and amounts
-            # Format: Date, Description, Amount, Type, Category
-            lines = text.split('\n')
-            data = []
-            for line in lines:
-                parts = line.split()
-                # Very simple fuzzy logic: if line has enough parts and looks like it has a date
-                if len(parts) >= 4:
-                    data.append({
-                        "date": parts[0],
-                        "description": " ".join(parts[1:-3]),
-                        "amount": float(parts[-3].replace(',', '')),
-                        "type": parts[-2].upper(),
-                        "category": parts[-1].upper()
-                    })
+            # 1-2. Parse the statement and aggregate it off the event loop
+            parsed_pdf = None
+            if kind == ".pdf" and PDF_WORKERS > 1:
+                # Long PDFs: page ranges run as separate jobs on the same bounded executor
+                with stage("parse_pdf_pages"):
+                    parsed_pdf = await parse_pdf_parallel(upload_path, cpu_executor.run)
+            # Incremental uploads are aggregated per day, so the store can replace exactly the days they cover
+            parsed = await cpu_executor.run(load_statement, upload_path, file.filename, CSV_CHUNK_ROWS, parsed_pdf, incremental)
+            warnings = parsed[-1]
+            if parsed[0] == "features":
+                _, features, analytics, _ = parsed
+            else:
+                # Optionally merge into the user's stored history, then extract features & analytics
+                _, monthly, category_spend, _ = parsed
+                if incremental:
+                    with stage("feature_store_merge"):
+                        monthly, category_spend = await asyncio.to_thread(
+                            feature_store.merge, user["uid"], monthly, category_spend
+                        )
+                with stage("extract_features"):
+                    features, analytics = features_from_aggregates(monthly, category_spend)
             
-            if not data:
-                # Fallback for hackathon: if parsing fails, use synthetic data but mark as success 
-                # (to avoid user frustration) or raise error. Let's raise error for now.
-                raise Exception("Could not parse transactions from PDF. Ensure PDF is text-based.")
-            
-            df = pd.DataFrame(data)
-            
-        from services.feature_engine import map_columns, is_feature_dataframe, process_feature_dataframe
-        
-        # Check if it's already a feature-engineered dataframe (e.g., test_1.csv)
-        if is_feature_dataframe(df):
-            features, analytics = process_feature_dataframe(df)
-        else:
-            # Standard Transaction Data Path
-            col_map = map_columns(df.columns, assume_default=True)
-            if len(col_map) < 5:
-                missing = [c for c in ['date', 'description', 'amount', 'type', 'category'] if c not in col_map]
-                raise HTTPException(status_code=400, detail=f"Missing or unrecognized columns: {missing}. Found: {list(df.columns)}")
-
-            # 2. Extract features & analytics
-            features, analytics = extract_features(df)
-        
-        # 3. Model Inference
-        result = inference_service.predict(features)
+            # 3. Model Inference
+            prediction = await predict_batcher.predict(features)
         
         # 4. Save to Firestore
-        score_ref = db.collection("credibility_scores").document()
-        score_data = {
-            "uid": user["uid"], # Using 'user' from Depends(verify_token)
-            "score": result["score"],
-            "tier": result["tier"],
-            "probabilities": result["probabilities"],
-            "insights": result["insights"],
-            "features": features,
-            "analytics": analytics,
-            "filename": file.filename,
-            "created_at": datetime.utcnow()
-        }
-        # Sanitize data for Firestore (nuclear fix for NumPy types)
-        score_ref.set(to_native(score_data))
+        record = ScoreRecord(
+            uid=user["uid"], # Using 'user' from Depends(verify_token)
+            prediction=prediction,
+            features=features,
+            analytics=analytics,
+            filename=file.filename,
+            created_at=datetime.utcnow()
+        )
+        with stage("firestore_write"):
+            # Firestore commits and write-behind journal fsyncs both block; keep them off the event loop
+            score_id = await asyncio.to_thread(score_repository.add, record.to_document())
+        result = cached["result"] if cached is not None else prediction.to_dict()
+
+        if not incremental:
+            if cached is None:
+                # A worker still finishing a hot-swap may have scored with the previous version
+                if prediction.model_version is not None:
+                    cache_key = ResultCache.make_key(content_digest, prediction.model_version, kind)
+                await asyncio.to_thread(result_cache.put, cache_key, {
+                    "result": result,
+                    "features": list(features),
+                    "analytics": [share.to_dict() for share in analytics],
+                    "warnings": warnings
+                })
+            if SKIP_DUPLICATE_WRITES:
+                # Score ids are per user, so the shared entry never accumulates other uploaders' ids
+                await asyncio.to_thread(result_cache.put, ResultCache.owner_key(cache_key, user["uid"]), {"score_id": score_id})
         
         return {
-            "id": score_ref.id,
+            "id": score_id,
+            "cached": cached is not None,
+            "warnings": warnings,
             **result
         }
         
+    except HTTPException:
+        raise
+    except ExecutorSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except StatementFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        os.remove(upload_path)
+
+class BatchScoreRequest(BaseModel):
+    # N rows of the 18 signals in ALL_SIGNAL_NAMES order
+    features: List[List[float]]
+
+@app.post("/api/score/batch")
+async def score_batch(
+    request: BatchScoreRequest,
+    user: dict = Depends(verify_token)
+):
+    from services.pipeline import predict_feature_batch
+
+    if not request.features:
+        raise HTTPException(status_code=400, detail="No feature rows supplied")
+    if len({len(row) for row in request.features}) != 1:
+        raise HTTPException(status_code=400, detail="All feature rows must have the same length")
+
+    try:
+        results = await cpu_executor.run(predict_feature_batch, request.features)
+    except ExecutorSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return {"count": len(results), "results": [prediction.to_dict() for prediction in results]}
 
 @app.get("/api/dashboard")
 async def get_dashboard(user: dict = Depends(verify_token)):
     try:
-        # Get all scores for user and sort in memory to avoid indexing issues
-        docs = db.collection("credibility_scores") \
-            .where("uid", "==", user["uid"]) \
-            .stream()
-        
-        scores = []
-        for doc in docs:
-            d = doc.to_dict()
-            d["id"] = doc.id
-            scores.append(d)
-        
-        if not scores:
+        # Single read of the user's latest-score summary document
+        with stage("firestore_read"):
+            # Blocking read (plus a one-time backfill for legacy users); keep it off the event loop
+            latest_score = await asyncio.to_thread(score_repository.latest_for_user, user["uid"])
+        if latest_score is None:
             return {"message": "No scores found", "data": None}
-            
-        # Sort by created_at descending
-        scores.sort(key=lambda x: x.get("created_at", 0), reverse=True)
-        latest_score = scores[0]
         
         # Ensure created_at is serialized if it's a datetime/timestamp
         if hasattr(latest_score.get("created_at"), "isoformat"):
@@ -179,60 +338,213 @@ async def get_dashboard(user: dict = Depends(verify_token)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def certificate_cache_key(score_id: str, uid: str, user_name: str):
+    from services.certificate import TEMPLATE_VERSION
+    return CertificateCache.make_key(score_id, uid, user_name, TEMPLATE_VERSION)
+
 @app.get("/api/certificate/{score_id}")
-async def get_certificate(score_id: str, user: dict = Depends(verify_token)):
+async def get_certificate(score_id: str, user: dict = Depends(verify_token), if_none_match: Optional[str] = Header(None)):
+    from services.pipeline import render_certificate
+
+    user_name = user.get("name", "User")
+    cache_key = certificate_cache_key(score_id, user["uid"], user_name)
+    etag = f'"{cache_key[:32]}"'
+    headers = {
+        "Content-Disposition": f"attachment; filename=crediscout_certificate_{score_id}.pdf",
+        "ETag": etag,
+        "Cache-Control": "private, max-age=31536000, immutable"
+    }
     try:
-        doc_ref = db.collection("credibility_scores").document(score_id)
-        doc = doc_ref.get()
-        
-        if not doc.exists:
-            raise HTTPException(status_code=404, detail="Score not found")
-        
-        data = doc.to_dict()
-        if data["uid"] != user["uid"]:
-            raise HTTPException(status_code=403, detail="Unauthorized")
-        
-        pdf_bytes = generate_certificate_pdf(
-            user_name=user.get("name", "User"),
-            score=data["score"],
-            tier=data["tier"],
-            insights=data["insights"]
-        )
-        
-        return Response(
-            content=pdf_bytes,
-            media_type="application/pdf",
-            headers={"Content-Disposition": f"attachment; filename=crediscout_certificate_{score_id}.pdf"}
-        )
+        pdf_bytes = await asyncio.to_thread(certificate_cache.get, cache_key)
+        if pdf_bytes is None:
+            with stage("firestore_read"):
+                data = await asyncio.to_thread(score_repository.get, score_id)
+            if data is None:
+                raise HTTPException(status_code=404, detail="Score not found")
+
+            if data["uid"] != user["uid"]:
+                raise HTTPException(status_code=403, detail="Unauthorized")
+
+            issued_at = data.get("created_at")
+            pdf_bytes = await cpu_executor.run(
+                render_certificate,
+                user_name,
+                data["score"],
+                data["tier"],
+                data["insights"],
+                issued_at if isinstance(issued_at, datetime) else None
+            )
+            await asyncio.to_thread(certificate_cache.put, cache_key, pdf_bytes)
+        elif if_none_match == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+
+        headers["Content-Length"] = str(len(pdf_bytes))
+        return StreamingResponse(iter_chunks(pdf_bytes), media_type="application/pdf", headers=headers)
         
+    except HTTPException:
+        raise
+    except ExecutorSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+class CertificateExportRequest(BaseModel):
+    score_ids: Optional[List[str]] = None
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+
+CERTIFICATE_FIELDS = ["score", "tier", "insights", "created_at"]
+
+def _certificate_entry(score_id: str, data: dict, uid: str, user_name: str):
+    issued_at = data.get("created_at")
+    issued_at = issued_at if isinstance(issued_at, datetime) else None
+    return {
+        "name": f"crediscout_certificate_{score_id}.pdf",
+        "cache_key": certificate_cache_key(score_id, uid, user_name),
+        "args": (user_name, data["score"], data["tier"], data["insights"], issued_at),
+        "date": issued_at
+    }
+
+async def _export_entries(request: CertificateExportRequest, uid: str, user_name: str):
+    """
+    Yields archive entries lazily: by explicit ids, or by walking the user's history page by page.
+    Reads are batched and run in a thread so a large export never blocks the event loop.
+    """
+    if request.score_ids is not None:
+        score_ids = list(dict.fromkeys(request.score_ids))
+        for start in range(0, len(score_ids), CERTIFICATE_EXPORT_READ_BATCH):
+            chunk = score_ids[start:start + CERTIFICATE_EXPORT_READ_BATCH]
+            found = await asyncio.to_thread(score_repository.get_many, chunk, CERTIFICATE_FIELDS + ["uid"])
+            for score_id in chunk:
+                data = found.get(score_id)
+                if data is None:
+                    yield {"name": score_id, "error": "not found"}
+                elif data["uid"] != uid:
+                    yield {"name": score_id, "error": "unauthorized"}
+                else:
+                    yield _certificate_entry(score_id, data, uid, user_name)
+        return
+
+    cursor, exported = None, 0
+    while exported < CERTIFICATE_EXPORT_MAX:
+        page, cursor = await asyncio.to_thread(
+            score_repository.query_for_user,
+            uid,
+            limit=min(CERTIFICATE_EXPORT_READ_BATCH, CERTIFICATE_EXPORT_MAX - exported),
+            cursor=cursor,
+            since=request.since,
+            until=request.until,
+            fields=CERTIFICATE_FIELDS
+        )
+        for data in page:
+            yield _certificate_entry(data["id"], data, uid, user_name)
+        exported += len(page)
+        if cursor is None:
+            break
+
+@app.post("/api/certificates/export")
+async def export_certificates(request: CertificateExportRequest, user: dict = Depends(verify_token)):
+    """
+    Bulk certificate export: the caller's scores, by id or by created_at range, as a ZIP
+    streamed while certificates are rendered in parallel on the CPU workers.
+    """
+    from services.pipeline import render_certificate_batch
+
+    if request.score_ids is not None and len(request.score_ids) > CERTIFICATE_EXPORT_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {CERTIFICATE_EXPORT_MAX} certificates per export")
+
+    entries = _export_entries(request, user["uid"], user.get("name", "User"))
+    archive = stream_certificate_zip(
+        entries,
+        cpu_executor.run,
+        render_certificate_batch,
+        cache=certificate_cache,
+        batch_size=CERTIFICATE_EXPORT_BATCH,
+        max_pending=max(1, cpu_executor.max_workers)
+    )
+    return StreamingResponse(
+        archive,
+        media_type="application/zip",
+        headers={"Content-Disposition": "attachment; filename=crediscout_certificates.zip"}
+    )
+
+# Fields the frontend trend chart needs
+TREND_FIELDS = ["score", "tier", "created_at"]
+
 @app.get("/api/scores")
-async def get_all_scores(user: dict = Depends(verify_token)):
+async def get_all_scores(
+    view: str = "full",
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    order: str = "asc",
+    user: dict = Depends(verify_token)
+):
+    """
+    Score history for the trend chart. `view=trend` projects documents to score, tier
+    and timestamp. Without `limit` the full (filtered) history is returned as a list;
+    with `limit` one page is returned as {"items": [...], "next_cursor": id | null}.
+    """
+    if view not in ("full", "trend"):
+        raise HTTPException(status_code=400, detail="view must be 'full' or 'trend'")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order must be 'asc' or 'desc'")
+
     try:
-        docs = db.collection("credibility_scores") \
-            .where("uid", "==", user["uid"]) \
-            .stream()
-        
-        scores = []
-        for doc in docs:
-            data = doc.to_dict()
-            data["id"] = doc.id
+        with stage("firestore_read"):
+            # Streams up to the whole history when unpaginated; keep it off the event loop
+            scores, next_cursor = await asyncio.to_thread(
+                score_repository.query_for_user,
+                user["uid"],
+                limit=limit,
+                cursor=cursor,
+                since=since,
+                until=until,
+                descending=(order == "desc"),
+                fields=TREND_FIELDS if view == "trend" else None
+            )
+        for data in scores:
             if "created_at" in data and hasattr(data["created_at"], "isoformat"):
                 data["created_at"] = data["created_at"].isoformat()
-            scores.append(data)
-            
-        # Sort by created_at ascending for trend line
-        scores.sort(key=lambda x: x.get("created_at", ""), reverse=False)
-        return scores
-        
+
+        if limit is None:
+            return scores
+        return {"items": scores, "next_cursor": next_cursor}
+
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/health")
 def health_check():
-    return {"status": "healthy"}
+    health = {"status": "healthy", "workers": cpu_executor.stats(), "predict_batcher": predict_batcher.stats(), "result_cache": result_cache.stats(), "token_cache": token_cache.stats(), "certificate_cache": certificate_cache.stats(), "csv_layout_cache": csv_layout_stats(), "warmup": warmup.status(), "model": model_registry.status()}
+    if isinstance(score_repository, WriteBehindRepository):
+        health["score_writer"] = score_repository.stats()
+    return health
+
+@app.get("/api/ready")
+def readiness_check():
+    """Readiness probe: 503 until the background warmup has loaded the model into every worker."""
+    status = warmup.status()
+    if not status["ready"]:
+        return JSONResponse(status, status_code=503)
+    return status
+
+@app.get("/api/metrics")
+def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.on_event("startup")
+def start_warmup():
+    warmup.start()
+
+@app.on_event("shutdown")
+def shutdown_workers():
+    cpu_executor.shutdown()
+    if isinstance(score_repository, WriteBehindRepository):
+        score_repository.close()
 
 if __name__ == "__main__":
     import uvicorn
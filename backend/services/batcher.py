@@ -0,0 +1,96 @@
+import asyncio
+import time
+from services.executor import ExecutorSaturated
+from services.metrics import begin_request, record_stages
+
+class PredictionBatcher:
+    """
+    Coalesces concurrent single-applicant predictions into one batched model and
+    SHAP call. The first request to arrive opens a window of `max_wait_ms`; every
+    request arriving before it closes (up to `max_batch`) joins the same batch,
+    which runs as one CPU-executor job. Each caller gets its own Prediction, plus
+    the batch's stage timings and a `batch_wait` stage for the time it was held.
+    If a batched call fails, its rows are retried one at a time, so one bad feature
+    row (e.g. a ragged one) only fails its own caller.
+    With max_wait_ms=0 every call is sent on its own, as before.
+    """
+    def __init__(self, executor, max_batch: int = 32, max_wait_ms: float = 1.0):
+        self.executor = executor
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000
+        self.batches = 0
+        self.items = 0
+        self.largest = 0
+        self.split_batches = 0
+        self._pending = []
+        self._timer = None
+        # The loop only keeps weak references to tasks; hold running batches until they finish
+        self._tasks = set()
+
+    async def predict(self, features):
+        """Scores one feature vector with SHAP insights, sharing a model call with concurrent requests."""
+        from services.pipeline import predict_features, predict_explained_batch
+
+        if self.max_wait <= 0 or self.max_batch == 1:
+            return await self.executor.run(predict_features, features)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((features, future, time.perf_counter()))
+        if len(self._pending) >= self.max_batch:
+            self._flush(predict_explained_batch)
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush, predict_explained_batch)
+
+        result, timings = await future
+        record_stages(timings)
+        return result
+
+    def _flush(self, batch_fn):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._run(batch_fn, batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch_fn, batch):
+        self.batches += 1
+        self.items += len(batch)
+        self.largest = max(self.largest, len(batch))
+        started = time.perf_counter()
+        # The task has its own copy of the request context, so this collector is the batch's alone
+        timings = begin_request()
+        try:
+            results = await self.executor.run(batch_fn, [features for features, _, _ in batch])
+        except Exception as e:
+            if isinstance(e, ExecutorSaturated) or len(batch) == 1:
+                results = [e] * len(batch)
+            else:
+                # Find the offending rows by scoring each on its own
+                self.split_batches += 1
+                singles = await asyncio.gather(
+                    *(self.executor.run(batch_fn, [features]) for features, _, _ in batch),
+                    return_exceptions=True
+                )
+                results = [single if isinstance(single, BaseException) else single[0] for single in singles]
+        for (_, future, queued_at), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result((result, [("batch_wait", started - queued_at)] + timings))
+
+    def stats(self):
+        return {
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000,
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "largest_batch": self.largest,
+            "split_batches": self.split_batches
+        }
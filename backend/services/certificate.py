@@ -1,63 +1,83 @@
 from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
 from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+from xml.sax.saxutils import escape
 import io
 from datetime import datetime
 
-def generate_certificate_pdf(user_name: str, score: float, tier: str, insights: list):
+# Bump whenever the layout changes so cached PDFs are re-rendered
+TEMPLATE_VERSION = "2"
+
+class CertificateTemplate:
+    """
+    Certificate layout with styles, table styling and static paragraphs built once.
+    Styles are private copies of the reportlab samples, so rendering never mutates
+    the shared stylesheet. `render` only lays out the per-score content.
+    """
+    def __init__(self):
+        base = getSampleStyleSheet()
+        self.normal = base['Normal']
+        self.heading = base['Heading2']
+        self.title = ParagraphStyle('CertificateTitle', parent=base['Title'], textColor=colors.HexColor("#06b6d4"))
+        self.score = ParagraphStyle('CertificateScore', parent=base['Heading1'], alignment=1)
+        self.table_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#06b6d4")),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black)
+        ])
+        self.title_block = [Paragraph("CREDISCOUT CERTIFICATE", self.title), Spacer(1, 20)]
+        self.insights_heading = [Paragraph("Key Behavioral Insights:", self.heading), Spacer(1, 10)]
+        self.disclaimer = Paragraph(
+            "<i>Disclaimer: This certificate is based on behavioral transaction analysis and does not constitute an official credit score.</i>",
+            base['Italic']
+        )
+
+    def render(self, user_name: str, score: float, tier: str, insights: list, issued_at: datetime = None):
+        """Renders one certificate and returns the PDF bytes. Output is byte-stable for the same inputs."""
+        issued_at = issued_at or datetime.now()
+        buffer = io.BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=letter, invariant=1)
+
+        elements = list(self.title_block)
+        elements.append(Paragraph(f"<b>Name:</b> {escape(str(user_name))}", self.normal))
+        elements.append(Paragraph(f"<b>Date:</b> {issued_at.strftime('%Y-%m-%d %H:%M')}", self.normal))
+        elements.append(Spacer(1, 20))
+
+        elements.append(Paragraph(f"CREDIT READINESS SCORE: {score}/100", self.score))
+        elements.append(Paragraph(f"RISK TIER: {tier}", self.score))
+        elements.append(Spacer(1, 30))
+
+        elements.extend(self.insights_heading)
+        data = [["Feature", "Impact", "Status"]]
+        for insight in insights:
+            status = "Positive" if insight['impact'] > 0 else "Negative"
+            data.append([insight['feature'], f"{insight['impact']:.2f}", status])
+        table = Table(data, colWidths=[200, 100, 100])
+        table.setStyle(self.table_style)
+        elements.append(table)
+        elements.append(Spacer(1, 40))
+
+        elements.append(self.disclaimer)
+
+        doc.build(elements)
+        return buffer.getvalue()
+
+_template = None
+
+def get_template():
+    """Per-process CertificateTemplate, built on first use."""
+    global _template
+    if _template is None:
+        _template = CertificateTemplate()
+    return _template
+
+def generate_certificate_pdf(user_name: str, score: float, tier: str, insights: list, issued_at: datetime = None):
     """
     Generates a PDF certificate in memory and returns the bytes.
     """
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
-    styles = getSampleStyleSheet()
-    elements = []
-
-    # Title
-    title_style = styles['Title']
-    title_style.textColor = colors.HexColor("#06b6d4")
-    elements.append(Paragraph("CREDISCOUT CERTIFICATE", title_style))
-    elements.append(Spacer(1, 20))
-
-    # User Info
-    elements.append(Paragraph(f"<b>Name:</b> {user_name}", styles['Normal']))
-    elements.append(Paragraph(f"<b>Date:</b> {datetime.now().strftime('%Y-%m-%d %H:%M')}", styles['Normal']))
-    elements.append(Spacer(1, 20))
-
-    # Score
-    score_style = styles['Heading1']
-    score_style.alignment = 1 # Center
-    elements.append(Paragraph(f"CREDIT READINESS SCORE: {score}/100", score_style))
-    elements.append(Paragraph(f"RISK TIER: {tier}", score_style))
-    elements.append(Spacer(1, 30))
-
-    # Insights Table
-    elements.append(Paragraph("Key Behavioral Insights:", styles['Heading2']))
-    elements.append(Spacer(1, 10))
-    
-    data = [["Feature", "Impact", "Status"]]
-    for insight in insights:
-        status = "Positive" if insight['impact'] > 0 else "Negative"
-        data.append([insight['feature'], f"{insight['impact']:.2f}", status])
-        
-    table = Table(data, colWidths=[200, 100, 100])
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#06b6d4")),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-    elements.append(table)
-    elements.append(Spacer(1, 40))
-
-    # Disclaimer
-    elements.append(Paragraph("<i>Disclaimer: This certificate is based on behavioral transaction analysis and does not constitute an official credit score.</i>", styles['Italic']))
-
-    doc.build(elements)
-    buffer.seek(0)
-    return buffer.getvalue()
+    return get_template().render(user_name, score, tier, insights, issued_at=issued_at)
@@ -0,0 +1,119 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+class CertificateCache:
+    """
+    Cache of rendered certificate PDFs. A certificate never changes once its score is
+    stored, so keys are derived from the score id, the owner, the name printed on it
+    and the template version. Because the owner is part of the key, a hit also proves
+    ownership and the score document does not need to be read again.
+    Entries live in a bounded in-memory LRU and, when `disk_dir` is set, as .pdf files
+    shared by every worker on the host. As in services.result_cache, the disk tier is
+    trimmed every `evict_every` puts and get/put should run off the event loop when
+    `disk_dir` is set.
+    """
+    def __init__(self, max_entries: int = 128, disk_dir: str = None, max_disk_entries: int = 10000,
+                 evict_every: int = 64):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.max_disk_entries = max_disk_entries
+        self.evict_every = evict_every
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._puts_since_evict = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(score_id: str, uid: str, user_name: str, template_version: str):
+        return hashlib.sha256(f"{score_id}:{uid}:{user_name}:{template_version}".encode()).hexdigest()
+
+    def _disk_path(self, key: str):
+        return os.path.join(self.disk_dir, f"{key}.pdf")
+
+    def get(self, key: str):
+        """Returns the cached PDF bytes or None."""
+        with self._lock:
+            pdf = self._entries.get(key)
+            if pdf is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return pdf
+
+        if self.disk_dir:
+            try:
+                with open(self._disk_path(key), "rb") as f:
+                    pdf = f.read()
+            except OSError:
+                pdf = None
+            if pdf:
+                with self._lock:
+                    self.disk_hits += 1
+                self._remember(key, pdf)
+                return pdf
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, pdf: bytes):
+        self._remember(key, pdf)
+        if self.disk_dir:
+            # Write-then-rename so concurrent readers never see a partial file
+            tmp_path = self._disk_path(key) + f".{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(pdf)
+            os.replace(tmp_path, self._disk_path(key))
+            with self._lock:
+                self._puts_since_evict += 1
+                due = self._puts_since_evict >= self.evict_every
+                if due:
+                    self._puts_since_evict = 0
+            if due:
+                self._evict_disk()
+
+    def _remember(self, key: str, pdf: bytes):
+        with self._lock:
+            self._entries[key] = pdf
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _evict_disk(self):
+        files = [f for f in os.listdir(self.disk_dir) if f.endswith(".pdf")]
+        if len(files) <= self.max_disk_entries:
+            return
+        # Other workers evict from the same directory; skip files that are already gone
+        aged = []
+        for name in files:
+            path = os.path.join(self.disk_dir, name)
+            try:
+                aged.append((os.path.getmtime(path), path))
+            except OSError:
+                pass
+        aged.sort()
+        for _, path in aged[:len(aged) - self.max_disk_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses
+            }
+
+def iter_chunks(data: bytes, chunk_size: int = 64 * 1024):
+    """Yields a bytes payload in fixed-size slices for a StreamingResponse."""
+    view = memoryview(data)
+    for start in range(0, len(view), chunk_size):
+        yield bytes(view[start:start + chunk_size])
@@ -0,0 +1,113 @@
+import asyncio
+import zipfile
+from collections import deque
+from datetime import datetime
+
+from services.executor import ExecutorSaturated
+
+# Seconds an export waits for a free worker slot before giving up on a batch
+SATURATION_TIMEOUT = 60.0
+
+class _ZipSink:
+    """Write-only, unseekable file object; zipfile then streams entries with data descriptors."""
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+async def _batched(entries, batch_size: int):
+    batch = []
+    async for entry in entries:
+        batch.append(entry)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+async def _run_when_free(run, fn, *args):
+    """Submits to the CPU executor, backing off while it is saturated instead of failing the export."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + SATURATION_TIMEOUT
+    delay = 0.05
+    while True:
+        try:
+            return await run(fn, *args)
+        except ExecutorSaturated:
+            if loop.time() >= deadline:
+                raise
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 1.0)
+
+async def _render_batch(batch, run, render_batch, cache):
+    """Returns [(entry, pdf_bytes)] in input order, rendering only the cache misses in one worker call."""
+    # The cache's disk tier does file I/O; each batch's lookups and stores run in one thread hop
+    if cache is not None:
+        pdfs = await asyncio.to_thread(lambda: [cache.get(entry["cache_key"]) for entry in batch])
+    else:
+        pdfs = [None] * len(batch)
+    missing = [i for i, pdf in enumerate(pdfs) if pdf is None]
+    if missing:
+        rendered = await _run_when_free(run, render_batch, [batch[i]["args"] for i in missing])
+        for i, pdf in zip(missing, rendered):
+            pdfs[i] = pdf
+        if cache is not None:
+            await asyncio.to_thread(lambda: [cache.put(batch[i]["cache_key"], pdfs[i]) for i in missing])
+    return list(zip(batch, pdfs))
+
+async def stream_certificate_zip(entries, run, render_batch, cache=None, batch_size: int = 8, max_pending: int = 2):
+    """
+    Streams a ZIP of certificates while they are still being rendered.
+    `entries` is an async iterator of {"name", "cache_key", "args", "date"} dicts, or
+    {"name", "error"} for ids that could not be exported; it should do its reads off
+    the event loop. Batches of `batch_size` misses are rendered by
+    `render_batch` through `run` (the CPU executor), with at most `max_pending`
+    batches in flight, so memory stays bounded however long the export is.
+    Skipped ids are listed in errors.txt at the end of the archive.
+    """
+    sink = _ZipSink()
+    archive = zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED)
+    errors = []
+    pending = deque()
+
+    async def renderable():
+        async for entry in entries:
+            if "error" in entry:
+                errors.append(f"{entry['name']}: {entry['error']}")
+            else:
+                yield entry
+
+    def write(entry, pdf):
+        date = entry.get("date") or datetime.now()
+        info = zipfile.ZipInfo(entry["name"], date_time=date.timetuple()[:6])
+        archive.writestr(info, pdf)
+        return sink.drain()
+
+    try:
+        async for batch in _batched(renderable(), batch_size):
+            pending.append(asyncio.ensure_future(_render_batch(batch, run, render_batch, cache)))
+            while len(pending) >= max_pending:
+                for entry, pdf in await pending.popleft():
+                    yield write(entry, pdf)
+        while pending:
+            for entry, pdf in await pending.popleft():
+                yield write(entry, pdf)
+
+        if errors:
+            archive.writestr("errors.txt", "\n".join(errors) + "\n")
+        archive.close()
+        yield sink.drain()
+    finally:
+        # Client went away or rendering failed: drop batches nobody will read
+        for task in pending:
+            task.cancel()
@@ -0,0 +1,173 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from services.feature_engine import map_columns
+
+# Standard columns in the order a layout reads them
+STANDARD_COLUMNS = ['date', 'description', 'amount', 'type', 'category']
+
+# Date values checked against the guessed format before a layout is cached
+DATE_SAMPLE_ROWS = 1000
+
+def header_signature(path: str):
+    """Digest of a CSV's header line, or None for an empty file."""
+    with open(path, "rb") as f:
+        header = f.readline()
+    if not header.strip():
+        return None
+    return hashlib.sha256(header.strip().lstrip(b"\xef\xbb\xbf")).hexdigest()
+
+def guess_date_format(values: pd.Series):
+    """
+    The strftime format pandas would infer from the first date, if it parses every
+    sampled value; None when the column needs per-value inference.
+    """
+    sample = values.dropna().astype(str)[:DATE_SAMPLE_ROWS]
+    if sample.empty:
+        return None
+    from pandas.tseries.api import guess_datetime_format
+    fmt = guess_datetime_format(sample.iloc[0])
+    if fmt is None:
+        return None
+    parsed = pd.to_datetime(sample, format=fmt, errors="coerce")
+    # Offsets need pandas' per-value handling; keep those layouts on the default path
+    if parsed.isna().any() or parsed.dt.tz is not None:
+        return None
+    return fmt
+
+class CsvLayout:
+    """
+    How one bank's CSV export is read: which raw header holds each standard column
+    and the date format. Statements in a known layout are read with only those
+    columns, explicit dtypes (categoricals for the repetitive text columns) and a
+    fixed-format date parse, and come out already in the standard schema.
+    """
+    def __init__(self, columns: dict, date_format: str):
+        self.columns = columns
+        self.date_format = date_format
+
+    def read(self, path: str, chunk_rows: int):
+        """Iterates over typed chunks with standard column names and parsed dates."""
+        dtypes = {
+            self.columns['date']: 'category',
+            self.columns['description']: 'category',
+            self.columns['amount']: 'float64',
+            self.columns['type']: 'category',
+            self.columns['category']: 'category',
+        }
+        rename = {raw: std for std, raw in self.columns.items()}
+        with pd.read_csv(path, usecols=list(self.columns.values()), dtype=dtypes, chunksize=chunk_rows) as chunks:
+            for chunk in chunks:
+                chunk = chunk.rename(columns=rename)[STANDARD_COLUMNS]
+                # Statements repeat dates heavily; parse each distinct one once
+                dates = chunk['date'].cat
+                parsed = pd.to_datetime(dates.categories.astype(str), format=self.date_format)
+                chunk['date'] = pd.Series(
+                    np.append(parsed.to_numpy(), np.datetime64('NaT'))[dates.codes], index=chunk.index
+                )
+                yield chunk
+
+    def to_dict(self):
+        return {"columns": self.columns, "date_format": self.date_format}
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(data["columns"], data["date_format"])
+
+class LayoutCache:
+    """
+    Header-signature -> CsvLayout cache (LRU), learned from the first upload of each
+    layout. With `path` set, layouts are also kept in a JSON file so every worker
+    process and restart reuses them.
+    """
+    def __init__(self, max_entries: int = 256, path: str = None):
+        self.max_entries = max_entries
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._layouts = OrderedDict()
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            for signature, data in self._read_file().items():
+                self._layouts[signature] = CsvLayout.from_dict(data)
+
+    def get(self, signature: str):
+        with self._lock:
+            layout = self._layouts.get(signature) if signature else None
+            if layout is None and signature and self.path:
+                data = self._read_file().get(signature)
+                if data is not None:
+                    layout = self._layouts[signature] = CsvLayout.from_dict(data)
+            if layout is None:
+                self.misses += 1
+                return None
+            self._layouts.move_to_end(signature)
+            self.hits += 1
+            return layout
+
+    def learn(self, signature: str, df: pd.DataFrame):
+        """
+        Records the layout of a transaction CSV whose first chunk is `df`. Only
+        layouts matched by header name, with a numeric amount column and a fixed
+        date format are cached.
+        """
+        if not signature:
+            return None
+        col_map = map_columns(df.columns)
+        if len(col_map) < len(STANDARD_COLUMNS):
+            return None
+        # Amounts pandas could not read as numbers (e.g. "1,234.00") would fail the float64
+        # read and get the layout evicted and relearned on every upload
+        if not pd.api.types.is_numeric_dtype(df[col_map['amount']]):
+            return None
+        date_format = guess_date_format(df[col_map['date']])
+        if date_format is None:
+            return None
+        layout = CsvLayout({std: str(col_map[std]) for std in STANDARD_COLUMNS}, date_format)
+        with self._lock:
+            self._layouts[signature] = layout
+            while len(self._layouts) > self.max_entries:
+                self._layouts.popitem(last=False)
+            if self.path:
+                stored = self._read_file()
+                stored[signature] = layout.to_dict()
+                self._write_file(stored)
+        return layout
+
+    def evict(self, signature: str):
+        """Drops a layout that no longer reads its file (e.g. a different date format under the same header)."""
+        with self._lock:
+            self._layouts.pop(signature, None)
+            if self.path:
+                stored = self._read_file()
+                if stored.pop(signature, None) is not None:
+                    self._write_file(stored)
+
+    def _read_file(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _write_file(self, stored: dict):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(stored, f)
+        os.replace(tmp_path, self.path)
+
+    def stats(self):
+        return {"entries": len(self._layouts), "hits": self.hits, "misses": self.misses}
+
+# Singleton instance, per worker process (shared through CSV_LAYOUT_CACHE_PATH when set)
+csv_layouts = LayoutCache(
+    max_entries=int(os.environ.get("CSV_LAYOUT_CACHE_SIZE", 256)),
+    path=os.environ.get("CSV_LAYOUT_CACHE_PATH") or None
+)
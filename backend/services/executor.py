@@ -0,0 +1,104 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from services.metrics import run_timed, record_stages
+from services.warmup import warm_worker
+
+class ExecutorSaturated(Exception):
+    """Raised when the CPU pool already has its maximum number of jobs in flight."""
+    pass
+
+def _noop():
+    return None
+
+class CpuExecutor:
+    """
+    Runs CPU-bound stages (statement parsing, feature engineering, inference,
+    certificate rendering) in a process pool so they never block the event loop.
+    At most `max_workers + max_queue` jobs may be in flight; further submissions are
+    rejected immediately with ExecutorSaturated instead of queueing without bound.
+    With max_workers=0 jobs run on the default thread pool (useful for development).
+    `initializer` runs once in every worker process as it starts.
+    """
+    def __init__(self, max_workers: int, max_queue: int, initializer=None):
+        self.max_workers = max_workers
+        self.max_in_flight = max(1, max_workers) + max_queue
+        self.initializer = initializer
+        self.in_flight = 0
+        self.rejected = 0
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def _get_pool(self):
+        if self.max_workers == 0:
+            return None
+        with self._pool_lock:
+            if self._pool is None:
+                # spawn avoids forking the gRPC/Firebase threads of the API process
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=self.initializer
+                )
+            return self._pool
+
+    def warm(self):
+        """
+        Blocks until every worker process is started and initialized. In thread mode
+        the initializer runs once in the calling thread instead.
+        """
+        pool = self._get_pool()
+        if pool is None:
+            if self.initializer is not None:
+                self.initializer()
+            return
+        # Spawned pools start a process per submission while none is idle
+        futures = [pool.submit(_noop) for _ in range(self.max_workers)]
+        for future in futures:
+            future.result()
+
+    async def run(self, fn, *args):
+        """
+        Runs a picklable top-level function with the given arguments off the event loop.
+        Stage timings recorded inside the job are added to the calling request.
+        """
+        if self.in_flight >= self.max_in_flight:
+            self.rejected += 1
+            raise ExecutorSaturated(f"Server busy: {self.in_flight} jobs in flight")
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result, timings = await loop.run_in_executor(self._get_pool(), run_timed, fn, time.time(), *args)
+            record_stages(timings)
+            return result
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed); start a fresh pool for the next request
+            self.shutdown()
+            raise
+        finally:
+            self.in_flight -= 1
+
+    def stats(self):
+        return {
+            "workers": self.max_workers,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "rejected": self.rejected
+        }
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+# Singleton instance, sized from the environment
+cpu_executor = CpuExecutor(
+    max_workers=int(os.environ.get("CPU_WORKERS", os.cpu_count() or 1)),
+    max_queue=int(os.environ.get("CPU_QUEUE_SIZE", 8)),
+    initializer=warm_worker
+)
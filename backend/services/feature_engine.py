@@ -1,6 +1,14 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime
+from services.merchant_classifier import merchant_classifier
+from services.records import FeatureVector, CategoryShare
+
+# Wealth, luxury and OTT keyword families live in merchant_vocabulary.json
+COMMITMENT_CATEGORIES = ['RENT', 'EMI', 'UTILITIES']
+
+# Headers that identify the account/customer in a combined multi-account ledger
+ACCOUNT_COLUMN_SYNONYMS = ['account_id', 'account id', 'account', 'account number', 'account no', 'acct no', 'customer_id', 'customer id']
 
 def map_columns(available_cols, assume_default=False):
     """Fuzzy maps common banking headers to our standard schema."""
@@ -30,6 +38,46 @@ def map_columns(available_cols, assume_default=False):
             
     return final_map
 
+def find_account_column(available_cols):
+    """Returns the column that identifies the account in a multi-account ledger, or None."""
+    available_lower = [str(c).lower() for c in available_cols]
+    for possible in ACCOUNT_COLUMN_SYNONYMS:
+        if possible in available_lower:
+            return available_cols[available_lower.index(possible)]
+    return None
+
+def _upper(series: pd.Series):
+    """
+    Upper-cased text column. Categorical columns (from typed CSV ingestion) stay
+    categorical and are upper-cased once per category rather than once per row.
+    """
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        return series.astype(str).str.upper()
+    uniques, inverse = np.unique(series.cat.categories.astype(str).str.upper().to_numpy(dtype=object), return_inverse=True)
+    codes = series.cat.codes.to_numpy()
+    # Categories that differ only in case merge; missing values (code -1) stay missing
+    codes = np.where(codes >= 0, inverse[codes], -1)
+    return pd.Series(pd.Categorical.from_codes(codes, categories=uniques), index=series.index)
+
+def normalize_transactions(df: pd.DataFrame):
+    """Maps raw headers to the standard schema and normalizes types, case and month buckets."""
+    # Standardize columns
+    col_map = map_columns(df.columns, assume_default=True)
+    if len(col_map) < 5:
+        missing = [c for c in ['date', 'description', 'amount', 'type', 'category'] if c not in col_map]
+        raise ValueError(f"Missing required columns: {missing}")
+    
+    # Rename and normalize
+    df = df.rename(columns={v: k for k, v in col_map.items()})
+    if not pd.api.types.is_datetime64_any_dtype(df['date']):
+        df['date'] = pd.to_datetime(df['date'])
+    df['month_year'] = df['date'].dt.to_period('M')
+    df['description'] = _upper(df['description'])
+    df['category'] = _upper(df['category'])
+    df['type'] = _upper(df['type'])
+    df['amount'] = pd.to_numeric(df['amount'], errors='coerce').abs()
+    return df
+
 def is_feature_dataframe(df: pd.DataFrame):
     """Detects if the dataframe contains processed features instead of raw transactions."""
     feature_signature = ['income_regularity', 'avg_monthly_income', 'savings_rate']
@@ -42,60 +90,107 @@ def process_feature_dataframe(df: pd.DataFrame):
     # Extract the first row as the representative vector
     row = df.iloc[0].to_dict()
     
-    features = []
-    for name in ML_FEATURE_NAMES:
-        features.append(float(row.get(name, 0.0)))
-    
-    # Fill the remaining 6 post-processing signals
+    # The 12 model features, then the remaining 6 post-processing signals
     remaining = ['investment_regularity', 'ott_regularity', 'investment_count', 'luxury_ratio', 'stability_index', 'ott_count']
-    for name in remaining:
-        features.append(float(row.get(name, 0.0)))
+    features = FeatureVector(row.get(name, 0.0) for name in ML_FEATURE_NAMES + remaining)
         
     # Reconstruct synthetic categorical analysis for UI consistency
     avg_spend = float(row.get('avg_monthly_spend', 0.0))
     disc_ratio = float(row.get('discretionary_spending_ratio', 0.0))
     
     categorical_analysis = [
-        {
-            "category": "Fixed Commitments",
-            "amount": round(avg_spend * (1 - disc_ratio), 2),
-            "percentage": (1 - disc_ratio) * 100
-        },
-        {
-            "category": "Discretionary & Others",
-            "amount": round(avg_spend * disc_ratio, 2),
-            "percentage": disc_ratio * 100
-        }
+        CategoryShare("Fixed Commitments", round(avg_spend * (1 - disc_ratio), 2), (1 - disc_ratio) * 100),
+        CategoryShare("Discretionary & Others", round(avg_spend * disc_ratio, 2), disc_ratio * 100)
     ]
         
     return features, categorical_analysis
 
-def extract_features(df: pd.DataFrame):
+# Per-month aggregate columns that every feature can be derived from
+MONTHLY_AGGREGATE_COLUMNS = [
+    'txns', 'income', 'income_txns', 'spend', 'spend_txns', 'commits',
+    'rent', 'rent_txns', 'emi', 'emi_txns', 'wealth_txns', 'luxury', 'ott_txns'
+]
+
+def aggregate_transactions(df: pd.DataFrame, by_day: bool = False, account_col: str = None):
     """
-    Converts raw transaction dataframe into 15 behavioral features.
-    Now includes detection for SIPs, FDs, and OTT subscriptions.
+    Folds raw transactions into a compact per-month table (indexed by month_year)
+    and the debit spend per (month_year, category). Both are additive, so tables
+    built from separate chunks of a statement can be merged with `merge_aggregates`.
+    With by_day=True both are keyed by calendar day ('day') instead, for the feature
+    store; `monthly_from_daily` rolls them up to months.
+    With `account_col` set, both tables gain an outer 'account' level holding that
+    column's values, so one pass aggregates every account of a combined ledger.
     """
-    # Standardize columns
-    col_map = map_columns(df.columns, assume_default=True)
-    if len(col_map) < 5:
-        missing = [c for c in ['date', 'description', 'amount', 'type', 'category'] if c not in col_map]
-        raise ValueError(f"Missing required columns: {missing}")
-    
-    # Rename and normalize
-    df = df.rename(columns={v: k for k, v in col_map.items()})
-    df['date'] = pd.to_datetime(df['date'])
-    df['month_year'] = df['date'].dt.to_period('M')
-    df['description'] = df['description'].astype(str).str.upper()
-    df['category'] = df['category'].astype(str).str.upper()
-    df['type'] = df['type'].astype(str).str.upper()
-    df['amount'] = pd.to_numeric(df['amount'], errors='coerce').abs()
-    
+    if account_col is not None:
+        df = df.rename(columns={account_col: 'account'})
+    df = normalize_transactions(df)
+    bucket = 'month_year'
+    if by_day:
+        bucket = 'day'
+        df['day'] = df['date'].dt.to_period('D')
+    keys = ['account', bucket] if account_col is not None else [bucket]
+    signals = merchant_classifier.classify(df['description'])
+    amount = df['amount']
+
+    is_salary = df['category'] == 'SALARY'
+    is_debit = df['type'] == 'DEBIT'
+    is_rent = df['category'] == 'RENT'
+    is_emi = df['category'] == 'EMI'
+
+    rows = pd.DataFrame({
+        **{key: df[key] for key in keys},
+        'txns': 1,
+        'income': amount.where(is_salary, 0.0),
+        'income_txns': is_salary.astype(int),
+        'spend': amount.where(is_debit, 0.0),
+        'spend_txns': is_debit.astype(int),
+        'commits': amount.where(df['category'].isin(COMMITMENT_CATEGORIES), 0.0),
+        'rent': amount.where(is_rent, 0.0),
+        'rent_txns': is_rent.astype(int),
+        'emi': amount.where(is_emi, 0.0),
+        'emi_txns': is_emi.astype(int),
+        'wealth_txns': merchant_classifier.matches(signals, 'wealth').astype(int),
+        'luxury': amount.where(merchant_classifier.matches(signals, 'luxury'), 0.0),
+        'ott_txns': merchant_classifier.matches(signals, 'ott').astype(int),
+    })
+    monthly = rows.groupby(keys)[MONTHLY_AGGREGATE_COLUMNS].sum()
+    category_spend = df[is_debit].groupby(keys + ['category'], observed=True)['amount'].sum()
+    if isinstance(df['category'].dtype, pd.CategoricalDtype):
+        # Plain string labels, so aggregates from either ingestion path merge and persist alike
+        category_spend.index = category_spend.index.set_levels(
+            category_spend.index.levels[-1].astype(str), level='category'
+        )
+    return monthly, category_spend
+
+def merge_aggregates(monthly, category_spend, other_monthly, other_category_spend):
+    """Adds two sets of aggregates produced by `aggregate_transactions`."""
+    if monthly is None:
+        return other_monthly, other_category_spend
+    monthly = monthly.add(other_monthly, fill_value=0)
+    category_spend = category_spend.add(other_category_spend, fill_value=0)
+    return monthly, category_spend
+
+def monthly_from_daily(daily: pd.DataFrame, daily_categories: pd.Series):
+    """Rolls day-level aggregates (`aggregate_transactions(df, by_day=True)`) up to months."""
+    monthly = daily.groupby(daily.index.asfreq('M').rename('month_year')).sum()
+    days = daily_categories.index.get_level_values('day')
+    category_spend = daily_categories.groupby(
+        [days.asfreq('M').rename('month_year'), daily_categories.index.get_level_values('category')]
+    ).sum()
+    return monthly, category_spend
+
+def features_from_aggregates(monthly: pd.DataFrame, category_spend: pd.Series):
+    """
+    Computes the 18 behavioral features and categorical analysis from the
+    per-month table built by `aggregate_transactions`.
+    """
+    monthly = monthly.sort_index()
+
     # Monthly aggregations
-    monthly_income = df[df['category'] == 'SALARY'].groupby('month_year')['amount'].sum()
-    monthly_spend = df[df['type'] == 'DEBIT'].groupby('month_year')['amount'].sum()
+    monthly_income = monthly.loc[monthly['income_txns'] > 0, 'income']
+    monthly_spend = monthly.loc[monthly['spend_txns'] > 0, 'spend']
     
-    all_months = df['month_year'].unique()
-    num_months = len(all_months)
+    num_months = len(monthly)
     
     # 1. income_regularity
     income_regularity = len(monthly_income) / num_months if num_months > 0 else 0
@@ -104,15 +199,12 @@ def extract_features(df: pd.DataFrame):
     avg_monthly_income = monthly_income.mean() if not monthly_income.empty else 0
     
     # 3. Investment & Wealth Detection (Beyond just SIP)
-    wealth_keywords = ['SIP', 'MUTUAL FUND', 'NIPPON', 'HDFC MF', 'INVEST', 'FD ', 'RD ', 'LIQUID FUND', 'INSURANCE', 'LIC ']
-    wealth_txns = df[df['description'].str.contains('|'.join(wealth_keywords), na=False)]
-    investment_count = len(wealth_txns)
-    investment_regularity = len(wealth_txns['month_year'].unique()) / num_months if num_months > 0 else 0
+    investment_count = monthly['wealth_txns'].sum()
+    wealth_months = int((monthly['wealth_txns'] > 0).sum())
+    investment_regularity = wealth_months / num_months if num_months > 0 else 0
     
     # 4. Lifestyle & Discretionary Trends
-    luxury_keywords = ['APPLE', 'IPHONE', 'ZARA', 'GUCCI', 'STARBUCKS', 'DINING', 'CLUB', 'BAR ', 'RESORT']
-    luxury_txns = df[df['description'].str.contains('|'.join(luxury_keywords), na=False)]
-    luxury_ratio = luxury_txns['amount'].sum() / (monthly_spend.sum() + 1e-6)
+    luxury_ratio = monthly['luxury'].sum() / (monthly_spend.sum() + 1e-6)
     
     # 5. Stability & Liquidity
     # Estimate min balance per month (simplified proxy: total income - total spend)
@@ -120,9 +212,8 @@ def extract_features(df: pd.DataFrame):
     stability_index = monthly_net.mean() / (monthly_spend.mean() + 1e-6) if not monthly_spend.empty else 0
     
     # 6. OTT Detection (Subscriptions)
-    ott_keywords = ['NETFLIX', 'SPOTIFY', 'PRIME VIDEO', 'DISNEY', 'HOTSTAR', 'YOUTUBE PREM', 'SONY LIV']
-    ott_txns = df[df['description'].str.contains('|'.join(ott_keywords), na=False)]
-    ott_regularity = len(ott_txns['month_year'].unique()) / num_months if num_months > 0 else 0
+    ott_count = monthly['ott_txns'].sum()
+    ott_regularity = int((monthly['ott_txns'] > 0).sum()) / num_months if num_months > 0 else 0
     
     # 5. Income Growth Trend
     if len(monthly_income) > 1:
@@ -136,8 +227,7 @@ def extract_features(df: pd.DataFrame):
     avg_monthly_spend = monthly_spend.mean() if not monthly_spend.empty else 0
     
     # 7. Discretionary Spending Ratio
-    commits_list = ['RENT', 'EMI', 'UTILITIES']
-    commits = df[df['category'].isin(commits_list)]['amount'].sum()
+    commits = monthly['commits'].sum()
     total_spend_val = monthly_spend.sum()
     discretionary_spend = total_spend_val - commits
     discretionary_spending_ratio = discretionary_spend / (total_spend_val + 1e-6)
@@ -147,10 +237,10 @@ def extract_features(df: pd.DataFrame):
     savings_rate = (total_income - total_spend_val) / (total_income + 1e-6)
     
     # 9. Rent & EMI Ratios
-    total_rent = df[df['category'] == 'RENT']['amount'].sum()
+    total_rent = monthly['rent'].sum()
     rent_ratio = (total_rent / num_months) / (avg_monthly_income + 1e-6) if num_months > 0 else 0
     
-    total_emi = df[df['category'] == 'EMI']['amount'].sum()
+    total_emi = monthly['emi'].sum()
     emi_ratio = (total_emi / num_months) / (avg_monthly_income + 1e-6) if num_months > 0 else 0
     
     # 10. Commitment Fulfillment
@@ -158,13 +248,13 @@ def extract_features(df: pd.DataFrame):
     actual_commits = 0
     if total_rent > 0:
         expected_commits += num_months
-        actual_commits += len(df[df['category'] == 'RENT']['month_year'].unique())
+        actual_commits += int((monthly['rent_txns'] > 0).sum())
     if total_emi > 0:
         expected_commits += num_months
-        actual_commits += len(df[df['category'] == 'EMI']['month_year'].unique())
+        actual_commits += int((monthly['emi_txns'] > 0).sum())
     if investment_count > 0:
         expected_commits += num_months
-        actual_commits += len(wealth_txns['month_year'].unique())
+        actual_commits += wealth_months
         
     commitment_fulfillment_rate = actual_commits / (expected_commits + 1e-6) if expected_commits > 0 else 1.0
     
@@ -173,39 +263,96 @@ def extract_features(df: pd.DataFrame):
     net_cashflow_stability = (income_regularity + commitment_fulfillment_rate + investment_regularity) / (1 + spending_volatility)
     
     # 12. Final Features List (18 features)
-    features = [
-        float(income_regularity),
-        float(avg_monthly_income),
-        float(income_growth_trend),
-        float(avg_monthly_spend),
-        float(discretionary_spending_ratio),
-        float(savings_rate),
-        float(rent_ratio),
-        float(emi_ratio),
-        float(commitment_fulfillment_rate),
-        float(expected_commits - actual_commits), # missed_commitments_count
-        float(spending_volatility),
-        float(net_cashflow_stability),
-        float(investment_regularity),
-        float(ott_regularity),
-        float(investment_count),
-        float(luxury_ratio),
-        float(stability_index),
-        float(len(ott_txns))
-    ]
+    features = FeatureVector([
+        income_regularity,
+        avg_monthly_income,
+        income_growth_trend,
+        avg_monthly_spend,
+        discretionary_spending_ratio,
+        savings_rate,
+        rent_ratio,
+        emi_ratio,
+        commitment_fulfillment_rate,
+        expected_commits - actual_commits, # missed_commitments_count
+        spending_volatility,
+        net_cashflow_stability,
+        investment_regularity,
+        ott_regularity,
+        investment_count,
+        luxury_ratio,
+        stability_index,
+        ott_count
+    ])
     
     # Categorical Analysis
-    category_spend = df[df['type'] == 'DEBIT'].groupby('category')['amount'].sum().abs().to_dict()
+    category_spend = category_spend.groupby(level='category').sum().abs().to_dict()
     total_debit = sum(category_spend.values())
     
-    categorical_analysis = []
-    for cat, amt in category_spend.items():
-        categorical_analysis.append({
-            "category": cat.title(),
-            "amount": float(amt),
-            "percentage": float((amt / total_debit * 100)) if total_debit > 0 else 0
-        })
-    
-    categorical_analysis = sorted(categorical_analysis, key=lambda x: x['amount'], reverse=True)
+    categorical_analysis = [
+        CategoryShare(cat.title(), amt, (amt / total_debit * 100) if total_debit > 0 else 0)
+        for cat, amt in category_spend.items()
+    ]
+    categorical_analysis.sort(key=lambda x: x.amount, reverse=True)
 
     return features, categorical_analysis
+
+def extract_features(df: pd.DataFrame):
+    """
+    Converts raw transaction dataframe into 18 behavioral features.
+    Now includes detection for SIPs, FDs, and OTT subscriptions.
+    """
+    monthly, category_spend = aggregate_transactions(df)
+    return features_from_aggregates(monthly, category_spend)
+
+def extract_features_streaming(chunks):
+    """
+    Same as `extract_features`, but consumes an iterable of transaction DataFrame
+    chunks (e.g. `pd.read_csv(..., chunksize=...)`). Each chunk is folded into the
+    running per-month aggregates and then discarded, so peak memory is bounded by
+    the chunk size rather than the statement size.
+    """
+    return features_from_aggregates(*aggregate_transactions_streaming(chunks))
+
+def aggregate_transactions_streaming(chunks, by_day: bool = False):
+    """Folds an iterable of transaction DataFrame chunks into one set of aggregates."""
+    monthly, category_spend = None, None
+    for chunk in chunks:
+        monthly, category_spend = merge_aggregates(monthly, category_spend, *aggregate_transactions(chunk, by_day))
+    if monthly is None:
+        raise ValueError("No transactions found in upload")
+    return monthly, category_spend
+
+def extract_features_batch(df: pd.DataFrame, account_col: str = None):
+    """
+    Computes the 18 behavioral features for every account in a combined ledger.
+    The ledger is normalized and aggregated in one pass, grouped by account; each
+    account's compact monthly table then goes through `features_from_aggregates`,
+    so the values are exactly those of `extract_features` run once per account.
+    Returns (features, categorical_analysis): an accounts x 18 DataFrame indexed by
+    account id and a dict of account id -> categorical analysis.
+    """
+    from services.inference import ALL_SIGNAL_NAMES
+
+    if account_col is None:
+        account_col = find_account_column(df.columns)
+    if account_col is None or account_col not in df.columns:
+        raise ValueError(f"Missing account identifier column. Expected one of: {ACCOUNT_COLUMN_SYNONYMS}")
+
+    account_ids = pd.Index(df[account_col].drop_duplicates(), name='account')
+    monthly, category_spend = aggregate_transactions(df, account_col=account_col)
+    monthly_by_account = {account: table.droplevel('account') for account, table in monthly.groupby(level='account')}
+    spend_by_account = {
+        account: spend.droplevel('account') for account, spend in category_spend.groupby(level='account')
+    }
+    # Accounts without a single dated transaction aggregate to empty tables, as on their own
+    no_months = monthly.droplevel('account').iloc[:0]
+    no_spend = category_spend.droplevel('account').iloc[:0]
+
+    rows = []
+    categorical_analysis = {}
+    for account in account_ids:
+        features, categorical_analysis[account] = features_from_aggregates(
+            monthly_by_account.get(account, no_months), spend_by_account.get(account, no_spend)
+        )
+        rows.append(features)
+    return pd.DataFrame(rows, index=account_ids, columns=ALL_SIGNAL_NAMES, dtype=float), categorical_analysis
@@ -0,0 +1,164 @@
+from datetime import datetime
+
+# pandas and the feature engine are imported on first use to keep API start-up light
+class MonthlyFeatureStore:
+    """
+    Persists each user's transaction aggregates in Firestore, per calendar day, so that
+    a new upload only has to aggregate its own transactions. Features are then computed
+    from the monthly roll-up of the compact table instead of the full transaction history.
+
+    Days are sharded into one document per calendar month, so no document grows with
+    the length of a user's history (collection `monthly_aggregates`, one document per uid):
+        monthly_aggregates/{uid}/aggregate_months/2024-01:
+            {"days": {"2024-01-31": {<aggregate columns>..., "categories": {"RENT": 15000.0}}},
+             "updated_at": datetime}
+    Documents written before sharding hold the whole history on the uid document, as
+    "days" and, before day-level storage, "months" keyed "2024-01". They are still read,
+    and the next merge moves them into month shards; a legacy month is kept as the
+    shard's "month" entry until an upload touching that month replaces it whole.
+    """
+    def __init__(self, db, collection: str = "monthly_aggregates", shard_collection: str = "aggregate_months"):
+        self.db = db
+        self.collection = collection
+        self.shard_collection = shard_collection
+
+    def _doc(self, uid: str):
+        return self.db.collection(self.collection).document(uid)
+
+    def _shards(self, uid: str):
+        return self._doc(uid).collection(self.shard_collection)
+
+    def load(self, uid: str):
+        """Returns the stored history as (monthly, category_spend), or (None, None) for a new user."""
+        days, months = self._read(uid)
+        if not days and not months:
+            return None, None
+        return self.from_document(days, months)
+
+    def _read(self, uid: str, transaction=None):
+        """The user's stored (days, legacy months), from the month shards and any pre-shard document."""
+        parent = self._doc(uid).get(transaction=transaction)
+        legacy = (parent.to_dict() or {}) if parent.exists else {}
+        shards = {doc.id: doc.to_dict() or {} for doc in self._shards(uid).stream(transaction=transaction)}
+        return self.from_shards(shards, legacy)
+
+    def merge(self, uid: str, daily: "pd.DataFrame", daily_categories: "pd.Series"):
+        """
+        Merges a new upload's day-level aggregates (`aggregate_transactions(df, by_day=True)`)
+        into the user's stored history and returns the merged history as monthly aggregates.
+        The upload replaces exactly the stored days between its first and last transaction,
+        so re-uploading overlapping statements never double counts, and a month split across
+        two statements keeps the days each one contributed.
+        The read-modify-write runs in a Firestore transaction, so concurrent uploads for one
+        user are retried in turn instead of overwriting each other's days. Only the month
+        shards whose contents changed are written.
+        """
+        from firebase_admin import firestore
+
+        parent_ref = self._doc(uid)
+        shards_ref = self._shards(uid)
+        upload_days = self.to_document(daily, daily_categories)
+
+        @firestore.transactional
+        def write(transaction):
+            parent = parent_ref.get(transaction=transaction)
+            legacy = (parent.to_dict() or {}) if parent.exists else {}
+            stored = {doc.id: doc.to_dict() or {} for doc in shards_ref.stream(transaction=transaction)}
+            days, months = self.replace_range(*self.from_shards(stored, legacy), upload_days)
+
+            now = datetime.utcnow()
+            shards = self.to_shards(days, months)
+            for month, shard in shards.items():
+                previous = stored.get(month, {})
+                if shard.get("days") != previous.get("days") or shard.get("month") != previous.get("month"):
+                    # Each shard is rewritten whole; a merge write would keep replaced days
+                    transaction.set(shards_ref.document(month), {**shard, "updated_at": now})
+            for month in stored.keys() - shards.keys():
+                transaction.delete(shards_ref.document(month))
+            # Drops the pre-shard maps once their days live in shards
+            transaction.set(parent_ref, {"updated_at": now})
+            return days, months
+
+        days, months = write(self.db.transaction())
+        return self.from_document(days, months)
+
+    @staticmethod
+    def replace_range(days: dict, months: dict, upload_days: dict):
+        """
+        Returns (days, legacy months) with every stored day from the upload's first to
+        last day replaced by the upload's days. Keys are ISO dates, so they compare as strings.
+        """
+        if not upload_days:
+            return dict(days), dict(months)
+        first, last = min(upload_days), max(upload_days)
+        merged = {day: data for day, data in days.items() if not first <= day <= last}
+        merged.update(upload_days)
+        kept_months = {month: data for month, data in months.items() if not first[:7] <= month <= last[:7]}
+        return merged, kept_months
+
+    @staticmethod
+    def to_shards(days: dict, months: dict):
+        """Groups days (and legacy month entries) into {"YYYY-MM": {"days": {...}, "month": {...}}}."""
+        shards = {}
+        for day, data in days.items():
+            shards.setdefault(day[:7], {"days": {}})["days"][day] = data
+        for month, data in months.items():
+            shards.setdefault(month, {"days": {}})["month"] = data
+        return shards
+
+    @staticmethod
+    def from_shards(shards: dict, legacy: dict = None):
+        """Flattens month shards and a pre-shard document back into (days, legacy months)."""
+        legacy = legacy or {}
+        days = dict(legacy.get("days", {}))
+        months = dict(legacy.get("months", {}))
+        for month, shard in shards.items():
+            days.update(shard.get("days", {}))
+            if shard.get("month"):
+                months[month] = shard["month"]
+        return days, months
+
+    @staticmethod
+    def to_document(daily: "pd.DataFrame", daily_categories: "pd.Series"):
+        from services.feature_engine import MONTHLY_AGGREGATE_COLUMNS
+
+        days = {}
+        for period, row in daily.iterrows():
+            days[str(period)] = {col: float(row[col]) for col in MONTHLY_AGGREGATE_COLUMNS}
+            days[str(period)]["categories"] = {}
+        for (period, category), amount in daily_categories.items():
+            if str(period) in days:
+                days[str(period)]["categories"][str(category)] = float(amount)
+        return days
+
+    @staticmethod
+    def from_document(days: dict, months: dict = None):
+        """Rolls stored days (and any legacy month entries) up to (monthly, category_spend)."""
+        import pandas as pd
+        from services.feature_engine import MONTHLY_AGGREGATE_COLUMNS
+
+        # Both kinds of entry are bucketed by their month; days of one month add up
+        entries = [(pd.Period(key[:7], freq='M'), data) for key, data in list(days.items()) + list((months or {}).items())]
+        monthly = pd.DataFrame(
+            [[data.get(col, 0.0) for col in MONTHLY_AGGREGATE_COLUMNS] for _, data in entries],
+            index=pd.PeriodIndex([period for period, _ in entries], freq='M', name='month_year'),
+            columns=MONTHLY_AGGREGATE_COLUMNS,
+            dtype=float
+        ).groupby(level='month_year').sum().sort_index()
+
+        category_items = [
+            (period, category, amount)
+            for period, data in entries
+            for category, amount in data.get("categories", {}).items()
+        ]
+        category_spend = pd.Series(
+            [amount for _, _, amount in category_items],
+            index=pd.MultiIndex.from_tuples(
+                [(period, category) for period, category, _ in category_items], names=['month_year', 'category']
+            ) if category_items else pd.MultiIndex.from_tuples([], names=['month_year', 'category']),
+            dtype=float,
+            name='amount'
+        )
+        if category_items:
+            category_spend = category_spend.groupby(level=['month_year', 'category']).sum()
+        return monthly, category_spend
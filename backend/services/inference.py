@@ -1,8 +1,13 @@
-import joblib
 import pandas as pd
 import shap
 import os
 import numpy as np
+import threading
+import traceback
+from collections import OrderedDict
+from services.records import Insight, Prediction
+from services.metrics import stage
+from services.model_registry import model_registry
 
 # Feature names in order used during training
 # Feature names used during training (Strict 12)
@@ -19,124 +24,299 @@ ALL_SIGNAL_NAMES = ML_FEATURE_NAMES + [
     "luxury_ratio", "stability_index", "ott_count"
 ]
 
+# Display labels of the model features, as shown in insights
+INSIGHT_LABELS = [name.replace("_", " ").title() for name in ML_FEATURE_NAMES]
+
 class InferenceService:
-    def __init__(self, model_path: str):
-        self.model = joblib.load(model_path)
-        self._explainer = None
+    """
+    Scores applicants with one model version. `forest` is the version's compiled
+    forest (None falls back to XGBoost's own predict path); `version` is recorded
+    on every Prediction.
+    """
+    def __init__(self, model, forest=None, version: str = None, explain_mode: str = "exact",
+                 cache_size: int = 1024, cache_decimals: int = 4):
+        self.model = model
+        self.forest = forest
+        self.version = version
+
+        # SHAP: "exact" TreeSHAP or the cheaper "approximate" (Saabas) attribution
+        if explain_mode not in ("exact", "approximate"):
+            raise ValueError(f"Unknown explain mode: {explain_mode}")
+        self.explain_mode = explain_mode
+        self.cache_size = cache_size
+        self.cache_decimals = cache_decimals
+        self._explanations = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # Built eagerly so no request pays the explainer construction cost
+        self._explainer = self._build_explainer()
+
+    def predict_proba(self, X_ml: np.ndarray):
+        """Class probabilities for an N x 12 matrix of ML features."""
+        if self.forest is not None:
+            return self.forest.predict_proba(X_ml)
+        return self.model.predict_proba(pd.DataFrame(X_ml, columns=ML_FEATURE_NAMES))
     
+    def _build_explainer(self):
+        try:
+            # Explain using the 12 ML features
+            return shap.TreeExplainer(self.model)
+        except Exception:
+            try:
+                dummy_data = pd.DataFrame([[0.5] * len(ML_FEATURE_NAMES)], columns=ML_FEATURE_NAMES)
+                return shap.TreeExplainer(self.model, dummy_data)
+            except Exception:
+                traceback.print_exc()
+                return "DISABLED"
+
     @property
     def explainer(self):
-        if self._explainer is None:
-            try:
-                # Explain using the 12 ML features
-                self._explainer = shap.TreeExplainer(self.model)
-            except Exception as e:
-                try:
-                    dummy_data = pd.DataFrame([[0.5] * len(ML_FEATURE_NAMES)], columns=ML_FEATURE_NAMES)
-                    self._explainer = shap.TreeExplainer(self.model, dummy_data)
-                except:
-                    self._explainer = "DISABLED"
         return self._explainer
     
-    def predict(self, features: list):
-        # features list is 18 elements from feature_engine
-        if len(features) < len(ALL_SIGNAL_NAMES):
-            features = features + [0.0] * (len(ALL_SIGNAL_NAMES) - len(features))
-            
-        # Separate ML features (index 0-11) for the model
-        ml_features = features[:12]
-        X_ml = pd.DataFrame([ml_features], columns=ML_FEATURE_NAMES)
-        
-        # Base ML Prediction
-        probs = self.model.predict_proba(X_ml)[0]
-        base_score = (probs[2] * 1.0 + probs[1] * 0.5) * 100
-        
+    def _post_process(self, probs: np.ndarray, features: np.ndarray):
+        """
+        Applies the multi-dimensional penalty/bonus rules, saturation and tiering
+        to whole arrays. `probs` is N x 3, `features` is N x 18.
+        """
+        base_score = (probs[:, 2] * 1.0 + probs[:, 1] * 0.5) * 100
+
         # --- Multi-Dimensional Post-Processing ---
         # Using full 18 signals
-        missed_commits = features[9]
-        wealth_reg = features[12]
-        wealth_count = features[14]
-        luxury_ratio = features[15]
-        stability_idx = features[16]
-        ott_reg = features[13]
-        
-        penalty = 0
-        bonus = 0
-        
+        missed_commits = features[:, 9]
+        wealth_reg = features[:, 12]
+        wealth_count = features[:, 14]
+        luxury_ratio = features[:, 15]
+        stability_idx = features[:, 16]
+        ott_reg = features[:, 13]
+
+        penalty = np.zeros(len(features))
+        bonus = np.zeros(len(features))
+
         # 1. Wealth & Consistency (Beyond SIP)
-        if wealth_count > 0:
-            if wealth_reg < 0.8:
-                penalty += (1.0 - wealth_reg) * 35 # Heavy penalty for broken investment patterns
-            else:
-                bonus += 12 # Reward for wealth creation discipline
-                
+        has_wealth = wealth_count > 0
+        penalty += np.where(has_wealth & (wealth_reg < 0.8), (1.0 - wealth_reg) * 35, 0) # Heavy penalty for broken investment patterns
+        bonus += np.where(has_wealth & (wealth_reg >= 0.8), 12, 0) # Reward for wealth creation discipline
+
         # 2. Lifestyle Bias (Luxury spending)
-        if luxury_ratio > 0.3: # >30% on luxury
-            penalty += (luxury_ratio - 0.3) * 50 # Exponential-like penalty for high luxury
-            
+        penalty += np.where(luxury_ratio > 0.3, (luxury_ratio - 0.3) * 50, 0) # Exponential-like penalty for high luxury
+
         # 3. Stability & Liquidity (Emergency Fund proxy)
-        if stability_idx > 0.4: # Saving 40% of spend value as net monthly
-            bonus += 8
-        elif stability_idx < 0: # Living beyond means
-            penalty += 10
-            
+        bonus += np.where(stability_idx > 0.4, 8, 0) # Saving 40% of spend value as net monthly
+        penalty += np.where(stability_idx < 0, 10, 0) # Living beyond means
+
         # 4. Habitual Commits (OTT/Subs)
-        if ott_reg > 0.8:
-            bonus += 4 # Reward for "small" discipline
-            
+        bonus += np.where(ott_reg > 0.8, 4, 0) # Reward for "small" discipline
+
         # 5. Hard Penalties
         penalty += missed_commits * 8
-        
+
         # --- Distribution Recalibration ---
         raw_final = (base_score * 0.8) - penalty + bonus
-        
+
         # Apply CIBIL-like saturation (Harder to get 100)
-        if raw_final > 85:
-            raw_final = 85 + (raw_final - 85) * 0.25
-            
-        final_score = max(0, min(100, raw_final))
-        
+        raw_final = np.where(raw_final > 85, 85 + (raw_final - 85) * 0.25, raw_final)
+
+        final_score = np.clip(raw_final, 0, 100)
+
         # Tiers
-        if final_score > 85: tier = "STABLE"
-        elif final_score > 60: tier = "MODERATE"
-        else: tier = "RISKY"
-            
-        # SHAP Insights (Top 5)
-        explanations = []
-        if self.explainer != "DISABLED":
-            try:
-                shap_raw = self.explainer.shap_values(X_ml)
-                target_base = shap_raw[2] if isinstance(shap_raw, list) else shap_raw
-                arr = np.squeeze(np.array(target_base))
-                target_shap = arr.flatten()[:len(ML_FEATURE_NAMES)]
-                for name, val in zip(ML_FEATURE_NAMES, target_shap):
-                    impact = float(val)
-                    explanations.append({
-                        "feature": name.replace("_", " ").title(),
-                        "impact": impact,
-                        "positive": impact > 0
-                    })
-            except: pass
-            
-        explanations = sorted(explanations, key=lambda x: abs(x['impact']), reverse=True)
-        
+        tiers = np.select(
+            [final_score > 85, final_score > 60],
+            ["STABLE", "MODERATE"],
+            default="RISKY"
+        )
+        return final_score, tiers
+
+    def _shap_values(self, X_ml: np.ndarray):
+        """Raw SHAP values of the STABLE class for an N x 12 matrix, one call for the whole batch."""
+        X_df = pd.DataFrame(X_ml, columns=ML_FEATURE_NAMES)
+        if self.explain_mode == "approximate":
+            shap_raw = self.explainer.shap_values(X_df, approximate=True)
+        else:
+            shap_raw = self.explainer.shap_values(X_df)
+        target_base = shap_raw[2] if isinstance(shap_raw, list) else shap_raw
+        arr = np.array(target_base)
+        # Multi-class outputs come back as (N, features, classes); keep the STABLE class
+        if arr.ndim == 3:
+            arr = arr[:, :, 2]
+        return arr.reshape(len(X_ml), -1)[:, :len(ML_FEATURE_NAMES)]
+
+    def explain_batch(self, X_ml: np.ndarray):
+        """
+        Returns the top-5 SHAP insights for every row of an N x 12 matrix, or empty
+        lists if SHAP is unavailable. Explanations are cached (LRU) on the rounded
+        feature vector; only cache misses are sent to the explainer, in one batch.
+        """
+        X_ml = np.asarray(X_ml, dtype=np.float64)
+        explanations = [[] for _ in range(len(X_ml))]
+        if self.explainer == "DISABLED":
+            return explanations
+
+        keys = [tuple(row) for row in np.round(X_ml, self.cache_decimals)]
+        misses = []
+        with self._cache_lock:
+            for i, key in enumerate(keys):
+                cached = self._explanations.get(key)
+                if cached is None:
+                    misses.append(i)
+                else:
+                    self._explanations.move_to_end(key)
+                    explanations[i] = cached
+            self.cache_hits += len(keys) - len(misses)
+            self.cache_misses += len(misses)
+
+        if not misses:
+            return explanations
+
+        try:
+            values = self._shap_values(X_ml[misses])
+        except Exception:
+            traceback.print_exc()
+            return explanations
+
+        with self._cache_lock:
+            for i, row in zip(misses, values):
+                top = np.argsort(-np.abs(row), kind="stable")[:5]
+                explanations[i] = [Insight(INSIGHT_LABELS[j], row[j]) for j in top]
+                if self.cache_size > 0:
+                    self._explanations[keys[i]] = explanations[i]
+                    self._explanations.move_to_end(keys[i])
+            while len(self._explanations) > self.cache_size:
+                self._explanations.popitem(last=False)
+        return explanations
+
+    def clear_explanation_cache(self):
+        """Drops every cached explanation (e.g. so a benchmark measures the explainer itself)."""
+        with self._cache_lock:
+            self._explanations.clear()
+
+    def explanation_cache_stats(self):
+        return {
+            "mode": self.explain_mode,
+            "size": len(self._explanations),
+            "capacity": self.cache_size,
+            "hits": self.cache_hits,
+            "misses": self.cache_misses
+        }
+
+    def _to_matrix(self, features):
+        X = np.asarray(features, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.ndim != 2 or X.shape[1] > len(ALL_SIGNAL_NAMES):
+            raise ValueError(f"Expected an N x {len(ALL_SIGNAL_NAMES)} feature matrix, got shape {X.shape}")
+        # Rows from older extractors may be short; pad the post-processing signals with zeros
+        if X.shape[1] < len(ALL_SIGNAL_NAMES):
+            X = np.pad(X, ((0, 0), (0, len(ALL_SIGNAL_NAMES) - X.shape[1])))
+        return X
+
+    def predict_batch(self, features, explain: bool = False):
+        """
+        Scores N applicants with a single model call.
+        `features` is an N x 18 matrix (rows in ALL_SIGNAL_NAMES order).
+        Returns one Prediction record per row, identical to what `predict` returns.
+        SHAP insights are only computed when `explain` is set.
+        """
+        X = self._to_matrix(features)
+        if len(X) == 0:
+            return []
+
+        # Separate ML features (index 0-11) for the model
+        X_ml = X[:, :len(ML_FEATURE_NAMES)]
+
+        # Base ML Prediction
+        with stage("predict_proba"):
+            probs = self.predict_proba(X_ml)
+        final_scores, tiers = self._post_process(probs, X)
+        if explain:
+            with stage("shap"):
+                explanations = self.explain_batch(X_ml)
+        else:
+            explanations = [[] for _ in range(len(X))]
+
+        scores = np.round(final_scores, 2)
+        signals = np.round(X[:, [12, 15, 16]] * 100, 1)
+        return [
+            Prediction(
+                scores[i], tiers[i], probs[i, 0], probs[i, 1], probs[i, 2], explanations[i],
+                signals[i, 0], signals[i, 1], signals[i, 2], X[i, 9], self.version
+            )
+            for i in range(len(X))
+        ]
+
+    def predict(self, features: list):
+        # features list is 18 elements from feature_engine
+        # Single-row scoring shares the vectorized path so both always agree
+        return self.predict_batch([features], explain=True)[0]
+
+class ActiveModel:
+    """
+    The InferenceService of this process's active model version. When the registry's
+    CURRENT pointer moves, the new version is loaded and warmed on a background
+    thread while `get()` keeps returning the old service; the swap is then a single
+    reference assignment. Calls already running on the old service finish on it,
+    so no request is dropped or sees a half-loaded model.
+    """
+    def __init__(self, registry, factory):
+        self.registry = registry
+        self.factory = factory
+        self.swaps = 0
+        self.last_error = None
+        self._service = None
+        self._loading = None
+        self._failed = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        version = self.registry.current_version()
+        service = self._service
+        if service is None:
+            with self._lock:
+                if self._service is None:
+                    self._service = self._load(version)
+                return self._service
+        if version != service.version and version != self._failed and self._loading is None:
+            with self._lock:
+                if self._loading is None:
+                    self._loading = version
+                    threading.Thread(target=self._swap, args=(version,), name="model-swap", daemon=True).start()
+        return service
+
+    def _load(self, version: str):
+        service = self.factory(self.registry.load(version))
+        # Warm the new version (first predict, SHAP explainer) before it takes traffic
+        service.predict([0.0] * len(ALL_SIGNAL_NAMES))
+        return service
+
+    def _swap(self, version: str):
+        try:
+            self._service = self._load(version)
+            self.swaps += 1
+        except Exception as e:
+            # Keep serving the old version; a later activation retries
+            traceback.print_exc()
+            self._failed = version
+            self.last_error = f"{version}: {e}"
+        finally:
+            self._loading = None
+
+    def status(self):
         return {
-            "score": float(round(final_score, 2)),
-            "tier": tier,
-            "probabilities": {
-                "risky": float(probs[0]),
-                "moderate": float(probs[1]),
-                "stable": float(probs[2])
-            },
-            "insights": explanations[:5],
-            "signals": {
-                "wealth_discipline": float(round(wealth_reg * 100, 1)),
-                "lifestyle_overhead": float(round(luxury_ratio * 100, 1)),
-                "stability_buffer": float(round(stability_idx * 100, 1)),
-                "missed_signals": int(missed_commits)
-            }
+            "version": self._service.version if self._service is not None else None,
+            "loading": self._loading,
+            "swaps": self.swaps,
+            "last_error": self.last_error
         }
 
-# Singleton instance
-model_path = os.path.join(os.path.dirname(__file__), "..", "models", "model.pkl")
-inference_service = InferenceService(model_path)
+# Per-process active model, loaded on first use from the shared registry
+active_model = ActiveModel(model_registry, lambda artifact: InferenceService(
+    artifact.model,
+    forest=artifact.forest,
+    version=artifact.version,
+    explain_mode=os.environ.get("SHAP_MODE", "exact"),
+    cache_size=int(os.environ.get("SHAP_CACHE_SIZE", 1024))
+))
+
+def get_inference_service():
+    """The InferenceService to score with now; hold on to it for the whole request."""
+    return active_model.get()
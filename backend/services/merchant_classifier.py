@@ -0,0 +1,90 @@
+import json
+import os
+import re
+import numpy as np
+import pandas as pd
+
+try:
+    import ahocorasick
+except ImportError:  # pyahocorasick is optional; precompiled regexes are used without it
+    ahocorasick = None
+
+class MerchantClassifier:
+    """
+    Labels transaction descriptions with every matching signal family in one pass.
+    Each description is classified into a bitmask with one bit per family.
+    With pyahocorasick installed, all patterns are compiled into a single C
+    Aho-Corasick automaton, so a scan costs the same however many patterns and
+    families the vocabulary holds. Without it each family is one precompiled
+    alternation regex.
+    """
+    def __init__(self, vocabulary: dict):
+        self.families = list(vocabulary.keys())
+        self.flags = {family: 1 << i for i, family in enumerate(self.families)}
+
+        # Pattern -> bitmask of every family listing it
+        patterns = {}
+        for family, words in vocabulary.items():
+            for word in words:
+                word = str(word).upper()
+                if word:
+                    patterns[word] = patterns.get(word, 0) | self.flags[family]
+
+        self._automaton = None
+        self._regexes = []
+        if ahocorasick is not None and patterns:
+            self._automaton = ahocorasick.Automaton()
+            for word, flag in patterns.items():
+                self._automaton.add_word(word, flag)
+            self._automaton.make_automaton()
+        elif ahocorasick is None:
+            for family in self.families:
+                words = [word for word, flag in patterns.items() if flag & self.flags[family]]
+                if words:
+                    self._regexes.append((self.flags[family], re.compile("|".join(map(re.escape, words)))))
+
+    @classmethod
+    def from_file(cls, path: str):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def classify_text(self, text: str) -> int:
+        """Returns the bitmask of families whose patterns occur in the (upper-cased) text."""
+        mask = 0
+        if self._automaton is not None:
+            for _, flag in self._automaton.iter(text):
+                mask |= flag
+            return mask
+        for flag, regex in self._regexes:
+            if regex.search(text):
+                mask |= flag
+        return mask
+
+    def classify(self, descriptions: pd.Series) -> np.ndarray:
+        """
+        Classifies a column of upper-cased descriptions. Statements repeat the same
+        merchants heavily, so each distinct description is scanned only once.
+        """
+        codes, uniques = pd.factorize(descriptions)
+        if self._automaton is not None or not self._regexes:
+            unique_masks = np.fromiter((self.classify_text(str(u)) for u in uniques), dtype=np.int64, count=len(uniques))
+        else:
+            # Regex fallback: one vectorized scan of the distinct descriptions per family
+            texts = pd.Series(uniques).astype(str)
+            unique_masks = np.zeros(len(uniques), dtype=np.int64)
+            for flag, regex in self._regexes:
+                unique_masks[texts.str.contains(regex).to_numpy(dtype=bool)] |= flag
+        # Missing descriptions (code -1) never match
+        unique_masks = np.append(unique_masks, 0)
+        return unique_masks[codes]
+
+    def matches(self, signals: np.ndarray, family: str) -> np.ndarray:
+        """Boolean mask of rows labelled with the given family."""
+        return (signals & self.flags[family]) != 0
+
+# Singleton instance, vocabulary path overridable for custom merchant lists
+vocabulary_path = os.environ.get(
+    "MERCHANT_VOCABULARY_PATH",
+    os.path.join(os.path.dirname(__file__), "merchant_vocabulary.json")
+)
+merchant_classifier = MerchantClassifier.from_file(vocabulary_path)
@@ -0,0 +1,211 @@
+import bisect
+import contextvars
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+
+# Latency buckets in seconds, shared by every histogram
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# (stage, seconds) pairs recorded while serving the current request
+_stage_timings = contextvars.ContextVar("stage_timings", default=None)
+
+@contextmanager
+def stage(name: str):
+    """Times a block as pipeline stage `name` of the current request (a no-op outside one)."""
+    timings = _stage_timings.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.append((name, time.perf_counter() - start))
+
+def begin_request():
+    """Starts collecting stage timings for the current request and returns the list they go into."""
+    timings = []
+    _stage_timings.set(timings)
+    return timings
+
+def record_stages(timings: list):
+    """Adds stage timings measured elsewhere (e.g. in a worker process) to the current request."""
+    current = _stage_timings.get()
+    if current is not None:
+        current.extend(timings)
+
+def run_timed(fn, submitted_at: float, *args):
+    """
+    Worker-side wrapper used by the CPU executor: runs `fn` with its own stage collector
+    and returns (result, timings), including the time the job waited for a worker.
+    """
+    timings = [("executor_wait", max(0.0, time.time() - submitted_at))]
+    token = _stage_timings.set(timings)
+    try:
+        with stage(fn.__name__):
+            result = fn(*args)
+    finally:
+        _stage_timings.reset(token)
+    return result, timings
+
+def server_timing_header(timings: list):
+    """Formats stage timings as a Server-Timing header, summing repeated stages."""
+    totals = {}
+    for name, seconds in timings:
+        totals[name] = totals.get(name, 0.0) + seconds
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in totals.items())
+
+class Histogram:
+    """Cumulative-bucket latency histogram per label value, in Prometheus layout."""
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._series = {}
+
+    def observe(self, label, value: float):
+        series = self._series.get(label)
+        if series is None:
+            series = self._series[label] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def counts(self):
+        """{label: number of observations}."""
+        return {label: series[2] for label, series in self._series.items()}
+
+    def render(self, name: str, label_names: tuple):
+        lines = []
+        for label, (counts, total, count) in sorted(self._series.items()):
+            labels = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(label_names, label))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f"{name}_sum{{{labels}}} {total:.6f}")
+            lines.append(f"{name}_count{{{labels}}} {count}")
+        return lines
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class MetricsRegistry:
+    """
+    Request and pipeline-stage latency metrics for the API process, rendered in the
+    Prometheus text exposition format. `gauges` are callables returning
+    {metric_name: value} that are sampled at scrape time (executor and cache stats).
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stage_seconds = Histogram()
+        self.request_seconds = Histogram()
+        self.requests = Counter()
+        self.gauges = []
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float, timings: list):
+        with self._lock:
+            self.requests[(method, route, str(status))] += 1
+            self.request_seconds.observe((method, route), seconds)
+            for name, stage_seconds in timings:
+                self.stage_seconds.observe((name,), stage_seconds)
+
+    def stage_counts(self):
+        """{stage: number of times it was recorded}, including stages run in worker processes."""
+        with self._lock:
+            return {label[0]: count for label, count in self.stage_seconds.counts().items()}
+
+    def render(self):
+        with self._lock:
+            lines = ["# HELP crediscout_requests_total HTTP requests served.", "# TYPE crediscout_requests_total counter"]
+            for (method, route, status), count in sorted(self.requests.items()):
+                lines.append(f'crediscout_requests_total{{method="{method}",route="{_escape(route)}",status="{status}"}} {count}')
+            lines += ["# HELP crediscout_request_seconds HTTP request latency.", "# TYPE crediscout_request_seconds histogram"]
+            lines += self.request_seconds.render("crediscout_request_seconds", ("method", "route"))
+            lines += ["# HELP crediscout_stage_seconds Latency of individual pipeline stages.", "# TYPE crediscout_stage_seconds histogram"]
+            lines += self.stage_seconds.render("crediscout_stage_seconds", ("stage",))
+        for gauge in self.gauges:
+            for name, value in gauge().items():
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {float(value)}")
+        return "\n".join(lines) + "\n"
+
+class SamplingProfiler:
+    """
+    Opt-in stack sampler for slow requests. While any request is in flight a
+    background thread samples the serving thread's stack every `interval` seconds;
+    when a request takes longer than `threshold_ms`, the samples taken during it are
+    written to `out_dir` as folded stacks (flamegraph.pl / speedscope input).
+    Samples cover the API process only; time spent in CPU workers shows up in the
+    stage breakdown instead. Concurrent requests on the same thread share samples.
+    """
+    def __init__(self, threshold_ms: float, out_dir: str, interval: float = 0.005, max_samples: int = 50000):
+        self.threshold = threshold_ms / 1000
+        self.out_dir = out_dir
+        self.interval = interval
+        self._samples = deque(maxlen=max_samples)
+        self._threads = Counter()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._sampler = None
+        self.dumps = 0
+        os.makedirs(out_dir, exist_ok=True)
+
+    def begin(self):
+        thread_id = threading.get_ident()
+        with self._lock:
+            self._threads[thread_id] += 1
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+                self._sampler.start()
+        self._wake.set()
+        return thread_id, time.perf_counter()
+
+    def end(self, token, label: str):
+        thread_id, started = token
+        finished = time.perf_counter()
+        with self._lock:
+            self._threads[thread_id] -= 1
+            if self._threads[thread_id] <= 0:
+                del self._threads[thread_id]
+            if finished - started < self.threshold:
+                return None
+            stacks = Counter(stack for t, tid, stack in self._samples if tid == thread_id and started <= t <= finished)
+        name = re.sub(r"[^A-Za-z0-9_.-]+", "_", label).strip("_")
+        path = os.path.join(self.out_dir, f"{time.strftime('%Y%m%dT%H%M%S')}_{int((finished - started) * 1000)}ms_{name}.folded")
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        self.dumps += 1
+        return path
+
+    def _run(self):
+        while True:
+            with self._lock:
+                targets = set(self._threads)
+                if not targets:
+                    # Cleared under the lock so a concurrent begin() cannot be missed
+                    self._wake.clear()
+            if not targets:
+                self._wake.wait()
+                continue
+            frames = sys._current_frames()
+            now = time.perf_counter()
+            samples = []
+            for thread_id in targets:
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                if stack:
+                    samples.append((now, thread_id, ";".join(reversed(stack))))
+            del frames
+            with self._lock:
+                self._samples.extend(samples)
+            time.sleep(self.interval)
@@ -0,0 +1,224 @@
+"""
+Versioned model artifacts shared by every API and worker process on a host.
+
+Layout under the registry root:
+    versions/{version}/manifest.json   version, source file, publish time, feature count
+    versions/{version}/model.ubj       XGBoost model (SHAP explanations and fallback path)
+    versions/{version}/forest/*.npy    compiled forest arrays, memory-mapped by every process
+    CURRENT                            name of the active version
+
+A version id is the first 12 hex digits of the SHA-256 of the published file (the
+id result-cache keys and stored scores carry). Publishing never touches the active version;
+`activate` flips CURRENT atomically and running processes pick it up on their next
+poll (see services.inference.ActiveModel).
+
+    python -m services.model_registry publish ../ml_pipeline/models/model.pkl --activate
+    python -m services.model_registry activate 3f2a9c1b7d4e
+    python -m services.model_registry list
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from datetime import datetime, timezone
+from services.result_cache import file_digest
+
+DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(__file__), "..", "models", "model.pkl")
+
+# Tolerance for the compiled forest's probabilities against XGBoost's at publish time
+PARITY_ATOL = 1e-5
+
+logger = logging.getLogger(__name__)
+
+class ModelArtifact:
+    """One loaded model version: the XGBoost classifier and its compiled forest (None if it failed parity)."""
+    def __init__(self, version: str, manifest: dict, model, forest):
+        self.version = version
+        self.manifest = manifest
+        self.model = model
+        self.forest = forest
+
+class ModelRegistry:
+    """
+    File-based model registry. `current_version()` re-reads the CURRENT pointer at
+    most every `poll_interval` seconds. If the registry has no active version yet,
+    the first call publishes and activates `bootstrap_path` (the bundled model.pkl).
+    """
+    def __init__(self, root: str, bootstrap_path: str = None, poll_interval: float = 5.0):
+        self.root = root
+        self.bootstrap_path = bootstrap_path
+        self.poll_interval = poll_interval
+        self._current = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _version_dir(self, version: str):
+        return os.path.join(self.root, "versions", version)
+
+    def publish(self, model_path: str, activate: bool = False):
+        """
+        Converts a trained model (joblib .pkl or XGBoost .json/.ubj) into a registry
+        version and returns its id. Publishing the same file twice is a no-op.
+        """
+        import joblib
+        import xgboost as xgb
+        from services.tree_engine import CompiledForest
+
+        version = file_digest(model_path)[:12]
+        final_dir = self._version_dir(version)
+        if not os.path.exists(os.path.join(final_dir, "manifest.json")):
+            if model_path.endswith((".pkl", ".joblib")):
+                model = joblib.load(model_path)
+            else:
+                model = xgb.XGBClassifier()
+                model.load_model(model_path)
+            num_features = int(model.n_features_in_)
+
+            # Built in a private directory and renamed, so readers never see a partial version
+            tmp_dir = os.path.join(self.root, "versions", f".{version}-{os.getpid()}-{threading.get_ident()}")
+            os.makedirs(tmp_dir, exist_ok=True)
+            try:
+                model.save_model(os.path.join(tmp_dir, "model.ubj"))
+                compile_error = None
+                try:
+                    forest = CompiledForest.from_booster(model.get_booster())
+                    error = forest.parity_error(model, num_features)
+                    if error <= PARITY_ATOL:
+                        forest.save(os.path.join(tmp_dir, "forest"))
+                    else:
+                        compile_error = f"parity check failed: max probability difference {error:.3g} > {PARITY_ATOL:g}"
+                except Exception as e:
+                    compile_error = f"{type(e).__name__}: {e}"
+                if compile_error is not None:
+                    # Still publishable: inference falls back to XGBoost's predict_proba
+                    logger.warning("Model %s published without a compiled forest (%s)", version, compile_error)
+                manifest = {
+                    "version": version,
+                    "source": os.path.basename(model_path),
+                    "published_at": datetime.now(timezone.utc).isoformat(),
+                    "num_features": num_features,
+                    "compiled": compile_error is None,
+                    "compile_error": compile_error
+                }
+                with open(os.path.join(tmp_dir, "manifest.json"), "w", encoding="utf-8") as f:
+                    json.dump(manifest, f, indent=2)
+                try:
+                    os.rename(tmp_dir, final_dir)
+                except OSError:
+                    # Another process published the same version first
+                    if not os.path.exists(os.path.join(final_dir, "manifest.json")):
+                        raise
+            finally:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+        if activate:
+            self.activate(version)
+        return version
+
+    def activate(self, version: str):
+        """Makes `version` the active model for every process polling this registry."""
+        if not os.path.exists(os.path.join(self._version_dir(version), "manifest.json")):
+            raise ValueError(f"Unknown model version: {version}")
+        with self._lock:
+            self._write_pointer(version)
+            self._current = version
+            self._checked_at = time.monotonic()
+
+    def _write_pointer(self, version: str):
+        pointer = os.path.join(self.root, "CURRENT")
+        tmp_path = f"{pointer}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(version)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, pointer)
+
+    def _read_pointer(self):
+        try:
+            with open(os.path.join(self.root, "CURRENT"), "r", encoding="utf-8") as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def current_version(self):
+        """The active version id, publishing and activating the bootstrap model if nothing is active."""
+        now = time.monotonic()
+        if self._current is not None and now - self._checked_at < self.poll_interval:
+            return self._current
+        with self._lock:
+            version = self._read_pointer()
+            if version is None:
+                if self.bootstrap_path is None:
+                    raise RuntimeError(f"No active model in registry {self.root}")
+                version = self.publish(self.bootstrap_path)
+                # Another process may have activated a version while this one published
+                if self._read_pointer() is None:
+                    self._write_pointer(version)
+                version = self._read_pointer()
+            self._current = version
+            self._checked_at = now
+        return version
+
+    def load(self, version: str):
+        """Loads a version: the classifier from model.ubj and the memory-mapped compiled forest."""
+        import xgboost as xgb
+        from services.tree_engine import CompiledForest
+
+        version_dir = self._version_dir(version)
+        with open(os.path.join(version_dir, "manifest.json"), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        model = xgb.XGBClassifier()
+        model.load_model(os.path.join(version_dir, "model.ubj"))
+        forest = CompiledForest.load(os.path.join(version_dir, "forest")) if manifest["compiled"] else None
+        return ModelArtifact(version, manifest, model, forest)
+
+    def versions(self):
+        """Manifests of every published version, oldest first."""
+        manifests = []
+        versions_dir = os.path.join(self.root, "versions")
+        for name in os.listdir(versions_dir) if os.path.isdir(versions_dir) else []:
+            path = os.path.join(versions_dir, name, "manifest.json")
+            if not name.startswith(".") and os.path.exists(path):
+                with open(path, "r", encoding="utf-8") as f:
+                    manifests.append(json.load(f))
+        return sorted(manifests, key=lambda m: m["published_at"])
+
+    def status(self):
+        """Active version as last read (without publishing anything), for health checks."""
+        return {"active": self._current or self._read_pointer(), "root": self.root}
+
+# Singleton instance; every process on the host shares the same directory
+model_registry = ModelRegistry(
+    os.environ.get("MODEL_REGISTRY_DIR", os.path.join(os.path.dirname(__file__), "..", "models", "registry")),
+    bootstrap_path=os.environ.get("MODEL_PATH", DEFAULT_MODEL_PATH),
+    poll_interval=float(os.environ.get("MODEL_POLL_SECONDS", 5))
+)
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish and activate model versions.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    publish = commands.add_parser("publish", help="add a trained model (.pkl, .json or .ubj) as a new version")
+    publish.add_argument("model_path")
+    publish.add_argument("--activate", action="store_true", help="also make it the active version")
+    activate = commands.add_parser("activate", help="switch every running process to a published version")
+    activate.add_argument("version")
+    commands.add_parser("list", help="show published versions")
+    args = parser.parse_args()
+
+    if args.command == "publish":
+        version = model_registry.publish(args.model_path, activate=args.activate)
+        print(f"Published {version}" + (" (active)" if args.activate else ""))
+    elif args.command == "activate":
+        model_registry.activate(args.version)
+        print(f"Activated {args.version}")
+    else:
+        active = model_registry.status()["active"]
+        for manifest in model_registry.versions():
+            marker = "*" if manifest["version"] == active else " "
+            reason = f" ({manifest['compile_error']})" if manifest.get("compile_error") else ""
+            print(f"{marker} {manifest['version']}  {manifest['published_at']}  {manifest['source']}  compiled={manifest['compiled']}{reason}")
+
+if __name__ == "__main__":
+    main()
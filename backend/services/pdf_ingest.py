@@ -0,0 +1,146 @@
+import asyncio
+import os
+import re
+from typing import NamedTuple, List
+import pandas as pd
+
+# Date, Description..., Amount, Type, Category (description may be empty)
+LINE_GRAMMAR = re.compile(
+    r"^(?P<date>\S+)\s+(?:(?P<description>.*?)\s+)?(?P<amount>\S+)\s+(?P<type>\S+)\s+(?P<category>\S+)\s*$"
+)
+DATE_TOKEN = re.compile(r"^(\d{1,4}[-/.]\d{1,2}[-/.]\d{1,4}|\d{1,2}[-/.]?[A-Za-z]{3}[-/.]?\d{2,4})$")
+AMOUNT_TOKEN = re.compile(r"^[-+]?[\d,]*\.?\d+$")
+
+# Pages parsed per CPU-executor job; smaller statements are parsed in one job
+PAGES_PER_TASK = int(os.environ.get("PDF_PAGES_PER_TASK", 25))
+# Page ranges of one upload parsed concurrently on the shared CPU executor (1 = in the upload's own job)
+PDF_WORKERS = int(os.environ.get("PDF_WORKERS", 1))
+
+class TransactionRecord(NamedTuple):
+    date: str
+    description: str
+    amount: float
+    type: str
+    category: str
+
+class LineError(NamedTuple):
+    page: int
+    line: int
+    text: str
+    reason: str
+
+class ParsedStatement(NamedTuple):
+    records: List[TransactionRecord]
+    errors: List[LineError]
+    pages: int
+
+    def to_dataframe(self):
+        return pd.DataFrame(self.records, columns=list(TransactionRecord._fields))
+
+def parse_line(text: str):
+    """
+    Parses one statement line. Returns a TransactionRecord, None for lines that are
+    too short to be transactions, or an error reason string.
+    """
+    parts = text.split()
+    if len(parts) < 4:
+        return None
+    match = LINE_GRAMMAR.match(text.strip())
+    if match is None:
+        return "unrecognized line"
+    if not DATE_TOKEN.match(match.group("date")):
+        return "invalid date"
+    amount = match.group("amount")
+    if not AMOUNT_TOKEN.match(amount):
+        return "invalid amount"
+    return TransactionRecord(
+        date=match.group("date"),
+        description=match.group("description") or "",
+        amount=float(amount.replace(',', '')),
+        type=match.group("type").upper(),
+        category=match.group("category").upper()
+    )
+
+def iter_page_records(page_number: int, text: str):
+    """Streams (record, error) pairs for every candidate transaction line of a page."""
+    for line_number, line in enumerate(text.split('\n'), start=1):
+        parsed = parse_line(line)
+        if parsed is None:
+            continue
+        if isinstance(parsed, str):
+            yield None, LineError(page_number, line_number, line.strip(), parsed)
+        else:
+            yield parsed, None
+
+def pdf_page_count(path: str):
+    from pypdf import PdfReader
+    return len(PdfReader(path).pages)
+
+def page_ranges(num_pages: int, pages_per_task: int = None):
+    pages_per_task = pages_per_task or PAGES_PER_TASK
+    return [(start, min(start + pages_per_task, num_pages)) for start in range(0, num_pages, pages_per_task)]
+
+def parse_page_range(path: str, start: int, stop: int, reader=None):
+    """Extracts and parses pages [start, stop) of a PDF. Runs inside CPU-executor workers."""
+    if reader is None:
+        from pypdf import PdfReader
+        reader = PdfReader(path)
+    records, errors = [], []
+    for index in range(start, stop):
+        text = reader.pages[index].extract_text() or ""
+        for record, error in iter_page_records(index + 1, text):
+            if record is not None:
+                records.append(record)
+            else:
+                errors.append(error)
+    return records, errors
+
+def _merge(results, num_pages: int):
+    records, errors = [], []
+    for range_records, range_errors in results:
+        records.extend(range_records)
+        errors.extend(range_errors)
+    return ParsedStatement(records, errors, num_pages)
+
+def parse_pdf(path: str, pages_per_task: int = None):
+    """
+    Parses a text-based PDF statement into typed transaction records, in the calling
+    process. Malformed lines are collected as LineErrors instead of failing the whole file.
+    """
+    from pypdf import PdfReader
+    reader = PdfReader(path)
+    num_pages = len(reader.pages)
+    return _merge(
+        (parse_page_range(path, start, stop, reader) for start, stop in page_ranges(num_pages, pages_per_task)),
+        num_pages
+    )
+
+async def parse_pdf_parallel(path: str, run, concurrency: int = None, pages_per_task: int = None):
+    """
+    Parses a PDF by fanning its page ranges out through `run` (the shared CPU executor),
+    at most `concurrency` ranges at a time, so PDF parsing stays inside the
+    CPU_WORKERS / CPU_QUEUE_SIZE bound and reuses the warm worker processes.
+    Ranges are merged in page order. Returns None when the PDF fits in one range,
+    leaving it to be parsed in-process with the rest of the upload.
+    """
+    concurrency = concurrency or PDF_WORKERS
+    num_pages = await run(pdf_page_count, path)
+    ranges = page_ranges(num_pages, pages_per_task)
+    if len(ranges) <= 1:
+        return None
+
+    slots = asyncio.Semaphore(concurrency)
+
+    async def parse_range(start, stop):
+        async with slots:
+            return await run(parse_page_range, path, start, stop)
+
+    tasks = [asyncio.ensure_future(parse_range(start, stop)) for start, stop in ranges]
+    try:
+        results = await asyncio.gather(*tasks)
+    except BaseException:
+        # e.g. ExecutorSaturated: don't leave the other ranges queued for a failed upload
+        for task in tasks:
+            task.cancel()
+        raise
+    return _merge(results, num_pages)
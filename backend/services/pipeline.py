@@ -0,0 +1,139 @@
+"""
+CPU-bound stages of the scoring pipeline as top-level, picklable functions so
+they can be dispatched to worker processes by services.executor.
+"""
+import itertools
+import pandas as pd
+from services.pdf_ingest import parse_pdf
+from services.csv_ingest import csv_layouts, header_signature
+from services.metrics import stage
+from services.feature_engine import (
+    map_columns, is_feature_dataframe, process_feature_dataframe,
+    aggregate_transactions, aggregate_transactions_streaming
+)
+
+class StatementFormatError(ValueError):
+    """The uploaded statement could not be interpreted; reported to the client as a 400."""
+    pass
+
+# Per-line parse errors reported back to the client
+MAX_REPORTED_ERRORS = 20
+
+def parse_pdf_statement(path: str, parsed=None):
+    """
+    Extracts transaction rows from a text-based PDF statement. Returns (df, warnings).
+    `parsed` is a ParsedStatement already extracted in parallel (see services.pdf_ingest).
+    """
+    if parsed is None:
+        parsed = parse_pdf(path)
+    if not parsed.records:
+        raise StatementFormatError("Could not parse transactions from PDF. Ensure PDF is text-based.")
+    warnings = [
+        f"page {e.page} line {e.line}: {e.reason} ({e.text[:80]})"
+        for e in parsed.errors[:MAX_REPORTED_ERRORS]
+    ]
+    if len(parsed.errors) > MAX_REPORTED_ERRORS:
+        warnings.append(f"... {len(parsed.errors) - MAX_REPORTED_ERRORS} more lines skipped")
+    return parsed.to_dataframe(), warnings
+
+def load_statement(path: str, filename: str, chunk_rows: int, parsed_pdf=None, by_day: bool = False):
+    """
+    Parses an uploaded statement stored at `path` (or aggregates `parsed_pdf`, the
+    records of a PDF whose pages were parsed in parallel).
+    Returns ("features", features, analytics, warnings) for already feature-engineered CSVs
+    (e.g. test_1.csv), otherwise ("aggregates", monthly, category_spend, warnings);
+    with by_day=True the aggregates are per calendar day (for incremental uploads).
+    """
+    chunks = None
+    warnings = []
+    try:
+        if filename.endswith('.csv'):
+            # Known bank layouts are read typed and pre-mapped (see services.csv_ingest)
+            signature = header_signature(path)
+            layout = csv_layouts.get(signature)
+            if layout is not None:
+                typed = layout.read(path, chunk_rows)
+                try:
+                    with stage("csv_layout_read"), stage("aggregate"):
+                        first = next(typed, None)
+                        if first is not None and not first.empty:
+                            monthly, category_spend = aggregate_transactions_streaming(
+                                itertools.chain([first], typed), by_day
+                            )
+                except (ValueError, TypeError):
+                    # Same header, different content (e.g. another date format): relearn from this file
+                    with stage("csv_layout_evict"):
+                        csv_layouts.evict(signature)
+                else:
+                    # Raised outside the try: StatementFormatError is a ValueError and must not evict
+                    if first is None or first.empty:
+                        raise StatementFormatError("Uploaded CSV is empty")
+                    return ("aggregates", monthly, category_spend, warnings)
+                finally:
+                    typed.close()
+
+            # Stream the file in row chunks instead of materializing it in memory
+            try:
+                chunks = pd.read_csv(path, chunksize=chunk_rows)
+            except pd.errors.EmptyDataError:
+                raise StatementFormatError("Uploaded CSV is empty")
+            df = next(chunks, None)
+            if df is None or df.empty:
+                raise StatementFormatError("Uploaded CSV is empty")
+        else:
+            with stage("parse_pdf"):
+                df, warnings = parse_pdf_statement(path, parsed_pdf)
+
+        # Check if it's already a feature-engineered dataframe (e.g., test_1.csv)
+        if is_feature_dataframe(df):
+            features, analytics = process_feature_dataframe(df)
+            return ("features", features, analytics, warnings)
+
+        # Standard Transaction Data Path
+        col_map = map_columns(df.columns, assume_default=True)
+        if len(col_map) < 5:
+            missing = [c for c in ['date', 'description', 'amount', 'type', 'category'] if c not in col_map]
+            raise StatementFormatError(f"Missing or unrecognized columns: {missing}. Found: {list(df.columns)}")
+
+        if chunks is not None:
+            with stage("csv_layout_learn"):
+                csv_layouts.learn(signature, df)
+
+        with stage("aggregate"):
+            if chunks is not None:
+                monthly, category_spend = aggregate_transactions_streaming(itertools.chain([df], chunks), by_day)
+            else:
+                monthly, category_spend = aggregate_transactions(df, by_day)
+        return ("aggregates", monthly, category_spend, warnings)
+    finally:
+        # Close the reader's file handle even when parsing stops part-way
+        if chunks is not None:
+            chunks.close()
+
+def predict_features(features: list):
+    """Scores one applicant with the worker's active model version."""
+    from services.inference import get_inference_service
+    return get_inference_service().predict(features)
+
+def predict_feature_batch(rows: list):
+    """Scores N applicants in one vectorized model call."""
+    from services.inference import get_inference_service
+    return get_inference_service().predict_batch(rows)
+
+def predict_explained_batch(rows: list):
+    """Scores N applicants with SHAP insights in one model and one explainer call (see services.batcher)."""
+    from services.inference import get_inference_service
+    return get_inference_service().predict_batch(rows, explain=True)
+
+def render_certificate(user_name: str, score: float, tier: str, insights: list, issued_at=None):
+    """Renders a certificate with the worker's prebuilt CertificateTemplate."""
+    from services.certificate import generate_certificate_pdf
+    return generate_certificate_pdf(user_name=user_name, score=score, tier=tier, insights=insights, issued_at=issued_at)
+
+def render_certificate_batch(items: list):
+    """Renders several certificates in one worker call; each item is render_certificate's argument tuple."""
+    from services.certificate import generate_certificate_pdf
+    return [
+        generate_certificate_pdf(user_name=user_name, score=score, tier=tier, insights=insights, issued_at=issued_at)
+        for user_name, score, tier, insights, issued_at in items
+    ]
@@ -0,0 +1,136 @@
+class _Record:
+    """
+    Base for the typed records passed between feature_engine, inference and the API.
+    Constructors coerce values to native Python types once, so records serialize to
+    Firestore or JSON directly via `to_dict`/`to_document`.
+    """
+    __slots__ = ()
+
+    def __eq__(self, other):
+        return type(self) is type(other) and all(
+            getattr(self, name) == getattr(other, name) for name in self.__slots__
+        )
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+class FeatureVector(list):
+    """The 18 behavioral signals in ALL_SIGNAL_NAMES order, as native floats."""
+    __slots__ = ()
+
+    def __init__(self, values=()):
+        super().__init__(float(v) for v in values)
+
+class CategoryShare(_Record):
+    """Debit spend of one category and its share of all debit spend."""
+    __slots__ = ("category", "amount", "percentage")
+
+    def __init__(self, category: str, amount: float, percentage: float):
+        self.category = str(category)
+        self.amount = float(amount)
+        self.percentage = float(percentage)
+
+    def to_dict(self):
+        return {"category": self.category, "amount": self.amount, "percentage": self.percentage}
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(data["category"], data["amount"], data["percentage"])
+
+class Insight(_Record):
+    """SHAP contribution of one model feature towards the STABLE class."""
+    __slots__ = ("feature", "impact")
+
+    def __init__(self, feature: str, impact: float):
+        self.feature = feature
+        self.impact = float(impact)
+
+    @property
+    def positive(self):
+        return self.impact > 0
+
+    def to_dict(self):
+        return {"feature": self.feature, "impact": self.impact, "positive": self.impact > 0}
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(data["feature"], data["impact"])
+
+class Prediction(_Record):
+    """Model output for one applicant: score, tier, class probabilities, insights, UI signals and model version."""
+    __slots__ = ("score", "tier", "risky", "moderate", "stable", "insights",
+                 "wealth_discipline", "lifestyle_overhead", "stability_buffer", "missed_signals", "model_version")
+
+    def __init__(self, score, tier, risky, moderate, stable, insights,
+                 wealth_discipline, lifestyle_overhead, stability_buffer, missed_signals, model_version=None):
+        self.score = float(score)
+        self.tier = str(tier)
+        self.risky = float(risky)
+        self.moderate = float(moderate)
+        self.stable = float(stable)
+        self.insights = insights
+        self.wealth_discipline = float(wealth_discipline)
+        self.lifestyle_overhead = float(lifestyle_overhead)
+        self.stability_buffer = float(stability_buffer)
+        self.missed_signals = int(missed_signals)
+        self.model_version = model_version
+
+    def probabilities(self):
+        return {"risky": self.risky, "moderate": self.moderate, "stable": self.stable}
+
+    def to_dict(self):
+        return {
+            "score": self.score,
+            "tier": self.tier,
+            "probabilities": self.probabilities(),
+            "insights": [insight.to_dict() for insight in self.insights],
+            "signals": {
+                "wealth_discipline": self.wealth_discipline,
+                "lifestyle_overhead": self.lifestyle_overhead,
+                "stability_buffer": self.stability_buffer,
+                "missed_signals": self.missed_signals
+            },
+            "model_version": self.model_version
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        probabilities, signals = data["probabilities"], data["signals"]
+        return cls(
+            data["score"], data["tier"],
+            probabilities["risky"], probabilities["moderate"], probabilities["stable"],
+            [Insight.from_dict(i) for i in data["insights"]],
+            signals["wealth_discipline"], signals["lifestyle_overhead"],
+            signals["stability_buffer"], signals["missed_signals"],
+            data.get("model_version")
+        )
+
+class ScoreRecord(_Record):
+    """A stored credibility score: the prediction plus the inputs it was computed from."""
+    __slots__ = ("uid", "prediction", "features", "analytics", "filename", "created_at")
+
+    def __init__(self, uid: str, prediction: Prediction, features: FeatureVector, analytics: list,
+                 filename: str, created_at):
+        self.uid = uid
+        self.prediction = prediction
+        self.features = features
+        self.analytics = analytics
+        self.filename = filename
+        self.created_at = created_at
+
+    def to_document(self):
+        """Firestore document for this score (also valid JSON apart from created_at)."""
+        prediction = self.prediction
+        return {
+            "uid": self.uid,
+            "score": prediction.score,
+            "tier": prediction.tier,
+            "probabilities": prediction.probabilities(),
+            "insights": [insight.to_dict() for insight in prediction.insights],
+            "features": list(self.features),
+            "analytics": [share.to_dict() for share in self.analytics],
+            "model_version": prediction.model_version,
+            "filename": self.filename,
+            "created_at": self.created_at
+        }
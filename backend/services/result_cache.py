@@ -0,0 +1,127 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+def file_digest(path: str, chunk_size: int = 1024 * 1024):
+    """SHA-256 hex digest of a file, read in fixed-size chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class ResultCache:
+    """
+    Content-addressed cache of scoring results for identical uploads.
+    Keys are built from the hash of the uploaded bytes and the model version, so a
+    retrained model never serves stale scores. Entries live in a bounded in-memory
+    LRU and, when `disk_dir` is set, in a bounded on-disk JSON tier that survives
+    restarts and is shared by every worker on the host.
+    The disk tier is trimmed every `evict_every` puts, so it may run over
+    `max_disk_entries` by that many files per worker in between. Disk access blocks;
+    call get/put off the event loop when `disk_dir` is set.
+    """
+    def __init__(self, max_entries: int = 256, disk_dir: str = None, max_disk_entries: int = 10000,
+                 evict_every: int = 64):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.max_disk_entries = max_disk_entries
+        self.evict_every = evict_every
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._puts_since_evict = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(content_digest: str, model_version: str, kind: str = ""):
+        return hashlib.sha256(f"{content_digest}:{model_version}:{kind}".encode()).hexdigest()
+
+    @staticmethod
+    def owner_key(result_key: str, uid: str):
+        """Key of one user's score for a cached result, kept apart from the entry every uploader shares."""
+        return hashlib.sha256(f"{result_key}:owner:{uid}".encode()).hexdigest()
+
+    def _disk_path(self, key: str):
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+
+        if self.disk_dir:
+            try:
+                with open(self._disk_path(key), "r", encoding="utf-8") as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                entry = None
+            if entry is not None:
+                with self._lock:
+                    self.disk_hits += 1
+                self._remember(key, entry)
+                return entry
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, entry: dict):
+        """Stores a JSON-serializable entry in memory and, if enabled, on disk."""
+        self._remember(key, entry)
+        if self.disk_dir:
+            # Write-then-rename so concurrent readers never see a partial file
+            tmp_path = self._disk_path(key) + f".{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, self._disk_path(key))
+            with self._lock:
+                self._puts_since_evict += 1
+                due = self._puts_since_evict >= self.evict_every
+                if due:
+                    self._puts_since_evict = 0
+            if due:
+                self._evict_disk()
+
+    def _remember(self, key: str, entry: dict):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _evict_disk(self):
+        files = [f for f in os.listdir(self.disk_dir) if f.endswith(".json")]
+        if len(files) <= self.max_disk_entries:
+            return
+        # Other workers evict from the same directory; skip files that are already gone
+        aged = []
+        for name in files:
+            path = os.path.join(self.disk_dir, name)
+            try:
+                aged.append((os.path.getmtime(path), path))
+            except OSError:
+                pass
+        aged.sort()
+        for _, path in aged[:len(aged) - self.max_disk_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses
+            }
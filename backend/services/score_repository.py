@@ -0,0 +1,279 @@
+import threading
+import uuid
+from datetime import timezone
+
+class InvalidCursor(ValueError):
+    """A history cursor that is not one of the user's score documents."""
+    pass
+
+def _as_utc(value):
+    """Firestore returns tz-aware timestamps while new documents carry naive UTC datetimes."""
+    if value is None:
+        return None
+    if getattr(value, "tzinfo", None) is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+def _paginate(scores: list, limit: int):
+    if limit and len(scores) > limit:
+        scores = scores[:limit]
+        return scores, scores[-1]["id"]
+    return scores, None
+
+class ScoreRepository:
+    """
+    Storage interface for credibility score documents.
+    Returned documents are plain dicts with the document id under "id".
+    """
+    def add(self, data: dict) -> str:
+        """Stores a score document (must include uid and created_at) and returns its id."""
+        raise NotImplementedError
+
+    def add_many(self, items: list):
+        """
+        Stores [(score_id, data)] in one commit. Ids are chosen by the caller, so
+        re-storing the same items (e.g. a retried batch) overwrites instead of duplicating.
+        """
+        raise NotImplementedError
+
+    def get(self, score_id: str):
+        raise NotImplementedError
+
+    def get_many(self, score_ids: list, fields: list = None):
+        """
+        Returns {score_id: document} for the ids that exist, in one round trip.
+        `fields` projects each document to those fields plus id and created_at.
+        """
+        raise NotImplementedError
+
+    def latest_for_user(self, uid: str):
+        """Returns the newest score document of a user, or None."""
+        raise NotImplementedError
+
+    def list_for_user(self, uid: str):
+        """Returns all score documents of a user, oldest first."""
+        raise NotImplementedError
+
+    def query_for_user(self, uid: str, limit: int = None, cursor: str = None, since=None, until=None,
+                       descending: bool = False, fields: list = None):
+        """
+        Returns (scores, next_cursor) for one page of a user's history ordered by created_at.
+        `cursor` is the id of the last document of the previous page; `since`/`until` bound
+        created_at (inclusive/exclusive); `fields` projects each document to those fields
+        plus id and created_at. next_cursor is None on the last page.
+        Raises InvalidCursor if `cursor` is not one of the user's documents.
+        """
+        raise NotImplementedError
+
+class FirestoreScoreRepository(ScoreRepository):
+    """
+    Firestore-backed repository. Alongside every score document it maintains a
+    per-user summary document holding a copy of the newest score, written in the same
+    transaction, so the dashboard is a single document read however long the history.
+    """
+    def __init__(self, db, collection: str = "credibility_scores", latest_collection: str = "latest_scores"):
+        self.db = db
+        self.collection = collection
+        self.latest_collection = latest_collection
+
+    def _latest_ref(self, uid: str):
+        return self.db.collection(self.latest_collection).document(uid)
+
+    def add(self, data: dict) -> str:
+        score_id = self.db.collection(self.collection).document().id
+        self.add_many([(score_id, data)])
+        return score_id
+
+    def add_many(self, items: list):
+        from firebase_admin import firestore
+
+        collection = self.db.collection(self.collection)
+        # Newest document per user in this batch; only it can move the user's pointer
+        newest = {}
+        for score_id, data in items:
+            current = newest.get(data["uid"])
+            if current is None or _as_utc(current[1]["created_at"]) <= _as_utc(data["created_at"]):
+                newest[data["uid"]] = (score_id, data)
+        latest_refs = [self._latest_ref(uid) for uid in newest]
+
+        @firestore.transactional
+        def write(transaction):
+            snapshots = {snap.id: snap for snap in self.db.get_all(latest_refs, transaction=transaction)}
+            for score_id, data in items:
+                transaction.set(collection.document(score_id), data)
+            for latest_ref in latest_refs:
+                score_id, data = newest[latest_ref.id]
+                self._advance_latest(transaction, latest_ref, snapshots.get(latest_ref.id), score_id, data)
+
+        write(self.db.transaction())
+
+    @staticmethod
+    def _advance_latest(transaction, latest_ref, snapshot, score_id: str, data: dict):
+        """
+        Points the user's summary document at `data` unless it already holds a newer
+        score, and returns the summary as it stands after the transaction.
+        """
+        current = snapshot.to_dict() if snapshot is not None and snapshot.exists else None
+        # Concurrent uploads may commit out of order; only move the pointer forward
+        if current is None or _as_utc(current.get("created_at")) <= _as_utc(data["created_at"]):
+            current = {**data, "score_id": score_id}
+            transaction.set(latest_ref, current)
+        return current
+
+    def get(self, score_id: str):
+        doc = self.db.collection(self.collection).document(score_id).get()
+        if not doc.exists:
+            return None
+        data = doc.to_dict()
+        data["id"] = doc.id
+        return data
+
+    def get_many(self, score_ids: list, fields: list = None):
+        collection = self.db.collection(self.collection)
+        refs = [collection.document(score_id) for score_id in score_ids]
+        field_paths = sorted(set(fields) | {"created_at"}) if fields else None
+        scores = {}
+        for doc in self.db.get_all(refs, field_paths=field_paths):
+            if doc.exists:
+                data = doc.to_dict()
+                data["id"] = doc.id
+                scores[doc.id] = data
+        return scores
+
+    def latest_for_user(self, uid: str):
+        from firebase_admin import firestore
+
+        latest_ref = self._latest_ref(uid)
+        doc = latest_ref.get()
+        if doc.exists:
+            data = doc.to_dict()
+            data["id"] = data.pop("score_id")
+            return data
+        # Users from before the summary document existed: scan once and backfill it
+        scores = self.list_for_user(uid)
+        if not scores:
+            return None
+        latest = dict(scores[-1])
+        score_id = latest.pop("id")
+
+        @firestore.transactional
+        def backfill(transaction):
+            # An upload committed since the scan may already have set a newer pointer
+            return self._advance_latest(transaction, latest_ref, latest_ref.get(transaction=transaction), score_id, latest)
+
+        data = dict(backfill(self.db.transaction()))
+        data["id"] = data.pop("score_id")
+        return data
+
+    def list_for_user(self, uid: str):
+        docs = self.db.collection(self.collection) \
+            .where("uid", "==", uid) \
+            .stream()
+        scores = []
+        for doc in docs:
+            data = doc.to_dict()
+            data["id"] = doc.id
+            scores.append(data)
+        scores.sort(key=lambda x: _as_utc(x.get("created_at")))
+        return scores
+
+    def query_for_user(self, uid: str, limit: int = None, cursor: str = None, since=None, until=None,
+                       descending: bool = False, fields: list = None):
+        from firebase_admin import firestore
+
+        collection = self.db.collection(self.collection)
+        # Requires the (uid, created_at) composite index from firestore.indexes.json
+        query = collection.where("uid", "==", uid)
+        if since is not None:
+            query = query.where("created_at", ">=", since)
+        if until is not None:
+            query = query.where("created_at", "<", until)
+        direction = firestore.Query.DESCENDING if descending else firestore.Query.ASCENDING
+        query = query.order_by("created_at", direction=direction)
+        if cursor:
+            last = collection.document(cursor).get()
+            if not last.exists or last.get("uid") != uid:
+                raise InvalidCursor(f"Unknown cursor: {cursor}")
+            query = query.start_after(last)
+        if fields:
+            query = query.select(sorted(set(fields) | {"created_at"}))
+        if limit:
+            # One extra document tells us whether another page exists
+            query = query.limit(limit + 1)
+
+        scores = []
+        for doc in query.stream():
+            data = doc.to_dict()
+            data["id"] = doc.id
+            scores.append(data)
+        return _paginate(scores, limit)
+
+class InMemoryScoreRepository(ScoreRepository):
+    """Dictionary-backed stand-in for development and tests without Firestore."""
+    def __init__(self):
+        self._docs = {}
+        self._latest = {}
+        self._lock = threading.Lock()
+
+    def add(self, data: dict) -> str:
+        score_id = uuid.uuid4().hex[:20]
+        self.add_many([(score_id, data)])
+        return score_id
+
+    def add_many(self, items: list):
+        with self._lock:
+            for score_id, data in items:
+                self._docs[score_id] = dict(data)
+                current = self._latest.get(data["uid"])
+                if current is None or _as_utc(self._docs[current]["created_at"]) <= _as_utc(data["created_at"]):
+                    self._latest[data["uid"]] = score_id
+
+    def get(self, score_id: str):
+        with self._lock:
+            data = self._docs.get(score_id)
+            return {**data, "id": score_id} if data is not None else None
+
+    def get_many(self, score_ids: list, fields: list = None):
+        keep = set(fields) | {"id", "created_at"} if fields else None
+        scores = {}
+        for score_id in score_ids:
+            data = self.get(score_id)
+            if data is not None:
+                scores[score_id] = {k: v for k, v in data.items() if k in keep} if keep else data
+        return scores
+
+    def latest_for_user(self, uid: str):
+        with self._lock:
+            score_id = self._latest.get(uid)
+        return self.get(score_id) if score_id else None
+
+    def list_for_user(self, uid: str):
+        with self._lock:
+            scores = [{**d, "id": k} for k, d in self._docs.items() if d["uid"] == uid]
+        scores.sort(key=lambda x: _as_utc(x.get("created_at")))
+        return scores
+
+    def query_for_user(self, uid: str, limit: int = None, cursor: str = None, since=None, until=None,
+                       descending: bool = False, fields: list = None):
+        scores = self.list_for_user(uid)
+        if since is not None:
+            scores = [d for d in scores if _as_utc(d["created_at"]) >= _as_utc(since)]
+        if until is not None:
+            scores = [d for d in scores if _as_utc(d["created_at"]) < _as_utc(until)]
+        if descending:
+            scores.reverse()
+        if cursor:
+            anchor = self.get(cursor)
+            if anchor is None or anchor["uid"] != uid:
+                raise InvalidCursor(f"Unknown cursor: {cursor}")
+            ids = [d["id"] for d in scores]
+            if cursor in ids:
+                scores = scores[ids.index(cursor) + 1:]
+            else:
+                # The cursor document falls outside the since/until filter
+                after = _as_utc(anchor["created_at"])
+                scores = [d for d in scores if (_as_utc(d["created_at"]) < after if descending else _as_utc(d["created_at"]) > after)]
+        if fields:
+            keep = set(fields) | {"id", "created_at"}
+            scores = [{k: v for k, v in d.items() if k in keep} for d in scores]
+        return _paginate(scores[:limit + 1] if limit else scores, limit)
@@ -0,0 +1,466 @@
+import glob
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from itertools import islice
+
+from services.score_repository import ScoreRepository, _as_utc
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines
+    fcntl = None
+    import msvcrt
+
+def _encode(obj):
+    if isinstance(obj, datetime):
+        return {"__datetime__": obj.isoformat()}
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def _decode(obj):
+    if "__datetime__" in obj:
+        return datetime.fromisoformat(obj["__datetime__"])
+    return obj
+
+def _try_lock(f):
+    """Takes a non-blocking exclusive lock on an open file; it is held until the file is closed."""
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+def _is_transient(error: Exception):
+    """Outages and contention, retried until they pass; anything else counts as a failed attempt."""
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    try:
+        from google.api_core import exceptions as api_exceptions
+    except ImportError:
+        return False
+    return isinstance(error, (
+        api_exceptions.ServiceUnavailable,
+        api_exceptions.DeadlineExceeded,
+        api_exceptions.GatewayTimeout,
+        api_exceptions.TooManyRequests,
+        api_exceptions.ResourceExhausted,
+        api_exceptions.Aborted,
+        api_exceptions.InternalServerError,
+        api_exceptions.Unknown,
+        api_exceptions.RetryError
+    ))
+
+class ScoreJournal:
+    """
+    Append-only JSON-lines log of queued score documents ("put") and committed ids
+    ("ack"). Every append is fsynced, so a document the API has acknowledged survives
+    a crash or restart; `replay` returns the puts that were never acked.
+
+    Each process writes its own slot, `{root}.{n}{ext}` next to `path`, owned through an
+    exclusive lock on `{slot}.lock` for as long as the journal is open. A new process
+    claims the lowest free slot and, in `replay`, adopts the pending puts of slots no
+    running process owns, so `uvicorn --workers N` processes never replay or compact
+    each other's documents, and nothing is stranded when the worker count shrinks.
+    Documents that cannot be committed at all are moved to `{root}.{n}.dead{ext}`.
+    """
+    def __init__(self, path: str, compact_after: int = 10000):
+        self.base_path = path
+        self.compact_after = compact_after
+        self._lines = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.path, self._lock_file = self._claim_slot()
+        root, ext = os.path.splitext(self.path)
+        self.dead_letter_path = f"{root}.dead{ext}"
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def _claim_slot(self):
+        root, ext = os.path.splitext(self.base_path)
+        slot = 0
+        while True:
+            path = f"{root}.{slot}{ext}"
+            lock_file = open(path + ".lock", "a")
+            if _try_lock(lock_file):
+                return path, lock_file
+            lock_file.close()
+            slot += 1
+
+    def _other_slots(self):
+        """Journal files of other slots, plus a single-file journal from before slots existed."""
+        root, ext = os.path.splitext(self.base_path)
+        slot_name = re.compile(re.escape(os.path.basename(root)) + r"\.\d+" + re.escape(ext) + "$")
+        paths = [
+            path for path in glob.glob(glob.escape(root) + ".*" + glob.escape(ext))
+            if slot_name.match(os.path.basename(path)) and path != self.path
+        ]
+        if os.path.exists(self.base_path):
+            paths.append(self.base_path)
+        return sorted(paths)
+
+    def _write(self, records: list):
+        for record in records:
+            self._file.write(json.dumps(record, default=_encode) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._lines += len(records)
+
+    def put_many(self, items: list):
+        """Journals [(score_id, data)] with a single fsync."""
+        self._write([{"op": "put", "id": score_id, "data": data} for score_id, data in items])
+
+    def ack(self, score_ids: list):
+        self._write([{"op": "ack", "ids": score_ids}])
+
+    def dead_letter(self, score_id: str, data: dict, error: str):
+        """Moves a document that failed every commit attempt to the dead-letter file and acks it."""
+        with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+            record = {"id": score_id, "data": data, "error": error, "failed_at": datetime.utcnow()}
+            f.write(json.dumps(record, default=_encode) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.ack([score_id])
+
+    @staticmethod
+    def _read(path: str):
+        pending = OrderedDict()
+        lines = 0
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line, object_hook=_decode)
+                except ValueError:
+                    # Torn final line from a crash mid-append
+                    continue
+                if record["op"] == "put":
+                    pending[record["id"]] = record["data"]
+                else:
+                    for score_id in record["ids"]:
+                        pending.pop(score_id, None)
+                lines += 1
+        return pending, lines
+
+    def replay(self):
+        """Pending puts of this slot and of every unowned slot, which this slot takes over."""
+        pending, self._lines = self._read(self.path)
+        for path in self._other_slots():
+            lock_file = open(path + ".lock", "a")
+            try:
+                if not _try_lock(lock_file):
+                    continue
+                orphaned, _ = self._read(path)
+                if orphaned:
+                    # Made durable in this slot before the orphaned slot is removed
+                    self.put_many(list(orphaned.items()))
+                    pending.update(orphaned)
+                os.remove(path)
+            except FileNotFoundError:
+                # Adopted by another process between listing and locking
+                continue
+            finally:
+                lock_file.close()
+        return pending
+
+    def needs_compaction(self, pending_count: int):
+        return not pending_count or self._lines >= self.compact_after
+
+    def compact(self, pending: OrderedDict):
+        """Rewrites the log to hold only still-pending puts (truncates it when nothing is pending)."""
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for score_id, data in pending.items():
+                f.write(json.dumps({"op": "put", "id": score_id, "data": data}, default=_encode) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._file.close()
+        os.replace(tmp_path, self.path)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._lines = len(pending)
+
+    def close(self):
+        self._file.close()
+        self._lock_file.close()
+
+class WriteBehindRepository(ScoreRepository):
+    """
+    Write-behind wrapper around another ScoreRepository. `add` journals the document to
+    local disk and returns its id immediately; a background thread commits queued
+    documents in batches of up to `batch_size` via `add_many`, retrying failed batches
+    with exponential backoff. Documents still queued at shutdown are replayed from the
+    journal on the next start.
+    Transient errors (outages, timeouts, contention) are retried indefinitely. A batch
+    rejected `max_attempts` times is halved on each further failure until the rejected
+    document is alone, and a document rejected `max_attempts` times on its own is moved
+    to the dead-letter file, so one bad document never blocks the queue behind it.
+    Reads never wait for the writer: `get`, `latest_for_user` and the history queries
+    overlay the queued documents on what the backend has stored.
+    Journal appends and compaction hold their own lock, never the one reads and stats
+    take; `add` still fsyncs, so async callers run it in a thread.
+    """
+    def __init__(self, backend: ScoreRepository, journal_path: str, batch_size: int = 100,
+                 linger: float = 0.05, max_backoff: float = 30.0, max_attempts: int = 3):
+        self.backend = backend
+        self.batch_size = batch_size
+        self.linger = linger
+        self.max_backoff = max_backoff
+        self.max_attempts = max_attempts
+        self.journal = ScoreJournal(journal_path)
+        self._pending = self.journal.replay()
+        self._queued_at = {score_id: time.time() for score_id in self._pending}
+        # Rejected commit attempts per queued document
+        self._attempts = {}
+        # Orders journal appends with compaction; taken before _cond, never inside it
+        self._journal_lock = threading.Lock()
+        self._cond = threading.Condition()
+        self._stopping = False
+
+        self.enqueued = 0
+        self.committed = 0
+        self.batches = 0
+        self.failures = 0
+        self.dead_lettered = 0
+        self.replayed = len(self._pending)
+        self.last_flush_at = None
+        self.last_batch_ms = None
+        self.last_error = None
+
+        self._thread = threading.Thread(target=self._run, name="score-writer", daemon=True)
+        self._thread.start()
+
+    # Writes
+
+    def add(self, data: dict) -> str:
+        score_id = uuid.uuid4().hex[:20]
+        self.add_many([(score_id, data)])
+        return score_id
+
+    def add_many(self, items: list):
+        with self._journal_lock:
+            self.journal.put_many(items)
+            with self._cond:
+                for score_id, data in items:
+                    self._pending[score_id] = data
+                    self._queued_at[score_id] = time.time()
+                self.enqueued += len(items)
+                self._cond.notify_all()
+
+    def _batch_limit(self):
+        rejected = self._attempts.get(next(iter(self._pending)), 0)
+        if rejected < self.max_attempts:
+            return self.batch_size
+        # Each further rejection halves the batch at the head of the queue
+        return max(1, self.batch_size >> (rejected - self.max_attempts + 1))
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._pending and not self._stopping:
+                self._cond.wait()
+            if not self._pending:
+                return None
+            if len(self._pending) < self.batch_size and not self._stopping:
+                # Give concurrent uploads a moment to join this commit
+                self._cond.wait(self.linger)
+            ids = list(islice(self._pending, self._batch_limit()))
+            return [(score_id, self._pending[score_id]) for score_id in ids]
+
+    def _run(self):
+        backoff = min(0.1, self.max_backoff)
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            started = time.perf_counter()
+            try:
+                self.backend.add_many(batch)
+            except Exception as e:
+                with self._cond:
+                    self.failures += 1
+                    self.last_error = str(e)
+                if not _is_transient(e) and self._reject(batch, e):
+                    continue
+                with self._cond:
+                    if self._stopping:
+                        # Leave the rest in the journal for the next start
+                        self._cond.notify_all()
+                        return
+                    self._cond.wait(backoff + random.uniform(0, backoff))
+                backoff = min(backoff * 2, self.max_backoff)
+                continue
+            backoff = min(0.1, self.max_backoff)
+            self._acknowledge([score_id for score_id, _ in batch], started)
+
+    def _reject(self, batch: list, error: Exception):
+        """Counts a rejected attempt; returns True if the batch was a lone document now dead-lettered."""
+        with self._cond:
+            for score_id, _ in batch:
+                self._attempts[score_id] = self._attempts.get(score_id, 0) + 1
+            if len(batch) > 1 or self._attempts[batch[0][0]] < self.max_attempts:
+                return False
+        score_id, data = batch[0]
+        with self._journal_lock:
+            self.journal.dead_letter(score_id, data, str(error))
+            with self._cond:
+                self._forget([score_id])
+                self.dead_lettered += 1
+                self._cond.notify_all()
+        return True
+
+    def _forget(self, ids: list):
+        for score_id in ids:
+            self._pending.pop(score_id, None)
+            self._queued_at.pop(score_id, None)
+            self._attempts.pop(score_id, None)
+
+    def _acknowledge(self, ids: list, started: float):
+        with self._journal_lock:
+            self.journal.ack(ids)
+            with self._cond:
+                self._forget(ids)
+                self.committed += len(ids)
+                self.batches += 1
+                self.last_flush_at = time.time()
+                self.last_batch_ms = round((time.perf_counter() - started) * 1000, 2)
+                snapshot = OrderedDict(self._pending) if self.journal.needs_compaction(len(self._pending)) else None
+                self._cond.notify_all()
+            if snapshot is not None:
+                self.journal.compact(snapshot)
+
+    def flush(self, timeout: float = None, uid: str = None):
+        """Blocks until the queue (or just `uid`'s documents) is committed; returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while any(uid is None or data["uid"] == uid for data in self._pending.values()):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                if not self._thread.is_alive():
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def close(self, timeout: float = 10.0):
+        """Drains what it can within `timeout` and stops the writer; the rest stays journaled."""
+        self.flush(timeout)
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        with self._journal_lock:
+            self.journal.close()
+
+    # Reads
+
+    def _queued_for_user(self, uid: str, since=None, until=None):
+        with self._cond:
+            queued = [{**data, "id": score_id} for score_id, data in self._pending.items() if data["uid"] == uid]
+        return [
+            d for d in queued
+            if (since is None or _as_utc(d["created_at"]) >= _as_utc(since))
+            and (until is None or _as_utc(d["created_at"]) < _as_utc(until))
+        ]
+
+    def get(self, score_id: str):
+        with self._cond:
+            data = self._pending.get(score_id)
+        if data is not None:
+            return {**data, "id": score_id}
+        return self.backend.get(score_id)
+
+    def get_many(self, score_ids: list, fields: list = None):
+        keep = set(fields) | {"id", "created_at"} if fields else None
+        with self._cond:
+            queued = {score_id: self._pending[score_id] for score_id in score_ids if score_id in self._pending}
+        scores = self.backend.get_many([score_id for score_id in score_ids if score_id not in queued], fields=fields)
+        for score_id, data in queued.items():
+            data = {**data, "id": score_id}
+            scores[score_id] = {k: v for k, v in data.items() if k in keep} if keep else data
+        return scores
+
+    def latest_for_user(self, uid: str):
+        candidates = self._queued_for_user(uid)
+        stored = self.backend.latest_for_user(uid)
+        if stored is not None:
+            candidates.append(stored)
+        if not candidates:
+            return None
+        return max(candidates, key=lambda d: _as_utc(d.get("created_at")))
+
+    def list_for_user(self, uid: str):
+        queued = self._queued_for_user(uid)
+        scores = self.backend.list_for_user(uid)
+        # A document committed between the two reads shows up in both
+        stored_ids = {d["id"] for d in scores}
+        scores += [d for d in queued if d["id"] not in stored_ids]
+        scores.sort(key=lambda x: _as_utc(x.get("created_at")))
+        return scores
+
+    def query_for_user(self, uid: str, limit: int = None, cursor: str = None, since=None, until=None,
+                       descending: bool = False, fields: list = None):
+        queued = self._queued_for_user(uid, since, until)
+        if not queued:
+            return self.backend.query_for_user(uid, limit=limit, cursor=cursor, since=since, until=until,
+                                               descending=descending, fields=fields)
+
+        anchor = None
+        if cursor:
+            with self._cond:
+                anchor_queued = cursor in self._pending
+            anchor = self.get(cursor)
+            if anchor is None or anchor["uid"] != uid:
+                # Let the backend reject the cursor
+                return self.backend.query_for_user(uid, limit=limit, cursor=cursor, since=since, until=until,
+                                                   descending=descending, fields=fields)
+        if anchor is not None and anchor_queued:
+            # The previous page ended on a queued document the backend has not seen yet
+            anchor_at = _as_utc(anchor["created_at"])
+            if descending:
+                until = anchor_at if until is None else min(_as_utc(until), anchor_at)
+            else:
+                since = anchor_at if since is None else max(_as_utc(since), anchor_at)
+            cursor = None
+
+        stored, stored_cursor = self.backend.query_for_user(uid, limit=limit, cursor=cursor, since=since,
+                                                            until=until, descending=descending, fields=fields)
+        stored_ids = {d["id"] for d in stored}
+        if anchor is not None:
+            anchor_at = _as_utc(anchor["created_at"])
+            after_anchor = (lambda at: at <= anchor_at) if descending else (lambda at: at >= anchor_at)
+            queued = [d for d in queued if d["id"] != anchor["id"] and after_anchor(_as_utc(d["created_at"]))]
+            stored = [d for d in stored if d["id"] != anchor["id"]]
+        if fields:
+            keep = set(fields) | {"id", "created_at"}
+            queued = [{k: v for k, v in d.items() if k in keep} for d in queued]
+
+        scores = stored + [d for d in queued if d["id"] not in stored_ids]
+        scores.sort(key=lambda x: _as_utc(x.get("created_at")), reverse=descending)
+        if not limit:
+            return scores, None
+        page = scores[:limit]
+        more = len(scores) > limit or stored_cursor is not None
+        return page, page[-1]["id"] if more and page else None
+
+    def stats(self):
+        with self._cond:
+            oldest = min(self._queued_at.values()) if self._queued_at else None
+            return {
+                "queued": len(self._pending),
+                "enqueued": self.enqueued,
+                "committed": self.committed,
+                "batches": self.batches,
+                "failures": self.failures,
+                "dead_lettered": self.dead_lettered,
+                "replayed": self.replayed,
+                "lag_seconds": round(time.time() - oldest, 3) if oldest is not None else 0.0,
+                "last_flush_at": self.last_flush_at,
+                "last_batch_ms": self.last_batch_ms,
+                "last_error": self.last_error,
+                "journal": self.journal.path
+            }
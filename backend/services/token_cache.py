@@ -0,0 +1,77 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+class TokenCache:
+    """
+    Bounded, thread-safe cache of verified Firebase ID tokens.
+    Entries are keyed by a SHA-256 of the token (raw tokens are never stored) and
+    expire at the token's own `exp` claim. In revocation-check mode every token is
+    verified with check_revoked=True and cached for at most `revocation_ttl` seconds,
+    so a revoked session is rejected within that window.
+    """
+    def __init__(self, verify, max_entries: int = 10000, check_revoked: bool = False,
+                 revocation_ttl: float = 60.0, clock=time.time):
+        self._verify = verify
+        self.max_entries = max_entries
+        self.check_revoked = check_revoked
+        self.revocation_ttl = revocation_ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+
+    @staticmethod
+    def _key(token: str):
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def verify(self, token: str):
+        """Returns the decoded claims, verifying the token only on a cache miss. Verification errors propagate."""
+        key = self._key(token)
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, claims = entry
+                if now < expires_at:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return claims
+                del self._entries[key]
+                self.expired += 1
+            self.misses += 1
+
+        if self.check_revoked:
+            claims = self._verify(token, check_revoked=True)
+        else:
+            claims = self._verify(token)
+
+        expires_at = float(claims.get("exp", now))
+        if self.check_revoked:
+            expires_at = min(expires_at, now + self.revocation_ttl)
+        if expires_at > now:
+            with self._lock:
+                self._entries[key] = (expires_at, claims)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return claims
+
+    def invalidate(self, token: str):
+        with self._lock:
+            self._entries.pop(self._key(token), None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "check_revoked": self.check_revoked
+            }
@@ -0,0 +1,156 @@
+import json
+import os
+import numpy as np
+
+# Arrays written by CompiledForest.save, one .npy file each
+ARRAY_NAMES = ("feature", "threshold", "left", "right", "default_left", "value", "roots", "tree_class", "base_margin")
+
+class CompiledForest:
+    """
+    A gradient-boosted forest flattened into contiguous NumPy arrays so it can be
+    evaluated without DataFrame construction or the generic XGBoost predict path.
+
+    All trees share one node table. Leaves point to themselves, so a batch of rows
+    descends every tree in lock-step for `max_depth` steps and then reads the leaf
+    values. Split semantics follow XGBoost: go left when x < threshold (in float32),
+    and missing values follow each node's default direction.
+    """
+    def __init__(self, feature, threshold, left, right, default_left, value,
+                 roots, tree_class, base_margin, max_depth):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.default_left = default_left
+        self.value = value
+        self.roots = roots
+        self.tree_class = tree_class
+        self.base_margin = base_margin
+        self.max_depth = max_depth
+        self.num_class = len(base_margin)
+        # Tree -> class one-hot matrix, so per-class margins are a single matmul
+        self.class_matrix = np.zeros((len(roots), self.num_class), dtype=np.float64)
+        self.class_matrix[np.arange(len(roots)), tree_class] = 1.0
+
+    @classmethod
+    def from_booster(cls, booster):
+        """Builds the flattened arrays from an XGBoost Booster's JSON model."""
+        model = json.loads(bytes(booster.save_raw("json")))
+        learner = model["learner"]
+        trees = learner["gradient_booster"]["model"]["trees"]
+        tree_info = learner["gradient_booster"]["model"]["tree_info"]
+        num_class = max(1, int(learner["learner_model_param"].get("num_class", "0")))
+
+        base_score = learner["learner_model_param"]["base_score"]
+        base_margin = np.array(json.loads(base_score) if base_score.startswith("[") else [float(base_score)] * num_class, dtype=np.float64)
+
+        feature, threshold, left, right, default_left, value, roots = [], [], [], [], [], [], []
+        max_depth = 0
+        offset = 0
+        for tree in trees:
+            lc = np.array(tree["left_children"], dtype=np.int64)
+            rc = np.array(tree["right_children"], dtype=np.int64)
+            n = len(lc)
+            is_leaf = lc == -1
+            own = np.arange(n, dtype=np.int64) + offset
+
+            feature.append(np.where(is_leaf, 0, np.array(tree["split_indices"], dtype=np.int64)))
+            # For leaves split_conditions holds the leaf weight; it is never compared
+            threshold.append(np.where(is_leaf, np.inf, np.array(tree["split_conditions"], dtype=np.float32)).astype(np.float32))
+            left.append(np.where(is_leaf, own, lc + offset))
+            right.append(np.where(is_leaf, own, rc + offset))
+            default_left.append(np.array(tree["default_left"], dtype=bool))
+            value.append(np.where(is_leaf, np.array(tree["split_conditions"], dtype=np.float32), 0.0))
+            roots.append(offset)
+            max_depth = max(max_depth, cls._depth(lc, rc))
+            offset += n
+
+        return cls(
+            feature=np.concatenate(feature),
+            threshold=np.concatenate(threshold),
+            left=np.concatenate(left),
+            right=np.concatenate(right),
+            default_left=np.concatenate(default_left),
+            value=np.concatenate(value).astype(np.float32),
+            roots=np.array(roots, dtype=np.int64),
+            tree_class=np.array(tree_info, dtype=np.int64),
+            base_margin=base_margin,
+            max_depth=max_depth
+        )
+
+    def save(self, directory: str):
+        """Writes every array as its own .npy file so `load` can memory-map them."""
+        os.makedirs(directory, exist_ok=True)
+        for name in ARRAY_NAMES:
+            np.save(os.path.join(directory, f"{name}.npy"), np.ascontiguousarray(getattr(self, name)))
+        with open(os.path.join(directory, "forest.json"), "w", encoding="utf-8") as f:
+            json.dump({"max_depth": int(self.max_depth)}, f)
+
+    @classmethod
+    def load(cls, directory: str, mmap_mode: str = "r"):
+        """
+        Loads a forest written by `save`. With the default read-only memory mapping,
+        every process that loads the same directory shares one copy of the node
+        table through the OS page cache.
+        """
+        with open(os.path.join(directory, "forest.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        # Plain ndarray views of the mappings: no copy, and none of np.memmap's per-operation overhead
+        arrays = {name: np.asarray(np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)) for name in ARRAY_NAMES}
+        return cls(max_depth=meta["max_depth"], **arrays)
+
+    @staticmethod
+    def _depth(left, right):
+        depth = 0
+        frontier = [0]
+        while True:
+            children = [c for node in frontier for c in (left[node], right[node]) if c != -1]
+            if not children:
+                return depth
+            frontier = children
+            depth += 1
+
+    def predict_margin(self, X):
+        """Raw per-class margins for an N x num_features matrix."""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        rows = np.arange(len(X))[:, None]
+        node = np.broadcast_to(self.roots, (len(X), len(self.roots)))
+        for _ in range(self.max_depth):
+            x = X[rows, self.feature[node]]
+            go_left = np.where(np.isnan(x), self.default_left[node], x < self.threshold[node])
+            node = np.where(go_left, self.left[node], self.right[node])
+        return self.value[node].astype(np.float64) @ self.class_matrix + self.base_margin
+
+    def predict_proba(self, X):
+        """Softmax class probabilities, matching XGBClassifier.predict_proba for multi:softprob."""
+        margin = self.predict_margin(X)
+        margin -= margin.max(axis=1, keepdims=True)
+        exp = np.exp(margin)
+        return (exp / exp.sum(axis=1, keepdims=True)).astype(np.float32)
+
+    def probe_rows(self, num_features: int, n: int = 256, seed: int = 0):
+        """Rows built from the forest's own split thresholds (plus missing values) to exercise every branch."""
+        rng = np.random.default_rng(seed)
+        X = np.zeros((n, num_features), dtype=np.float32)
+        internal = self.left != np.arange(len(self.left))
+        for j in range(num_features):
+            cuts = self.threshold[internal & (self.feature == j)]
+            if len(cuts) == 0:
+                continue
+            picks = rng.choice(cuts, size=n)
+            # Land exactly on, just below, or just above a split point
+            X[:, j] = picks + rng.choice([-1, 0, 1], size=n) * np.abs(picks) * 1e-3
+        X[rng.random(X.shape) < 0.02] = np.nan
+        return X
+
+    def parity_error(self, model, num_features: int):
+        """Largest absolute probability difference from an XGBClassifier's predict_proba on probe rows."""
+        X = self.probe_rows(num_features)
+        expected = model.predict_proba(X)
+        return float(np.max(np.abs(self.predict_proba(X) - expected)))
+
+    def matches(self, model, num_features: int, atol: float = 1e-5):
+        """Checks parity with an XGBClassifier's predict_proba on probe rows."""
+        return self.parity_error(model, num_features) <= atol
@@ -0,0 +1,67 @@
+import threading
+import time
+import traceback
+
+def warm_worker():
+    """
+    Process initializer for CPU workers: loads the active model version (which builds
+    the SHAP explainer and runs one explained prediction), and imports the statement parsers and certificate
+    template, so a worker's first real job pays none of these costs.
+    """
+    try:
+        from services.inference import get_inference_service
+        get_inference_service()
+        import pypdf
+        import services.pipeline
+        from services.certificate import get_template
+        get_template()
+    except Exception:
+        # A broken warmup must not break the pool; the first real job reports the error
+        traceback.print_exc()
+
+class Warmup:
+    """
+    Background startup work for the API process. Imports the modules the request
+    handlers load lazily, then starts and warms every CPU worker. `ready` turns
+    True once everything is loaded; /api/ready reports it to the load balancer.
+    """
+    def __init__(self, executor):
+        self.executor = executor
+        self.ready = False
+        self.error = None
+        self.started_at = None
+        self.seconds = None
+        self._thread = None
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="warmup", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            from services.model_registry import model_registry
+            # Publishes the bundled model on first boot, before any worker looks for it
+            model_registry.current_version()
+            import services.pipeline
+            import services.feature_engine
+            import services.certificate
+            self.executor.warm()
+            self.ready = True
+        except Exception as e:
+            traceback.print_exc()
+            self.error = str(e)
+        finally:
+            self.seconds = round(time.perf_counter() - self.started_at, 3)
+
+    def wait(self, timeout: float = None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.ready
+
+    def status(self):
+        return {
+            "ready": self.ready,
+            "warmup_seconds": self.seconds,
+            "error": self.error
+        }
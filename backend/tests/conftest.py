@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Tests import services.* the way main.py does, with backend/ on the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
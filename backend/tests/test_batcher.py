@@ -0,0 +1,77 @@
+import asyncio
+import gc
+
+import numpy as np
+import pytest
+
+import services.pipeline as pipeline
+from services.batcher import PredictionBatcher
+from services.executor import ExecutorSaturated
+
+class InlineExecutor:
+    """Runs jobs in the calling task, recording each call's batch size."""
+    def __init__(self):
+        self.calls = []
+        self.saturated = False
+
+    async def run(self, fn, *args):
+        await asyncio.sleep(0)
+        if self.saturated:
+            raise ExecutorSaturated("busy")
+        self.calls.append(len(args[0]))
+        return fn(*args)
+
+def score_rows(rows):
+    # Like InferenceService._to_matrix, a ragged row fails the whole matrix
+    X = np.asarray(rows, dtype=np.float64)
+    if X.ndim != 2 or X.shape[1] != 3:
+        raise ValueError(f"bad feature matrix {X.shape}")
+    return [float(row.sum()) for row in X]
+
+@pytest.fixture(autouse=True)
+def fake_model(monkeypatch):
+    monkeypatch.setattr(pipeline, "predict_explained_batch", score_rows)
+
+def run_clients(batcher, rows):
+    async def main():
+        return await asyncio.gather(*(batcher.predict(row) for row in rows), return_exceptions=True)
+    return asyncio.run(main())
+
+def test_concurrent_calls_share_one_batch():
+    executor = InlineExecutor()
+    batcher = PredictionBatcher(executor, max_batch=8, max_wait_ms=5)
+    results = run_clients(batcher, [[i, 1, 1] for i in range(5)])
+    assert results == [2.0 + i for i in range(5)]
+    assert executor.calls == [5]
+    assert batcher.stats()["split_batches"] == 0
+
+def test_bad_row_fails_only_its_caller():
+    executor = InlineExecutor()
+    batcher = PredictionBatcher(executor, max_batch=8, max_wait_ms=5)
+    results = run_clients(batcher, [[1, 1, 1], [1, 2], [2, 2, 2]])
+    assert results[0] == 3.0 and results[2] == 6.0
+    assert isinstance(results[1], ValueError)
+    assert executor.calls == [3, 1, 1, 1]
+    assert batcher.stats()["split_batches"] == 1
+
+def test_saturation_fails_the_batch_without_retrying_rows():
+    executor = InlineExecutor()
+    executor.saturated = True
+    batcher = PredictionBatcher(executor, max_batch=8, max_wait_ms=5)
+    results = run_clients(batcher, [[1, 1, 1], [2, 2, 2]])
+    assert all(isinstance(r, ExecutorSaturated) for r in results)
+    assert batcher.stats()["split_batches"] == 0
+
+def test_running_batches_are_held_until_done():
+    executor = InlineExecutor()
+    batcher = PredictionBatcher(executor, max_batch=2, max_wait_ms=5)
+
+    async def main():
+        calls = [asyncio.ensure_future(batcher.predict([i, 0, 0])) for i in range(2)]
+        await asyncio.sleep(0)
+        assert len(batcher._tasks) == 1
+        gc.collect()
+        return await asyncio.gather(*calls)
+
+    assert asyncio.run(main()) == [0.0, 1.0]
+    assert not batcher._tasks
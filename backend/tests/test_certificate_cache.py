@@ -0,0 +1,32 @@
+import os
+
+from services.certificate_cache import CertificateCache
+
+def disk_files(cache):
+    return [f for f in os.listdir(cache.disk_dir) if f.endswith(".pdf")]
+
+def test_disk_tier_is_trimmed_every_n_puts(tmp_path):
+    cache = CertificateCache(max_entries=2, disk_dir=str(tmp_path), max_disk_entries=3, evict_every=3)
+    for i in range(5):
+        cache.put(f"key{i}", b"%PDF-" + bytes([i]))
+    # Trimmed at the 3rd put (still under the cap), over it until the 6th
+    assert len(disk_files(cache)) == 5
+    cache.put("key5", b"%PDF-5")
+    assert len(disk_files(cache)) == 3
+
+def test_eviction_skips_files_removed_by_another_worker(tmp_path, monkeypatch):
+    cache = CertificateCache(disk_dir=str(tmp_path), max_disk_entries=2, evict_every=100)
+    for i in range(5):
+        cache.put(f"key{i}", b"%PDF-" + bytes([i]))
+    vanished = cache._disk_path("key0")
+    getmtime = os.path.getmtime
+
+    def racing_getmtime(path):
+        if path == vanished:
+            os.remove(path)
+            raise FileNotFoundError(path)
+        return getmtime(path)
+
+    monkeypatch.setattr(os.path, "getmtime", racing_getmtime)
+    cache._evict_disk()
+    assert len(disk_files(cache)) == 2
@@ -0,0 +1,36 @@
+import pandas as pd
+import pytest
+
+from benchmarks.statements import generate_statement
+from services.feature_engine import extract_features, extract_features_batch
+from services.inference import ALL_SIGNAL_NAMES
+
+@pytest.fixture(scope="module")
+def ledger():
+    statements = {
+        "ACC-1": generate_statement(12, 40, seed=1),
+        "ACC-2": generate_statement(3, 15, mix={"food": 1}, seed=2, start="2023-06-01"),
+        "ACC-3": generate_statement(1, 5, seed=3),
+    }
+    # A line whose date does not parse (NaT) must be skipped by both paths alike
+    bad_date = statements["ACC-2"].iloc[[0]].assign(date="")
+    statements["ACC-2"] = pd.concat([statements["ACC-2"], bad_date], ignore_index=True)
+    frames = [df.assign(account_id=account) for account, df in statements.items()]
+    # Interleave the accounts, as in a combined export
+    return pd.concat(frames, ignore_index=True).sort_values("date", kind="stable").reset_index(drop=True)
+
+def test_batch_matches_single_account_extraction(ledger):
+    features, analysis = extract_features_batch(ledger)
+    assert list(features.columns) == ALL_SIGNAL_NAMES
+    assert set(features.index) == {"ACC-1", "ACC-2", "ACC-3"}
+    for account in features.index:
+        single = ledger[ledger.account_id == account].drop(columns=["account_id"])
+        expected, expected_analysis = extract_features(single)
+        assert list(features.loc[account]) == expected
+        assert [share.to_dict() for share in analysis[account]] == [share.to_dict() for share in expected_analysis]
+
+def test_account_column_is_detected_or_required(ledger):
+    renamed = ledger.rename(columns={"account_id": "Customer ID"})
+    assert extract_features_batch(renamed)[0].index.tolist() == extract_features_batch(ledger)[0].index.tolist()
+    with pytest.raises(ValueError, match="account identifier"):
+        extract_features_batch(ledger.drop(columns=["account_id"]))
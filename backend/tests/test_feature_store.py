@@ -0,0 +1,130 @@
+import pandas as pd
+import pytest
+
+from services.feature_engine import aggregate_transactions
+from services.feature_store import MonthlyFeatureStore
+
+class FakeSnapshot:
+    def __init__(self, doc_id: str, data):
+        self.id = doc_id
+        self._data = data
+        self.exists = data is not None
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+class FakeCollection:
+    def __init__(self, db, path: str):
+        self.db = db
+        self.path = path
+
+    def document(self, doc_id: str):
+        return FakeDocument(self.db, f"{self.path}/{doc_id}")
+
+    def stream(self, transaction=None):
+        prefix = f"{self.path}/"
+        for path in sorted(self.db.docs):
+            if path.startswith(prefix) and "/" not in path[len(prefix):]:
+                yield FakeSnapshot(path[len(prefix):], self.db.docs[path])
+
+class FakeDocument:
+    def __init__(self, db, path: str):
+        self.db = db
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+
+    def get(self, transaction=None):
+        return FakeSnapshot(self.id, self.db.docs.get(self.path))
+
+    def collection(self, name: str):
+        return FakeCollection(self.db, f"{self.path}/{name}")
+
+class FakeTransaction:
+    def __init__(self, db):
+        self.db = db
+
+    def set(self, ref, data):
+        self.db.docs[ref.path] = dict(data)
+        self.db.writes.append(ref.path)
+
+    def delete(self, ref):
+        self.db.docs.pop(ref.path, None)
+        self.db.writes.append(ref.path)
+
+class FakeFirestore:
+    """Document store keyed by path; transactions apply their writes directly."""
+    def __init__(self):
+        self.docs = {}
+        self.writes = []
+
+    def collection(self, name: str):
+        return FakeCollection(self, name)
+
+    def transaction(self):
+        return FakeTransaction(self)
+
+@pytest.fixture(autouse=True)
+def run_transactions_inline(monkeypatch):
+    from firebase_admin import firestore
+    monkeypatch.setattr(firestore, "transactional", lambda fn: fn)
+
+def statement(days: list, amount: float = 100.0):
+    return pd.DataFrame({
+        "date": days,
+        "description": ["GROCERY MART"] * len(days),
+        "amount": [amount] * len(days),
+        "type": ["DEBIT"] * len(days),
+        "category": ["FOOD"] * len(days),
+    })
+
+def merge(store, uid: str, df: pd.DataFrame):
+    return store.merge(uid, *aggregate_transactions(df, by_day=True))
+
+def shard_ids(db, uid: str = "u1"):
+    prefix = f"monthly_aggregates/{uid}/aggregate_months/"
+    return sorted(path[len(prefix):] for path in db.docs if path.startswith(prefix))
+
+def test_days_are_sharded_per_month():
+    db = FakeFirestore()
+    store = MonthlyFeatureStore(db)
+    monthly, _ = merge(store, "u1", statement(["2024-01-10", "2024-01-20", "2024-02-05", "2024-03-01"]))
+    assert shard_ids(db) == ["2024-01", "2024-02", "2024-03"]
+    assert db.docs["monthly_aggregates/u1"].keys() == {"updated_at"}
+    assert list(monthly["txns"]) == [2.0, 1.0, 1.0]
+
+def test_upload_rewrites_only_the_months_it_changes():
+    db = FakeFirestore()
+    store = MonthlyFeatureStore(db)
+    merge(store, "u1", statement(["2024-01-10", "2024-02-05", "2024-03-01"]))
+    db.writes.clear()
+
+    # A re-upload of March replaces its days and leaves the other shards untouched
+    monthly, _ = merge(store, "u1", statement(["2024-03-01", "2024-03-15"], amount=50.0))
+    assert [w for w in db.writes if "aggregate_months" in w] == ["monthly_aggregates/u1/aggregate_months/2024-03"]
+    assert list(monthly["txns"]) == [1.0, 1.0, 2.0]
+    assert list(monthly["spend"]) == [100.0, 100.0, 100.0]
+
+    loaded, _ = store.load("u1")
+    pd.testing.assert_frame_equal(loaded, monthly)
+
+def test_month_emptied_by_a_covering_upload_is_deleted():
+    db = FakeFirestore()
+    store = MonthlyFeatureStore(db)
+    merge(store, "u1", statement(["2024-01-10", "2024-02-05", "2024-03-20"]))
+    merge(store, "u1", statement(["2024-01-01", "2024-03-31"]))
+    assert shard_ids(db) == ["2024-01", "2024-03"]
+
+def test_legacy_document_is_moved_into_shards():
+    db = FakeFirestore()
+    store = MonthlyFeatureStore(db)
+    daily, categories = aggregate_transactions(statement(["2023-11-02", "2023-12-02"]), by_day=True)
+    legacy_days = store.to_document(daily, categories)
+    legacy_month = dict(legacy_days["2023-11-02"])
+    db.docs["monthly_aggregates/u1"] = {"days": {"2023-12-02": legacy_days["2023-12-02"]}, "months": {"2023-11": legacy_month}}
+    before, _ = store.load("u1")
+
+    monthly, _ = merge(store, "u1", statement(["2024-01-10"]))
+    assert shard_ids(db) == ["2023-11", "2023-12", "2024-01"]
+    assert db.docs["monthly_aggregates/u1/aggregate_months/2023-11"]["month"] == legacy_month
+    assert "days" not in db.docs["monthly_aggregates/u1"]
+    pd.testing.assert_frame_equal(monthly.iloc[:2], before)
@@ -0,0 +1,47 @@
+import pytest
+
+import services.pipeline as pipeline
+from services.csv_ingest import LayoutCache
+from services.pipeline import StatementFormatError, load_statement
+
+HEADER = "Date,Description,Amount,Type,Category\n"
+
+@pytest.fixture
+def layouts(monkeypatch):
+    cache = LayoutCache()
+    monkeypatch.setattr(pipeline, "csv_layouts", cache)
+    return cache
+
+def write_statement(tmp_path, name: str, rows: list):
+    path = tmp_path / name
+    path.write_text(HEADER + "".join(f"{row}\n" for row in rows), encoding="utf-8")
+    return str(path)
+
+def statement_rows(n: int = 40):
+    return [f"2024-01-{i % 28 + 1:02d},SHOP {i},{i}.50,DEBIT,SHOPPING" for i in range(n)]
+
+def test_known_layout_is_read_typed(tmp_path, layouts):
+    path = write_statement(tmp_path, "a.csv", statement_rows())
+    first = load_statement(path, "a.csv", 10)
+    second = load_statement(path, "a.csv", 10)
+    assert layouts.stats() == {"entries": 1, "hits": 1, "misses": 1}
+    assert first[0] == second[0] == "aggregates"
+    assert first[1].equals(second[1])
+
+@pytest.mark.parametrize("cached", [False, True])
+def test_header_only_csv_is_rejected(tmp_path, layouts, cached):
+    if cached:
+        load_statement(write_statement(tmp_path, "full.csv", statement_rows()), "full.csv", 10)
+        assert layouts.stats()["entries"] == 1
+    empty = write_statement(tmp_path, "empty.csv", [])
+    with pytest.raises(StatementFormatError, match="empty"):
+        load_statement(empty, "empty.csv", 10)
+    # An empty file says nothing about the layout; it stays cached
+    assert layouts.stats()["entries"] == int(cached)
+
+def test_thousands_separators_are_not_cached(tmp_path, layouts):
+    rows = [f'2024-01-{i % 28 + 1:02d},SHOP {i},"1,2{i % 10}4.00",DEBIT,SHOPPING' for i in range(20)]
+    path = write_statement(tmp_path, "sep.csv", rows)
+    for _ in range(2):
+        assert load_statement(path, "sep.csv", 10)[0] == "aggregates"
+    assert layouts.stats() == {"entries": 0, "hits": 0, "misses": 2}
@@ -0,0 +1,32 @@
+import os
+
+from services.result_cache import ResultCache
+
+def disk_files(cache):
+    return [f for f in os.listdir(cache.disk_dir) if f.endswith(".json")]
+
+def test_disk_tier_is_trimmed_every_n_puts(tmp_path):
+    cache = ResultCache(max_entries=2, disk_dir=str(tmp_path), max_disk_entries=5, evict_every=4)
+    for i in range(7):
+        cache.put(f"key{i}", {"n": i})
+    # Over the cap between checks; the 8th put trims it
+    assert len(disk_files(cache)) == 7
+    cache.put("key7", {"n": 7})
+    assert len(disk_files(cache)) == 5
+
+def test_eviction_skips_files_removed_by_another_worker(tmp_path, monkeypatch):
+    cache = ResultCache(disk_dir=str(tmp_path), max_disk_entries=2, evict_every=100)
+    for i in range(5):
+        cache.put(f"key{i}", {"n": i})
+    vanished = cache._disk_path("key0")
+    getmtime = os.path.getmtime
+
+    def racing_getmtime(path):
+        if path == vanished:
+            os.remove(path)
+            raise FileNotFoundError(path)
+        return getmtime(path)
+
+    monkeypatch.setattr(os.path, "getmtime", racing_getmtime)
+    cache._evict_disk()
+    assert len(disk_files(cache)) == 2
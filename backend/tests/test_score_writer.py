@@ -0,0 +1,167 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from services.score_repository import InMemoryScoreRepository, InvalidCursor
+from services.score_writer import WriteBehindRepository
+
+class FakeFirestore(InMemoryScoreRepository):
+    """
+    In-memory backend with Firestore's failure modes: commits can be held open,
+    fail transiently (outage) or reject specific documents permanently.
+    """
+    def __init__(self):
+        super().__init__()
+        self.commits = []
+        self.outage = False
+        self.rejected = set()
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def add_many(self, items: list):
+        self.gate.wait()
+        if self.outage:
+            raise ConnectionError("firestore unavailable")
+        bad = [score_id for score_id, _ in items if score_id in self.rejected]
+        if bad:
+            raise ValueError(f"invalid document {bad[0]}")
+        self.commits.append([score_id for score_id, _ in items])
+        super().add_many(items)
+
+def score(uid: str, minutes: int, value: int = 50):
+    return {"uid": uid, "score": value, "created_at": datetime(2024, 1, 1) + timedelta(minutes=minutes)}
+
+def wait_for(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+@pytest.fixture
+def queue_path(tmp_path):
+    return str(tmp_path / "score_queue.jsonl")
+
+def test_add_returns_before_commit_and_batches(queue_path):
+    backend = FakeFirestore()
+    backend.gate.clear()
+    writer = WriteBehindRepository(backend, queue_path, batch_size=10, max_backoff=0.01)
+    ids = [writer.add(score("u1", i)) for i in range(25)]
+    assert backend.list_for_user("u1") == []
+    assert writer.get(ids[0])["uid"] == "u1"
+
+    backend.gate.set()
+    assert writer.flush(timeout=5)
+    assert sorted(d["id"] for d in backend.list_for_user("u1")) == sorted(ids)
+    assert all(len(commit) <= 10 for commit in backend.commits)
+    assert writer.stats()["committed"] == 25
+    writer.close()
+
+def test_unacked_documents_replay_after_restart(queue_path):
+    backend = FakeFirestore()
+    backend.outage = True
+    writer = WriteBehindRepository(backend, queue_path, max_backoff=0.01)
+    ids = [writer.add(score("u1", i)) for i in range(3)]
+    writer.close(timeout=0.2)
+    assert backend.list_for_user("u1") == []
+
+    healthy = FakeFirestore()
+    restarted = WriteBehindRepository(healthy, queue_path, max_backoff=0.01)
+    assert restarted.stats()["replayed"] == 3
+    assert restarted.flush(timeout=5)
+    assert sorted(d["id"] for d in healthy.list_for_user("u1")) == sorted(ids)
+    restarted.close()
+
+def test_processes_use_separate_journal_slots(queue_path):
+    first_backend, second_backend = FakeFirestore(), FakeFirestore()
+    second_backend.outage = True
+    first = WriteBehindRepository(first_backend, queue_path, max_backoff=0.01)
+    second = WriteBehindRepository(second_backend, queue_path, max_backoff=0.01)
+    assert first.journal.path != second.journal.path
+
+    pending_id = second.add(score("u2", 0))
+    first.add(score("u1", 0))
+    # The first process commits and compacts its slot without touching the second's documents
+    assert first.flush(timeout=5)
+    assert first.stats()["replayed"] == 0
+    second.close(timeout=0.2)
+    first.close()
+
+    # A process started after the second one exited adopts its unowned slot
+    third_backend = FakeFirestore()
+    third = WriteBehindRepository(third_backend, queue_path, max_backoff=0.01)
+    assert third.flush(timeout=5)
+    assert [d["id"] for d in third_backend.list_for_user("u2")] == [pending_id]
+    assert [d["id"] for d in third_backend.list_for_user("u1")] == []
+    third.close()
+
+def test_transient_errors_are_retried_not_dropped(queue_path):
+    backend = FakeFirestore()
+    backend.outage = True
+    writer = WriteBehindRepository(backend, queue_path, max_backoff=0.01, max_attempts=2)
+    ids = [writer.add(score("u1", i)) for i in range(3)]
+    wait_for(lambda: writer.stats()["failures"] >= 10)
+    assert writer.stats()["dead_lettered"] == 0
+
+    backend.outage = False
+    assert writer.flush(timeout=5)
+    assert sorted(d["id"] for d in backend.list_for_user("u1")) == sorted(ids)
+    writer.close()
+
+def test_rejected_document_is_dead_lettered_without_blocking_the_queue(queue_path):
+    backend = FakeFirestore()
+    backend.gate.clear()
+    writer = WriteBehindRepository(backend, queue_path, batch_size=8, max_backoff=0.01, max_attempts=2)
+    ids = [writer.add(score("u1", i)) for i in range(20)]
+    backend.rejected.add(ids[5])
+    backend.gate.set()
+
+    assert writer.flush(timeout=10)
+    committed = {d["id"] for d in backend.list_for_user("u1")}
+    assert committed == set(ids) - {ids[5]}
+    assert writer.stats()["dead_lettered"] == 1
+    with open(writer.journal.dead_letter_path, encoding="utf-8") as f:
+        assert ids[5] in f.read()
+    writer.close()
+
+    # Dead letters are acked, so a restart does not retry them
+    restarted = WriteBehindRepository(FakeFirestore(), queue_path)
+    assert restarted.stats()["replayed"] == 0
+    restarted.close()
+
+def test_history_reads_overlay_queue_without_waiting(queue_path):
+    backend = FakeFirestore()
+    writer = WriteBehindRepository(backend, queue_path, max_backoff=0.01)
+    stored = [writer.add(score("u1", i)) for i in range(3)]
+    assert writer.flush(timeout=5)
+
+    backend.gate.clear()
+    queued = [writer.add(score("u1", 10 + i)) for i in range(3)]
+    writer.add(score("u2", 20))
+    started = time.perf_counter()
+    history = writer.list_for_user("u1")
+    page, cursor = writer.query_for_user("u1", limit=4)
+    assert time.perf_counter() - started < 0.5
+    assert [d["id"] for d in history] == stored + queued
+    assert [d["id"] for d in page] == stored + queued[:1]
+
+    # Paging continues from a queued document and ends
+    rest, end = writer.query_for_user("u1", limit=4, cursor=cursor)
+    assert [d["id"] for d in rest] == queued[1:]
+    assert end is None
+
+    newest, cursor = writer.query_for_user("u1", limit=2, descending=True, fields=["score"])
+    assert [d["id"] for d in newest] == [queued[2], queued[1]]
+    assert set(newest[0]) == {"id", "score", "created_at"}
+    older, _ = writer.query_for_user("u1", limit=10, cursor=cursor, descending=True)
+    assert [d["id"] for d in older] == [queued[0]] + stored[::-1]
+
+    with pytest.raises(InvalidCursor):
+        writer.query_for_user("u1", limit=2, cursor="no-such-score")
+    with pytest.raises(InvalidCursor):
+        writer.query_for_user("u2", limit=2, cursor=stored[0])
+
+    backend.gate.set()
+    writer.close()
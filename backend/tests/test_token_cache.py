@@ -0,0 +1,142 @@
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from services.token_cache import TokenCache
+
+NOW = 1_700_000_000
+
+class Clock:
+    def __init__(self, now: float = NOW):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture(scope="module")
+def signing_key():
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+class FakeVerifier:
+    """
+    Stands in for firebase_admin.auth.verify_id_token: checks the RS256 signature
+    against the local key, rejects tokens past `exp` on the shared clock, and rejects
+    revoked users when called with check_revoked=True.
+    """
+    def __init__(self, public_key, clock):
+        self.public_key = public_key
+        self.clock = clock
+        self.revoked = set()
+        self.calls = []
+
+    def __call__(self, token: str, check_revoked: bool = False):
+        self.calls.append(check_revoked)
+        claims = jwt.decode(token, self.public_key, algorithms=["RS256"], audience="crediscout",
+                            options={"verify_exp": False})
+        if self.clock() >= claims["exp"]:
+            raise ValueError("Token expired")
+        if check_revoked and claims["uid"] in self.revoked:
+            raise ValueError("Token revoked")
+        return claims
+
+def make_token(key, uid: str = "user-1", lifetime: int = 3600):
+    claims = {"uid": uid, "aud": "crediscout", "iat": NOW, "exp": NOW + lifetime}
+    return jwt.encode(claims, key, algorithm="RS256")
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+@pytest.fixture
+def verifier(signing_key, clock):
+    return FakeVerifier(signing_key.public_key(), clock)
+
+def test_repeat_verification_is_a_cache_hit(signing_key, verifier, clock):
+    cache = TokenCache(verifier, clock=clock)
+    token = make_token(signing_key)
+    assert cache.verify(token)["uid"] == "user-1"
+    assert cache.verify(token)["uid"] == "user-1"
+    assert len(verifier.calls) == 1
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"], stats["hit_rate"]) == (1, 1, 1, 0.5)
+
+def test_tokens_are_keyed_by_hash(signing_key, verifier, clock):
+    cache = TokenCache(verifier, clock=clock)
+    token = make_token(signing_key)
+    cache.verify(token)
+    assert token not in cache._entries
+    assert TokenCache._key(token) in cache._entries
+
+def test_bad_signature_is_rejected_and_not_cached(signing_key, verifier, clock):
+    other_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    cache = TokenCache(verifier, clock=clock)
+    forged = make_token(other_key)
+    for _ in range(2):
+        with pytest.raises(jwt.InvalidSignatureError):
+            cache.verify(forged)
+    assert len(verifier.calls) == 2
+    assert cache.stats()["entries"] == 0
+
+def test_entry_expires_at_exp_claim(signing_key, verifier, clock):
+    cache = TokenCache(verifier, clock=clock)
+    token = make_token(signing_key, lifetime=600)
+    cache.verify(token)
+
+    clock.now = NOW + 599
+    cache.verify(token)
+    assert len(verifier.calls) == 1
+
+    clock.now = NOW + 600
+    with pytest.raises(ValueError, match="expired"):
+        cache.verify(token)
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expired"], stats["entries"]) == (1, 2, 1, 0)
+
+def test_lru_bound_evicts_least_recently_used(signing_key, verifier, clock):
+    cache = TokenCache(verifier, max_entries=2, clock=clock)
+    a, b, c = (make_token(signing_key, uid) for uid in ("a", "b", "c"))
+    cache.verify(a)
+    cache.verify(b)
+    cache.verify(a)
+    cache.verify(c)
+    assert cache.stats()["entries"] == 2
+
+    calls = len(verifier.calls)
+    cache.verify(a)
+    cache.verify(c)
+    assert len(verifier.calls) == calls
+    cache.verify(b)
+    assert len(verifier.calls) == calls + 1
+
+def test_revocation_mode_caps_lifetime_at_ttl(signing_key, verifier, clock):
+    cache = TokenCache(verifier, check_revoked=True, revocation_ttl=60, clock=clock)
+    token = make_token(signing_key, lifetime=3600)
+    cache.verify(token)
+    assert verifier.calls == [True]
+
+    clock.now = NOW + 59
+    cache.verify(token)
+    assert len(verifier.calls) == 1
+
+    # Revoked while cached: rejected once the revocation TTL has passed, not at exp
+    verifier.revoked.add("user-1")
+    clock.now = NOW + 60
+    with pytest.raises(ValueError, match="revoked"):
+        cache.verify(token)
+    assert verifier.calls == [True, True]
+
+def test_ttl_does_not_extend_past_exp(signing_key, verifier, clock):
+    cache = TokenCache(verifier, check_revoked=True, revocation_ttl=60, clock=clock)
+    token = make_token(signing_key, lifetime=30)
+    cache.verify(token)
+    clock.now = NOW + 30
+    with pytest.raises(ValueError, match="expired"):
+        cache.verify(token)
+
+def test_invalidate_forces_reverification(signing_key, verifier, clock):
+    cache = TokenCache(verifier, clock=clock)
+    token = make_token(signing_key)
+    cache.verify(token)
+    cache.invalidate(token)
+    cache.verify(token)
+    assert len(verifier.calls) == 2
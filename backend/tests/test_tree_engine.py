@@ -0,0 +1,88 @@
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.inference import ML_FEATURE_NAMES
+from services.tree_engine import CompiledForest
+
+MODEL_PATH = os.path.join(os.path.dirname(__file__), "..", "models", "model.pkl")
+
+# Same tolerance the model registry requires before it publishes a compiled forest
+ATOL = 1e-5
+
+@pytest.fixture(scope="module")
+def model():
+    return joblib.load(MODEL_PATH)
+
+@pytest.fixture(scope="module")
+def forest(model):
+    return CompiledForest.from_booster(model.get_booster())
+
+def expected_proba(model, X):
+    return model.predict_proba(pd.DataFrame(X, columns=ML_FEATURE_NAMES))
+
+def split_thresholds(forest, feature: int):
+    internal = forest.left != np.arange(len(forest.left))
+    return np.unique(forest.threshold[internal & (forest.feature == feature)])
+
+def assert_parity(model, forest, X):
+    np.testing.assert_allclose(forest.predict_proba(X), expected_proba(model, X), atol=ATOL, rtol=0)
+
+def test_random_rows(model, forest):
+    rng = np.random.default_rng(0)
+    X = rng.uniform(-1, 2, size=(2000, len(ML_FEATURE_NAMES))).astype(np.float32)
+    # Income and spend features are in currency units
+    X[:, [1, 3]] *= 100000
+    X[:, 9] = rng.integers(0, 6, size=len(X))
+    assert_parity(model, forest, X)
+
+def test_rows_exactly_on_split_thresholds(model, forest):
+    rng = np.random.default_rng(1)
+    X = forest.probe_rows(len(ML_FEATURE_NAMES), n=512, seed=1)
+    X = np.nan_to_num(X)
+    for feature in range(X.shape[1]):
+        cuts = split_thresholds(forest, feature)
+        if len(cuts):
+            X[:, feature] = rng.choice(cuts, size=len(X))
+    assert_parity(model, forest, X)
+
+def test_every_threshold_and_its_neighbours(model, forest):
+    base = np.full(len(ML_FEATURE_NAMES), 0.5, dtype=np.float32)
+    rows = []
+    for feature in range(len(ML_FEATURE_NAMES)):
+        for cut in split_thresholds(forest, feature):
+            for value in (np.nextafter(cut, np.float32(-np.inf)), cut, np.nextafter(cut, np.float32(np.inf))):
+                row = base.copy()
+                row[feature] = value
+                rows.append(row)
+    assert_parity(model, forest, np.array(rows, dtype=np.float32))
+
+def test_missing_values_follow_default_direction(model, forest):
+    rng = np.random.default_rng(2)
+    X = forest.probe_rows(len(ML_FEATURE_NAMES), n=512, seed=2)
+    X[rng.random(X.shape) < 0.3] = np.nan
+    X[0] = np.nan
+    for feature in range(X.shape[1]):
+        X[1 + feature] = 0.5
+        X[1 + feature, feature] = np.nan
+    assert_parity(model, forest, X)
+
+def test_single_row_matches_batch(model, forest):
+    X = forest.probe_rows(len(ML_FEATURE_NAMES), n=64, seed=3)
+    batch = forest.predict_proba(X)
+    for i in range(len(X)):
+        np.testing.assert_array_equal(forest.predict_proba(X[i]), batch[i:i + 1])
+
+def test_saved_forest_loads_memory_mapped_with_parity(model, forest, tmp_path):
+    forest.save(str(tmp_path))
+    loaded = CompiledForest.load(str(tmp_path))
+    X = forest.probe_rows(len(ML_FEATURE_NAMES), n=256, seed=4)
+    np.testing.assert_array_equal(loaded.predict_proba(X), forest.predict_proba(X))
+    assert_parity(model, loaded, X)
+
+def test_publish_time_check(model, forest):
+    assert forest.parity_error(model, len(ML_FEATURE_NAMES)) <= ATOL
+    assert forest.matches(model, len(ML_FEATURE_NAMES))
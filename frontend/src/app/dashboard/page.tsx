@@ -28,11 +28,13 @@ export default function DashboardPage() {
                     headers: { Authorization: `Bearer ${token}` }
                 }),
                 axios.get(`${process.env.NEXT_PUBLIC_API_URL}/api/scores`, {
-                    headers: { Authorization: `Bearer ${token}` }
+                    headers: { Authorization: `Bearer ${token}` },
+                    params: { view: "trend", limit: 8, order: "desc" }
                 })
             ]);
             setData(dashRes.data);
-            setHistory(historyRes.data);
+            // Newest-first page of the last 8 snapshots; the chart plots oldest to newest
+            setHistory([...historyRes.data.items].reverse());
         } catch (err: any) {
             setError("Failed to fetch dashboard data.");
         } finally {
@@ -0,0 +1,79 @@
+import glob
+import hashlib
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+
+# Bump when the on-disk layout changes so stale caches are rebuilt
+CACHE_FORMAT = 1
+
+def fingerprint(files):
+    """Digest of the file names, sizes and modification times; changes whenever any CSV does."""
+    digest = hashlib.sha256(f"v{CACHE_FORMAT}".encode())
+    for path in sorted(files):
+        stat = os.stat(path)
+        digest.update(f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()[:16]
+
+class ColumnarCache:
+    """
+    Converts a directory of CSV shards into a columnar on-disk copy, once: a
+    column-major float32 feature matrix and the label vector as .npy files that
+    later runs (and every sweep worker) memory-map instead of re-parsing text.
+    Each split lives in `{cache_dir}/{split}-{fingerprint}`, so adding, removing or
+    editing a CSV invalidates the cache and older copies are deleted on rebuild.
+    """
+    def __init__(self, cache_dir: str, target: str = "target"):
+        self.cache_dir = cache_dir
+        self.target = target
+
+    def ensure(self, split: str, csv_dir: str):
+        """Returns the cache directory for a split, building it first if the CSVs changed."""
+        files = glob.glob(os.path.join(csv_dir, "*.csv"))
+        if not files:
+            raise FileNotFoundError(f"No CSV files in {csv_dir}")
+        path = os.path.join(self.cache_dir, f"{split}-{fingerprint(files)}")
+        if not os.path.exists(os.path.join(path, "meta.json")):
+            self._build(split, files, path)
+        return path
+
+    def load(self, split: str, csv_dir: str):
+        """Returns (X, y, columns) for a split, with X and y memory-mapped read-only."""
+        return self.open(self.ensure(split, csv_dir))
+
+    @staticmethod
+    def open(path: str):
+        """Memory-maps a cache directory written by `ensure`; cheap enough to call in every worker."""
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        X = np.load(os.path.join(path, "X.npy"), mmap_mode="r")
+        y = np.load(os.path.join(path, "y.npy"), mmap_mode="r")
+        return X, y, meta["columns"]
+
+    def _build(self, split: str, files: list, path: str):
+        print(f"Building columnar cache for {split} ({len(files)} files)...")
+        frames = [pd.read_csv(f) for f in sorted(files)]
+        columns = [c for c in frames[0].columns if c != self.target]
+        for f, frame in zip(sorted(files), frames):
+            if list(frame.columns) != list(frames[0].columns):
+                raise ValueError(f"{f} has columns {list(frame.columns)}, expected {list(frames[0].columns)}")
+
+        X = np.asfortranarray(np.concatenate([frame[columns].to_numpy(dtype=np.float32) for frame in frames]))
+        y = np.concatenate([frame[self.target].to_numpy(dtype=np.int32) for frame in frames])
+
+        # Written to a temporary directory and renamed, so an interrupted build is never reused
+        tmp_path = os.path.join(self.cache_dir, f".building-{os.path.basename(path)}-{os.getpid()}")
+        os.makedirs(tmp_path, exist_ok=True)
+        np.save(os.path.join(tmp_path, "X.npy"), X)
+        np.save(os.path.join(tmp_path, "y.npy"), y)
+        with open(os.path.join(tmp_path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"columns": columns, "rows": len(y), "files": [os.path.basename(p) for p in sorted(files)]}, f)
+
+        for stale in glob.glob(os.path.join(self.cache_dir, f"{split}-*")):
+            if stale != path:
+                shutil.rmtree(stale, ignore_errors=True)
+        if os.path.exists(path):
+            shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
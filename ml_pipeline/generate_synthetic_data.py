@@ -1,97 +1,265 @@
-import pandas as pd
-import numpy as np
+import argparse
 import os
-import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
 
-# Seed for reproducibility
-np.random.seed(42)
-random.seed(42)
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-def generate_profile(label):
+# Class labels: 0 Risky, 1 Moderate, 2 Stable
+LABELS = np.array([0, 1, 2])
+# Mix of classes: 20% Risky, 40% Moderate, 40% Stable
+CLASS_MIX = np.array([0.2, 0.4, 0.4])
+
+FEATURE_COLUMNS = [
+    "income_regularity", "avg_monthly_income", "income_growth_trend", "avg_monthly_spend",
+    "discretionary_spending_ratio", "savings_rate", "rent_ratio", "emi_ratio",
+    "commitment_fulfillment_rate", "missed_commitments_count", "spending_volatility",
+    "net_cashflow_stability"
+]
+
+def generate_block(rng: np.random.Generator, label: int, n: int):
     """
-    Generates a financial profile based on the class label.
-    0: Risky, 1: Moderate, 2: Stable
+    Draws `n` financial profiles of one class at once. Returns a dict of column
+    arrays with the same distributions the per-row generator used.
     """
     if label == 2:  # STABLE
-        income_regularity = np.random.uniform(0.85, 1.0)
-        avg_monthly_income = np.random.normal(70000, 5000)
-        savings_rate = np.random.uniform(0.20, 0.50)
-        commitment_fulfillment = np.random.uniform(0.95, 1.0)
-        spending_volatility = np.random.normal(0.1, 0.05)
-        missed_commitments = np.random.poisson(0.1)
-        income_growth_trend = np.random.normal(0.05, 0.02)
+        income_regularity = rng.uniform(0.85, 1.0, n)
+        avg_monthly_income = rng.normal(70000, 5000, n)
+        savings_rate = rng.uniform(0.20, 0.50, n)
+        commitment_fulfillment = rng.uniform(0.95, 1.0, n)
+        spending_volatility = rng.normal(0.1, 0.05, n)
+        missed_commitments = rng.poisson(0.1, n)
+        income_growth_trend = rng.normal(0.05, 0.02, n)
+        discretionary_spending_ratio = rng.uniform(0.1, 0.4, n)
     elif label == 1:  # MODERATE
-        income_regularity = np.random.uniform(0.60, 0.85)
-        avg_monthly_income = np.random.normal(40000, 8000)
-        savings_rate = np.random.uniform(0.05, 0.20)
-        commitment_fulfillment = np.random.uniform(0.80, 0.95)
-        spending_volatility = np.random.normal(0.3, 0.1)
-        missed_commitments = np.random.poisson(1.0)
-        income_growth_trend = np.random.normal(0.02, 0.03)
+        income_regularity = rng.uniform(0.60, 0.85, n)
+        avg_monthly_income = rng.normal(40000, 8000, n)
+        savings_rate = rng.uniform(0.05, 0.20, n)
+        commitment_fulfillment = rng.uniform(0.80, 0.95, n)
+        spending_volatility = rng.normal(0.3, 0.1, n)
+        missed_commitments = rng.poisson(1.0, n)
+        income_growth_trend = rng.normal(0.02, 0.03, n)
+        discretionary_spending_ratio = rng.uniform(0.4, 0.7, n)
     else:  # RISKY
-        income_regularity = np.random.uniform(0.30, 0.60)
-        avg_monthly_income = np.random.normal(20000, 5000)
-        savings_rate = np.random.uniform(-0.1, 0.05)
-        commitment_fulfillment = np.random.uniform(0.50, 0.80)
-        spending_volatility = np.random.normal(0.6, 0.2)
-        missed_commitments = np.random.poisson(3.0)
-        income_growth_trend = np.random.normal(-0.02, 0.05)
+        income_regularity = rng.uniform(0.30, 0.60, n)
+        avg_monthly_income = rng.normal(20000, 5000, n)
+        savings_rate = rng.uniform(-0.1, 0.05, n)
+        commitment_fulfillment = rng.uniform(0.50, 0.80, n)
+        spending_volatility = rng.normal(0.6, 0.2, n)
+        missed_commitments = rng.poisson(3.0, n)
+        income_growth_trend = rng.normal(-0.02, 0.05, n)
+        discretionary_spending_ratio = rng.uniform(0.4, 0.7, n)
 
     # Derived features
     avg_monthly_spend = avg_monthly_income * (1 - savings_rate)
-    discretionary_spending_ratio = np.random.uniform(0.1, 0.4) if label == 2 else np.random.uniform(0.4, 0.7)
-    rent_ratio = np.random.uniform(0.15, 0.25)
-    emi_ratio = np.random.uniform(0.0, 0.3)
+    rent_ratio = rng.uniform(0.15, 0.25, n)
+    emi_ratio = rng.uniform(0.0, 0.3, n)
     net_cashflow_stability = (income_regularity + commitment_fulfillment) / (1 + spending_volatility)
 
     return {
-        "income_regularity": max(0, min(1, income_regularity)),
-        "avg_monthly_income": max(0, avg_monthly_income),
+        "income_regularity": np.clip(income_regularity, 0, 1),
+        "avg_monthly_income": np.maximum(0, avg_monthly_income),
         "income_growth_trend": income_growth_trend,
-        "avg_monthly_spend": max(0, avg_monthly_spend),
-        "discretionary_spending_ratio": max(0, min(1, discretionary_spending_ratio)),
+        "avg_monthly_spend": np.maximum(0, avg_monthly_spend),
+        "discretionary_spending_ratio": np.clip(discretionary_spending_ratio, 0, 1),
         "savings_rate": savings_rate,
-        "rent_ratio": max(0, min(1, rent_ratio)),
-        "emi_ratio": max(0, min(1, emi_ratio)),
-        "commitment_fulfillment_rate": max(0, min(1, commitment_fulfillment)),
+        "rent_ratio": np.clip(rent_ratio, 0, 1),
+        "emi_ratio": np.clip(emi_ratio, 0, 1),
+        "commitment_fulfillment_rate": np.clip(commitment_fulfillment, 0, 1),
         "missed_commitments_count": missed_commitments,
-        "spending_volatility": max(0, spending_volatility),
-        "net_cashflow_stability": max(0, net_cashflow_stability),
-        "target": label
+        "spending_volatility": np.maximum(0, spending_volatility),
+        "net_cashflow_stability": np.maximum(0, net_cashflow_stability),
     }
 
-def generate_dataset(num_rows):
-    data = []
-    # Mix of classes: 40% Stable, 40% Moderate, 20% Risky
-    choices = [2] * 40 + [1] * 40 + [0] * 20
-    for _ in range(num_rows):
-        label = random.choice(choices)
-        data.append(generate_profile(label))
-    return pd.DataFrame(data)
+def generate_dataset(num_rows: int, rng: np.random.Generator, label: int = None):
+    """
+    Labelled feature rows in random class order, drawn one class block at a time.
+    Pass `label` to draw every row from that one class instead of CLASS_MIX.
+    """
+    if label is None:
+        target = rng.choice(LABELS, size=num_rows, p=CLASS_MIX)
+    else:
+        target = np.full(num_rows, label)
+    columns = {name: np.empty(num_rows) for name in FEATURE_COLUMNS}
+    columns["missed_commitments_count"] = np.empty(num_rows, dtype=np.int64)
+    for label in LABELS:
+        rows = np.flatnonzero(target == label)
+        for name, values in generate_block(rng, label, len(rows)).items():
+            columns[name][rows] = values
+    df = pd.DataFrame(columns, columns=FEATURE_COLUMNS)
+    df["target"] = target
+    return df
 
-def main():
-    root_dir = r"c:\Users\prath\OneDrive\Desktop\New folder\ml_pipeline\data"
-    train_dir = os.path.join(root_dir, "train")
-    test_dir = os.path.join(root_dir, "test")
+# Discretionary merchants for raw statements, grouped by mix key: (description, category, relative weight).
+# backend/benchmarks/statements.py builds its statements from these tables too.
+MERCHANTS = {
+    "food": [("Swiggy Order", "FOOD", 4), ("Zomato Order", "FOOD", 3), ("Starbucks Coffee", "FOOD", 1)],
+    "groceries": [("BigBasket Grocery", "GROCERIES", 3), ("DMart Ready", "GROCERIES", 2)],
+    "utilities": [("Electricity Bill", "UTILITIES", 1), ("Jio Recharge", "UTILITIES", 1)],
+    "shopping": [("Amazon Marketplace", "SHOPPING", 3), ("Zara Store", "SHOPPING", 1), ("Apple Store", "SHOPPING", 0.5)],
+    "travel": [("Uber Trip", "TRAVEL", 2), ("IRCTC Booking", "TRAVEL", 1)],
+    "subscriptions": [("Netflix Subscription", "ENTERTAINMENT", 0.5), ("Spotify Premium", "ENTERTAINMENT", 0.5),
+                      ("Disney Hotstar", "ENTERTAINMENT", 0.5)],
+}
+
+def merchant_weights(mix: dict = None):
+    """
+    Returns (merchants, probabilities) for discretionary lines. Without a mix each
+    merchant is drawn by its own weight; a mix such as {"food": 4, "shopping": 1}
+    sets each group's share, split over its merchants by their weights.
+    """
+    unknown = set(mix or {}) - MERCHANTS.keys()
+    if unknown:
+        raise ValueError(f"Unknown merchant group(s) {sorted(unknown)}; expected one of {sorted(MERCHANTS)}")
+    groups = [g for g in MERCHANTS if not mix or mix.get(g, 0) > 0]
+    merchants = [m for g in groups for m in MERCHANTS[g]]
+    p = np.concatenate([
+        np.array([m[2] for m in MERCHANTS[g]], dtype=float)
+        * (mix[g] / sum(m[2] for m in MERCHANTS[g]) if mix else 1.0)
+        for g in groups
+    ])
+    return merchants, p / p.sum()
 
-    os.makedirs(train_dir, exist_ok=True)
-    os.makedirs(test_dir, exist_ok=True)
+# Recurring lines: (description, type, category)
+SALARY = ("Salary Credit", "CREDIT", "SALARY")
+RENT = ("House Rent", "DEBIT", "RENT")
+EMI = ("Home Loan EMI", "DEBIT", "EMI")
+SIP = ("SIP Mutual Fund", "DEBIT", "INVESTMENT")
 
-    print("Generating training data...")
-    for i in range(1, 8):
-        df = generate_dataset(random.randint(300, 500))
-        path = os.path.join(train_dir, f"train_{i}.csv")
-        df.to_csv(path, index=False)
-        print(f"Saved {path}")
+def generate_transactions(num_accounts: int, months: int, txns_per_month: int, rng: np.random.Generator,
+                          start: str = "2023-01", mix: dict = None, label: int = None):
+    """
+    Raw multi-account ledger for `num_accounts` applicants over `months` months, in
+    the backend's statement schema plus an account_id column. Each applicant's
+    behavior follows a profile drawn by `generate_block`: salaries arrive with
+    probability income_regularity, rent and EMI are paid with probability
+    commitment_fulfillment_rate, and discretionary spend is spread over
+    `txns_per_month` merchant lines whose monthly total varies with spending_volatility.
+    `mix` weights the merchant groups (see `merchant_weights`); `label` fixes every
+    applicant's class. Returns (ledger DataFrame, labels DataFrame of account_id and target).
+    """
+    labels = generate_dataset(num_accounts, rng, label=label)
+    account_ids = np.array([f"ACC{i:08d}" for i in range(num_accounts)], dtype=object)
+    income = labels["avg_monthly_income"].to_numpy()
+    month = np.arange(months)
+
+    # (account, month) grids
+    growth = (1 + labels["income_growth_trend"].to_numpy()[:, None]) ** (month[None, :] / 12)
+    salary = income[:, None] * growth * rng.uniform(0.97, 1.03, (num_accounts, months))
+    salary_paid = rng.random((num_accounts, months)) < labels["income_regularity"].to_numpy()[:, None]
+    fulfillment = labels["commitment_fulfillment_rate"].to_numpy()[:, None]
+    rent_paid = rng.random((num_accounts, months)) < fulfillment
+    emi_paid = (rng.random((num_accounts, months)) < fulfillment) & (labels["emi_ratio"].to_numpy()[:, None] > 0.02)
+    savings = labels["savings_rate"].to_numpy()
+    sip_paid = np.broadcast_to((savings > 0)[:, None], (num_accounts, months))
+    volatility = labels["spending_volatility"].to_numpy()[:, None]
+    discretionary = (income * (1 - savings) * labels["discretionary_spending_ratio"].to_numpy())[:, None] \
+        * rng.lognormal(0, 1, (num_accounts, months)) ** volatility
+
+    recurring = [
+        (SALARY, 0, salary, salary_paid),
+        (RENT, 1, income[:, None] * labels["rent_ratio"].to_numpy()[:, None] * np.ones(months), rent_paid),
+        (EMI, 4, income[:, None] * labels["emi_ratio"].to_numpy()[:, None] * np.ones(months), emi_paid),
+        (SIP, 6, (income * np.maximum(savings, 0) * 0.5)[:, None] * np.ones(months), sip_paid),
+    ]
+
+    parts = []
+    for (description, txn_type, category), day, amounts, paid in recurring:
+        acc, mon = np.nonzero(paid)
+        parts.append((acc, mon, np.full(len(acc), day), amounts[acc, mon], description, txn_type, category))
+
+    # Discretionary lines: random merchant and day, the month's budget split by exponential weights
+    n = num_accounts * months * txns_per_month
+    acc = np.repeat(np.arange(num_accounts), months * txns_per_month)
+    mon = np.tile(np.repeat(month, txns_per_month), num_accounts)
+    weights = rng.exponential(1.0, (num_accounts * months, txns_per_month))
+    shares = (weights / weights.sum(axis=1, keepdims=True)).ravel()
+    merchants, merchant_p = merchant_weights(mix)
+    merchant = rng.choice(len(merchants), size=n, p=merchant_p)
+    descriptions = np.array([m[0] for m in merchants], dtype=object)
+    categories = np.array([m[1] for m in merchants], dtype=object)
+    parts.append((acc, mon, rng.integers(0, 28, n), discretionary[acc, mon] * shares,
+                  descriptions[merchant], "DEBIT", categories[merchant]))
+
+    acc = np.concatenate([p[0] for p in parts])
+    mon = np.concatenate([p[1] for p in parts])
+    day = np.concatenate([p[2] for p in parts])
+    amount = np.round(np.concatenate([p[3] for p in parts]), 2)
+    txn_type = np.concatenate([np.broadcast_to(np.asarray(p[5], dtype=object), len(p[0])) for p in parts])
+    dates = (np.datetime64(start, "M") + mon).astype("datetime64[D]") + day
 
-    print("Generating testing data...")
-    for i in range(1, 4):
-        df = generate_dataset(random.randint(300, 500))
-        path = os.path.join(test_dir, f"test_{i}.csv")
+    ledger = pd.DataFrame({
+        "account_id": account_ids[acc],
+        "date": np.datetime_as_string(dates, unit="D"),
+        "description": np.concatenate([np.broadcast_to(np.asarray(p[4], dtype=object), len(p[0])) for p in parts]),
+        "amount": np.where(txn_type == "DEBIT", -amount, amount),
+        "type": txn_type,
+        "category": np.concatenate([np.broadcast_to(np.asarray(p[6], dtype=object), len(p[0])) for p in parts]),
+    })
+    order = np.lexsort((dates, acc))
+    ledger = ledger.iloc[order].reset_index(drop=True)
+    return ledger, pd.DataFrame({"account_id": account_ids, "target": labels["target"].to_numpy()})
+
+def write_shard(task):
+    """Generates and writes one shard; runs in a worker process. Returns (path, rows)."""
+    mode, path, seed_seq, rows, months, txns_per_month = task
+    rng = np.random.default_rng(seed_seq)
+    if rows is None:
+        rows = int(rng.integers(300, 501))
+    if mode == "features":
+        df = generate_dataset(rows, rng)
         df.to_csv(path, index=False)
-        print(f"Saved {path}")
+        return path, len(df)
+    # Account ids are made unique across shards by prefixing the shard name
+    ledger, labels = generate_transactions(rows, months, txns_per_month, rng)
+    prefix = os.path.splitext(os.path.basename(path))[0] + "-"
+    ledger["account_id"] = prefix + ledger["account_id"]
+    labels["account_id"] = prefix + labels["account_id"]
+    ledger.to_csv(path, index=False)
+    labels.to_csv(path.replace(".csv", "_labels.csv"), index=False)
+    return path, len(ledger)
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate seeded synthetic training data or raw transaction ledgers.")
+    parser.add_argument("--mode", choices=["features", "transactions"], default="features",
+                        help="labelled feature rows for training, or raw multi-account ledgers for the feature engine")
+    parser.add_argument("--output-dir", default=None, help="default: data/ for features, data/transactions/ for ledgers")
+    parser.add_argument("--train-shards", type=int, default=7)
+    parser.add_argument("--test-shards", type=int, default=3)
+    parser.add_argument("--rows-per-shard", type=int, default=None,
+                        help="feature rows (or accounts, in transactions mode) per shard; default 300-500 at random")
+    parser.add_argument("--months", type=int, default=12, help="statement length in transactions mode")
+    parser.add_argument("--txns-per-month", type=int, default=40, help="discretionary lines per account-month in transactions mode")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    output_dir = args.output_dir or os.path.join(BASE_DIR, "data", "transactions" if args.mode == "transactions" else "")
+
+    # Every shard gets an independent child stream, so output is identical whatever the worker count
+    seeds = np.random.SeedSequence(args.seed).spawn(args.train_shards + args.test_shards)
+    tasks = []
+    for split, count, offset in (("train", args.train_shards, 0), ("test", args.test_shards, args.train_shards)):
+        split_dir = os.path.join(output_dir, split)
+        os.makedirs(split_dir, exist_ok=True)
+        for i in range(count):
+            path = os.path.join(split_dir, f"{split}_{i + 1}.csv")
+            tasks.append((args.mode, path, seeds[offset + i], args.rows_per_shard, args.months, args.txns_per_month))
+
+    started = time.perf_counter()
+    total = 0
+    if args.workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            results = list(pool.map(write_shard, tasks))
+    else:
+        results = [write_shard(task) for task in tasks]
+    for path, rows in results:
+        total += rows
+        print(f"Saved {path} ({rows} rows)")
 
-    print("Synthetic data generation complete.")
+    print(f"Synthetic data generation complete: {total} rows in {time.perf_counter() - started:.2f}s.")
 
 if __name__ == "__main__":
     main()
@@ -1,47 +1,124 @@
-import pandas as pd
+import argparse
+import itertools
+import json
+import os
+import time
 import numpy as np
 import xgboost as xgb
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import StratifiedKFold
 from sklearn.metrics import accuracy_score, classification_report, roc_auc_score
+from joblib import Parallel, delayed
 import joblib
-import os
-import glob
 
-def load_data(data_dir):
-    files = glob.glob(os.path.join(data_dir, "*.csv"))
-    dfs = [pd.read_csv(f) for f in files]
-    return pd.concat(dfs, ignore_index=True)
+from columnar_cache import ColumnarCache
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Hyperparameter grid searched by cross-validation; n_estimators is chosen by early stopping
+PARAM_GRID = {
+    "max_depth": [3, 5, 7],
+    "learning_rate": [0.05, 0.1],
+    "subsample": [0.8, 1.0],
+    "colsample_bytree": [0.8, 1.0],
+    "min_child_weight": [1, 5],
+}
+
+def param_configs(grid: dict):
+    keys = sorted(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+def cv_fold(cache_path: str, train_idx, valid_idx, params: dict, max_rounds: int, early_stopping_rounds: int,
+            min_delta: float, seed: int):
+    """
+    Trains one configuration on one fold, stopping once validation mlogloss has not
+    improved by `min_delta` for `early_stopping_rounds` rounds, and returns
+    (best validation mlogloss, best iteration). Runs in a sweep worker, which
+    memory-maps the cached training matrix instead of receiving a copy.
+    """
+    X, y, _ = ColumnarCache.open(cache_path)
+    dtrain = xgb.DMatrix(X[train_idx], label=y[train_idx])
+    dvalid = xgb.DMatrix(X[valid_idx], label=y[valid_idx])
+    booster = xgb.train(
+        {**params, "objective": "multi:softprob", "num_class": 3, "eval_metric": "mlogloss",
+         "tree_method": "hist", "nthread": 1, "seed": seed},
+        dtrain,
+        num_boost_round=max_rounds,
+        evals=[(dvalid, "valid")],
+        callbacks=[xgb.callback.EarlyStopping(rounds=early_stopping_rounds, min_delta=min_delta)],
+        verbose_eval=False
+    )
+    return booster.best_score, booster.best_iteration + 1
+
+def sweep(cache_path: str, y, configs: list, folds: int, max_rounds: int, early_stopping_rounds: int,
+          min_delta: float, jobs: int, seed: int):
+    """Cross-validates every configuration, running all (configuration, fold) fits in parallel."""
+    splits = list(StratifiedKFold(n_splits=folds, shuffle=True, random_state=seed).split(np.zeros(len(y)), y))
+    scores = Parallel(n_jobs=jobs)(
+        delayed(cv_fold)(cache_path, train_idx, valid_idx, params, max_rounds, early_stopping_rounds, min_delta, seed)
+        for params in configs
+        for train_idx, valid_idx in splits
+    )
+    results = []
+    for i, params in enumerate(configs):
+        fold_scores = scores[i * folds:(i + 1) * folds]
+        results.append({
+            "params": params,
+            "cv_mlogloss": float(np.mean([s for s, _ in fold_scores])),
+            "cv_mlogloss_std": float(np.std([s for s, _ in fold_scores])),
+            "n_estimators": int(round(np.mean([n for _, n in fold_scores])))
+        })
+    return sorted(results, key=lambda r: r["cv_mlogloss"])
 
 def main():
-    base_dir = r"c:\Users\prath\OneDrive\Desktop\New folder\ml_pipeline"
-    train_data_dir = os.path.join(base_dir, "data", "train")
-    test_data_dir = os.path.join(base_dir, "data", "test")
-    model_dir = os.path.join(base_dir, "models")
-    
-    os.makedirs(model_dir, exist_ok=True)
+    parser = argparse.ArgumentParser(description="Train the credibility model with a cross-validated hyperparameter sweep.")
+    parser.add_argument("--data-dir", default=os.path.join(BASE_DIR, "data"), help="directory with train/ and test/ CSV shards")
+    parser.add_argument("--output-dir", default=os.path.join(BASE_DIR, "models"), help="where model.pkl and metrics.json are written")
+    parser.add_argument("--cache-dir", default=None, help="columnar data cache (default: <data-dir>/.cache)")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--max-rounds", type=int, default=1000, help="upper bound on boosting rounds")
+    parser.add_argument("--early-stopping-rounds", type=int, default=30)
+    parser.add_argument("--min-delta", type=float, default=1e-4, help="smallest mlogloss drop that counts as improvement")
+    parser.add_argument("--jobs", type=int, default=-1, help="parallel fits (-1 = all cores)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    cache = ColumnarCache(args.cache_dir or os.path.join(args.data_dir, ".cache"))
+    os.makedirs(args.output_dir, exist_ok=True)
 
     print("Loading data...")
-    train_df = load_data(train_data_dir)
-    test_df = load_data(test_data_dir)
+    train_path = cache.ensure("train", os.path.join(args.data_dir, "train"))
+    X_train, y_train, columns = ColumnarCache.open(train_path)
+    X_test, y_test, test_columns = cache.load("test", os.path.join(args.data_dir, "test"))
+    if test_columns != columns:
+        raise ValueError(f"Test columns {test_columns} do not match training columns {columns}")
+    load_seconds = time.perf_counter() - started
 
-    X_train = train_df.drop("target", axis=1)
-    y_train = train_df["target"]
-    X_test = test_df.drop("target", axis=1)
-    y_test = test_df["target"]
+    configs = param_configs(PARAM_GRID)
+    print(f"Sweeping {len(configs)} configurations x {args.folds} folds on {len(y_train)} rows...")
+    sweep_started = time.perf_counter()
+    results = sweep(train_path, y_train, configs, args.folds, args.max_rounds, args.early_stopping_rounds,
+                    args.min_delta, args.jobs, args.seed)
+    sweep_seconds = time.perf_counter() - sweep_started
+    best = results[0]
+    print(f"Best CV mlogloss {best['cv_mlogloss']:.4f} with {best['n_estimators']} trees: {best['params']}")
 
-    print(f"Training on {len(X_train)} rows...")
+    print("Training final model...")
     model = xgb.XGBClassifier(
-        n_estimators=100,
-        max_depth=5,
-        learning_rate=0.1,
+        n_estimators=best["n_estimators"],
         objective="multi:softprob",
         num_class=3,
-        random_state=42
+        tree_method="hist",
+        random_state=args.seed,
+        n_jobs=args.jobs,
+        **best["params"]
     )
-    
-    model.fit(X_train, y_train)
+    # Fitted on the cached arrays; feature names are set as a DataFrame fit would have set them
+    model.fit(np.asarray(X_train), np.asarray(y_train))
+    model.get_booster().feature_names = columns
 
     print("Evaluating model...")
+    X_test = np.asarray(X_test)
     y_pred = model.predict(X_test)
     y_proba = model.predict_proba(X_test)
 
@@ -53,9 +130,26 @@ def main():
     print("\nClassification Report:")
     print(classification_report(y_test, y_pred))
 
-    model_path = os.path.join(model_dir, "model.pkl")
+    model_path = os.path.join(args.output_dir, "model.pkl")
     joblib.dump(model, model_path)
     print(f"Model saved to {model_path}")
 
+    report = {
+        "accuracy": accuracy,
+        "roc_auc": roc_auc,
+        "classification_report": classification_report(y_test, y_pred, output_dict=True),
+        "best": best,
+        "sweep": results,
+        "features": columns,
+        "rows": {"train": len(y_train), "test": len(y_test)},
+        "folds": args.folds,
+        "seconds": {"load": round(load_seconds, 3), "sweep": round(sweep_seconds, 3),
+                    "total": round(time.perf_counter() - started, 3)}
+    }
+    metrics_path = os.path.join(args.output_dir, "metrics.json")
+    with open(metrics_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Metrics saved to {metrics_path}")
+
 if __name__ == "__main__":
     main()